@@ -0,0 +1,160 @@
+from collections import Counter
+from contextlib import contextmanager
+from itertools import cycle
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.db import transaction
+
+import factory.random
+import pytest
+
+from translations.factories import (
+    DocumentFactory,
+    IngestionJobFactory,
+    SentenceFactory,
+    TranslationFactory,
+)
+from translations.models import (
+    Document,
+    Sentence,
+    SimilarityBand,
+    Translation,
+    TranslationHistory,
+)
+from translations.search import WORD_PATTERN
+from translations.similarity import build_bands
+from translations.user_stats import rebuild_user_stats
+from users.factories import UserFactory
+
+# Размеры набора данных для проверки бюджетов запросов (документы, предложения на документ):
+# каждая страница проверяется на обоих, и число запросов не должно зависеть от размера.
+# Малый набор все равно больше одной страницы списков
+CORPUS_SIZES = {"small": (30, 30), "large": (200, 100)}
+
+# Статус предложения для статуса его перевода
+SENTENCE_STATUS = {"pending": 1, "approved": 2, "rejected": 3}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кэш статистики не переносится между тестами"""
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    """Экспортированные файлы пишутся во временный каталог"""
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+def build_corpus(documents_count, sentences_per_document):
+    """
+    Документы, предложения, переводы с историей и индекс похожих предложений.
+    Предложения и переводы сохраняются bulk_create, поэтому производные данные пересчитываются в конце.
+    Случайные данные фабрик воспроизводимы: от них зависят, например, найденные похожие предложения
+    """
+    factory.random.reseed_random("ingushtranslate")
+    admin = UserFactory(role="admin")
+    representative = UserFactory(role="representative")
+    translators = UserFactory.create_batch(5, role="translator")
+    correctors = UserFactory.create_batch(3, role="corrector")
+
+    documents = DocumentFactory.create_batch(documents_count, uploaded_by=admin)
+    sentences = []
+    for document, translator, corrector in zip(documents, cycle(translators), cycle(correctors)):
+        batch = SentenceFactory.build_batch(
+            sentences_per_document, document=document, assigned_to=translator, corrector=corrector
+        )
+        for number, sentence in enumerate(batch, 1):
+            sentence.sentence_number = number
+        sentences.extend(batch)
+    # У предложения страницы sentence_detail всегда есть похожее с утвержденным переводом (sentences[2])
+    sentences[1].original_text = sentences[2].original_text
+    sentences[1].set_text_metrics()
+
+    # Половина предложений переведена, переводы распределены по статусам
+    translations = []
+    for sentence, status in zip(sentences[::2], cycle(SENTENCE_STATUS)):
+        sentence.status = SENTENCE_STATUS[status]
+        translations.append(TranslationFactory.build(sentence=sentence, translator=sentence.assigned_to, status=status))
+
+    Sentence.objects.bulk_create(sentences, batch_size=2000)
+    Translation.objects.bulk_create(translations, batch_size=2000)
+    TranslationHistory.objects.bulk_create(
+        (
+            TranslationHistory(
+                translation=translation,
+                translated_text=translation.translated_text,
+                user=translation.translator,
+                action="translated",
+            )
+            for translation in translations
+        ),
+        batch_size=2000,
+    )
+    approved = [translation.sentence for translation in translations if translation.status == "approved"]
+    SimilarityBand.objects.bulk_create(
+        build_bands((sentence.id, sentence.original_text) for sentence in approved), batch_size=2000
+    )
+    Document.objects.update(**Document.progress_counter_subqueries())
+    rebuild_user_stats()
+
+    document = documents[0]
+    # Самое частое слово: поиск по нему дает несколько страниц результатов на наборе любого размера
+    words = Counter(
+        word for sentence in sentences for word in set(WORD_PATTERN.findall(sentence.original_text.lower()))
+    )
+    return SimpleNamespace(
+        admin=admin,
+        representative=representative,
+        translator=translators[0],
+        corrector=correctors[0],
+        document=document,
+        sentence=sentences[1],
+        translated_sentence=sentences[0],
+        search_word=words.most_common(1)[0][0],
+        job=IngestionJobFactory(document=document),
+    )
+
+
+@pytest.fixture(scope="module", params=list(CORPUS_SIZES), ids=[f"{size}-corpus" for size in CORPUS_SIZES])
+def corpus(request, django_db_setup, django_db_blocker):
+    """
+    Набор данных создается один раз на модуль и размер в транзакции, которая откатывается после них.
+    pytest группирует тесты по параметру фикстуры модуля, поэтому все случаи сначала идут на малом наборе
+    """
+    with django_db_blocker.unblock():
+        with transaction.atomic():
+            corpus = build_corpus(*CORPUS_SIZES[request.param])
+            corpus.size = request.param
+            yield corpus
+            transaction.set_rollback(True)
+
+
+# Число запросов каждого случая на малом наборе: {id теста без размера набора: число запросов}
+_small_corpus_queries = {}
+
+
+@pytest.fixture
+def query_budget(request, corpus, django_assert_max_num_queries):
+    """
+    Проверяет бюджет запросов блока и то, что на большом наборе запросов столько же, сколько на малом.
+    Если случай на малом наборе не запускался (например, выбран через -k), проверяется только бюджет
+    """
+    case = request.node.nodeid.replace(f"{corpus.size}-corpus", "")
+
+    @contextmanager
+    def check(budget):
+        with django_assert_max_num_queries(budget) as captured:
+            yield captured
+        queries = len(captured)
+        if corpus.size == "small":
+            _small_corpus_queries[case] = queries
+        elif case in _small_corpus_queries:
+            assert queries == _small_corpus_queries[case], (
+                f"На малом наборе {_small_corpus_queries[case]} запросов, на большом {queries}: "
+                "число запросов зависит от объема данных"
+            )
+
+    return check
@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from translations.models import Document, Sentence, Translation
+from users.models import User
+
+from .stats import invalidate_dashboard_stats
+
+
+@receiver(post_save, sender=Translation)
+@receiver(post_delete, sender=Translation)
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Sentence)
+def invalidate_dashboard_stats_on_change(sender, **kwargs):
+    """Сбрасывает кэш статистики кабинета при изменении переводов, документов и пользователей"""
+    invalidate_dashboard_stats()
+
+
+@receiver(post_save, sender=Sentence)
+def invalidate_dashboard_stats_on_sentence_create(sender, instance, created, **kwargs):
+    """Статистика зависит только от числа предложений, поэтому изменение статуса кэш не сбрасывает"""
+    if created:
+        invalidate_dashboard_stats()
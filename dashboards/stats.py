@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+from translations.batching import current_batch
+from translations.models import Translation
+from users.models import User
+
+DASHBOARD_STATS_CACHE_KEY = "dashboards:stats"
+CACHE_HITS_KEY = "dashboards:stats:hits"
+CACHE_MISSES_KEY = "dashboards:stats:misses"
+
+
+def compute_dashboard_stats() -> dict:
+    """
+    Считает статистику кабинета двумя агрегирующими запросами.
+    Документы и предложения считаются вместе с пользователями: у каждого документа ровно один загрузивший,
+    число предложений берется из счетчиков документов, а не из таблицы предложений.
+    """
+    role_counts = {f"role_{role}": Count("id", filter=Q(role=role), distinct=True) for role, _ in User.ROLE_CHOICES}
+    users = User.objects.aggregate(
+        total_users=Count("id", distinct=True),
+        total_documents=Count("document"),
+        total_sentences=Coalesce(Sum("document__sentences_total"), 0),
+        **role_counts,
+    )
+    translations = Translation.objects.aggregate(
+        total_translations=Count("id"),
+        approved_translations=Count("id", filter=Q(status="approved")),
+        rejected_translations=Count("id", filter=Q(status="rejected")),
+        pending_translations=Count("id", filter=Q(status="pending")),
+    )
+
+    return {
+        "total_users": users["total_users"],
+        "total_documents": users["total_documents"],
+        "total_sentences": users["total_sentences"],
+        **translations,
+        # Как и прежний values("role").annotate(...), без ролей, у которых нет пользователей
+        "users_by_role": [
+            {"role": role, "count": users[f"role_{role}"]} for role, _ in User.ROLE_CHOICES if users[f"role_{role}"]
+        ],
+    }
+
+
+def _increment(key: str) -> None:
+    # add() не перезаписывает существующий счетчик; incr() атомарен в Redis
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Счетчик вытеснен из кэша между add() и incr()
+        cache.set(key, 1, timeout=None)
+
+
+def get_dashboard_stats() -> dict:
+    """Статистика кабинета из кэша; при промахе считается заново и кэшируется на DASHBOARD_STATS_CACHE_TIMEOUT"""
+    stats = cache.get(DASHBOARD_STATS_CACHE_KEY)
+    if stats is not None:
+        _increment(CACHE_HITS_KEY)
+        return stats
+
+    _increment(CACHE_MISSES_KEY)
+    stats = compute_dashboard_stats()
+    cache.set(DASHBOARD_STATS_CACHE_KEY, stats, settings.DASHBOARD_STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_dashboard_stats() -> None:
+    """
+    Сбрасывает кэш статистики после фиксации текущей транзакции, чтобы параллельный запрос
+    не закэшировал данные до коммита. Внутри batched_signals() сброс выполняется один раз на пакет.
+    """
+    batch = current_batch()
+    if batch is not None:
+        batch.call_on_commit(DASHBOARD_STATS_CACHE_KEY, _delete_dashboard_stats)
+    else:
+        transaction.on_commit(_delete_dashboard_stats)
+
+
+def _delete_dashboard_stats() -> None:
+    cache.delete(DASHBOARD_STATS_CACHE_KEY)
+
+
+def get_cache_metrics() -> dict:
+    """Счетчики попаданий и промахов кэша статистики кабинета"""
+    hits = cache.get(CACHE_HITS_KEY, 0)
+    misses = cache.get(CACHE_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 3) if total else None,
+    }
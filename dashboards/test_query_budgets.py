@@ -0,0 +1,116 @@
+"""
+Бюджеты SQL-запросов страниц dashboards/urls.py на малом и большом наборах данных (conftest.corpus).
+Число запросов на обоих наборах одинаково, а запрос на строку (N+1) сразу превышает бюджет.
+"""
+
+from django.template import TemplateDoesNotExist
+from django.urls import reverse
+
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+ROLES = ["admin", "translator", "corrector"]
+
+# Пользователь, метод, url(corpus), данные(corpus), бюджет запросов
+CASES = [
+    pytest.param("admin", "get", lambda c: reverse("dashboards:home"), None, 2, id="home"),
+    pytest.param("admin", "get", lambda c: reverse("dashboards:dashboard"), None, 4, id="dashboard"),
+    pytest.param(
+        "admin",
+        "get",
+        lambda c: reverse("dashboards:dashboard_cache_metrics"),
+        None,
+        2,
+        id="dashboard_cache_metrics",
+    ),
+    pytest.param(
+        "translator",
+        "get",
+        lambda c: reverse("dashboards:translator_dashboard"),
+        None,
+        25,
+        id="translator_dashboard",
+    ),
+    pytest.param(
+        "corrector",
+        "get",
+        lambda c: reverse("dashboards:corrector_dashboard"),
+        None,
+        15,
+        id="corrector_dashboard",
+    ),
+    # Шаблона dashboards/user_statistics.html нет: тест начнет проходить, когда страница появится
+    pytest.param(
+        "admin",
+        "get",
+        lambda c: reverse("dashboards:user_statistics", args=[c.translator.id]),
+        None,
+        10,
+        id="user_statistics",
+        marks=pytest.mark.xfail(raises=TemplateDoesNotExist, strict=True),
+    ),
+    pytest.param("admin", "get", lambda c: reverse("dashboards:user_list"), None, 4, id="user_list"),
+    *[
+        pytest.param(
+            "admin",
+            "get",
+            lambda c, role=role: reverse("dashboards:user_detail", args=[getattr(c, role).id]),
+            None,
+            budget,
+            id=f"user_detail_{role}",
+        )
+        for role, budget in zip(ROLES, [13, 21, 16])
+    ],
+    pytest.param(
+        "admin",
+        "get",
+        lambda c: reverse("dashboards:user_edit", args=[c.translator.id]),
+        None,
+        3,
+        id="user_edit",
+    ),
+    pytest.param(
+        "admin",
+        "post",
+        lambda c: reverse("dashboards:user_edit", args=[c.translator.id]),
+        lambda c: {
+            "username": c.translator.username,
+            "email": c.translator.email,
+            "first_name": "Иван",
+            "last_name": "Иванов",
+            "role": "translator",
+        },
+        6,
+        id="user_edit_post",
+    ),
+    pytest.param("admin", "get", lambda c: reverse("dashboards:user_create"), None, 2, id="user_create"),
+    pytest.param(
+        "admin",
+        "post",
+        lambda c: reverse("dashboards:user_delete", args=[c.representative.id]),
+        None,
+        16,
+        id="user_delete",
+    ),
+    *[
+        pytest.param(
+            "admin",
+            "get",
+            lambda c, role=role: reverse("dashboards:user_export_report", args=[getattr(c, role).id]),
+            None,
+            budget,
+            id=f"user_export_report_{role}",
+        )
+        for role, budget in zip(ROLES, [12, 17, 14])
+    ],
+]
+
+
+@pytest.mark.parametrize("user, method, url, data, budget", CASES)
+def test_query_budget(client, corpus, query_budget, user, method, url, data, budget):
+    client.force_login(getattr(corpus, user))
+    url = url(corpus)
+    with query_budget(budget):
+        response = getattr(client, method)(url, data(corpus) if data else None)
+    assert response.status_code < 400
@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from translations.models import Document, Sentence, Translation
+from users.models import User
+
+from .stats import get_cache_metrics
+
+
+class DashboardStatsCacheTest(TestCase):
+    """Статистика кабинета считается двумя запросами, кэшируется и сбрасывается при записи перевода"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+        cls.translator = User.objects.create_user("translator", "translator@example.com", "password")
+        cls.document = Document.objects.create(
+            file="documents/dashboard.txt",
+            uploaded_by=cls.admin,
+            content_hash="dashboard".ljust(64, "0"),
+            is_processed=True,
+        )
+        Sentence.objects.bulk_create(
+            Sentence(document=cls.document, sentence_number=number, original_text=f"Предложение {number}.")
+            for number in range(1, 4)
+        )
+        cls.document.refresh_progress_counters()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def test_stats_are_cached(self):
+        url = reverse("dashboards:dashboard")
+        # Сессия и пользователь + два агрегирующих запроса статистики
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(response.context["total_users"], 2)
+        self.assertEqual(response.context["total_documents"], 1)
+        self.assertEqual(response.context["total_sentences"], 3)
+        self.assertEqual(
+            response.context["users_by_role"], [{"role": "admin", "count": 1}, {"role": "translator", "count": 1}]
+        )
+
+        with self.assertNumQueries(2):
+            self.client.get(url)
+        self.assertEqual(get_cache_metrics(), {"hits": 1, "misses": 1, "hit_rate": 0.5})
+
+    def test_translation_write_invalidates_cache(self):
+        url = reverse("dashboards:dashboard")
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Translation.objects.create(
+                sentence=Sentence.objects.get(sentence_number=1), translator=self.translator, translated_text="Перевод"
+            )
+
+        response = self.client.get(url)
+        self.assertEqual(response.context["total_translations"], 1)
+        self.assertEqual(response.context["pending_translations"], 1)
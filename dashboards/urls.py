@@ -7,6 +7,7 @@ app_name = "dashboards"
 urlpatterns = [
     path("", views.HomeView.as_view(), name="home"),
     path("dashboard/", views.DashboardView.as_view(), name="dashboard"),
+    path("dashboard/cache-metrics/", views.DashboardCacheMetricsView.as_view(), name="dashboard_cache_metrics"),
     path(
         "translator/",
         views.TranslatorDashboardView.as_view(),
@@ -1,19 +1,20 @@
 import logging
-import os
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count, Q
-from django.http import HttpResponse
+from django.db.models import Count, Prefetch, Q
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.generic import DetailView, ListView, TemplateView, View
 
-from translations.export_utils import export_user_report
-from translations.models import Document, Sentence, Translation
+from translations.downloads import file_download_response
+from translations.export_utils import export_user_report, user_report_filename
+from translations.models import Document, Sentence, Translation, UserStats
 from users.models import User
 
 from .forms import UserForm
 from .mixins import AdminOrRepresentativeMixin, CorrectorOnlyMixin, TranslatorOnlyMixin
+from .stats import get_cache_metrics, get_dashboard_stats
 
 
 class HomeView(View):
@@ -41,19 +42,8 @@ class DashboardView(LoginRequiredMixin, AdminOrRepresentativeMixin, TemplateView
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Общая статистика
-        context["total_users"] = User.objects.count()
-        context["total_documents"] = Document.objects.count()
-        context["total_sentences"] = Sentence.objects.count()
-        context["total_translations"] = Translation.objects.count()
-
-        # Статистика по статусам переводов
-        context["approved_translations"] = Translation.objects.filter(status="approved").count()
-        context["rejected_translations"] = Translation.objects.filter(status="rejected").count()
-        context["pending_translations"] = Translation.objects.filter(status="pending").count()
-
-        # Статистика по ролям пользователей
-        context["users_by_role"] = User.objects.values("role").annotate(count=Count("id"))
+        # Общая статистика, статусы переводов и пользователи по ролям (из кэша)
+        context.update(get_dashboard_stats())
 
         # Последние документы
         context["recent_documents"] = Document.objects.order_by("-uploaded_at")[:5]
@@ -66,6 +56,13 @@ class DashboardView(LoginRequiredMixin, AdminOrRepresentativeMixin, TemplateView
         return context
 
 
+class DashboardCacheMetricsView(LoginRequiredMixin, AdminOrRepresentativeMixin, View):
+    """AJAX view со счетчиками попаданий и промахов кэша статистики кабинета"""
+
+    def get(self, request):
+        return JsonResponse(get_cache_metrics())
+
+
 class UserListView(LoginRequiredMixin, AdminOrRepresentativeMixin, ListView):
     """Список пользователей с возможностью поиска и фильтрации"""
 
@@ -119,166 +116,10 @@ class UserDetailView(LoginRequiredMixin, AdminOrRepresentativeMixin, DetailView)
 
     def get_user_statistics(self, user_obj: User) -> dict:
         """
-        Возвращает статистику по пользователю (слова, символы, предложения)
+        Возвращает статистику по пользователю (слова, символы, предложения).
+        Читается одной строкой UserStats, которую сигналы поддерживают в актуальном состоянии
         """
-        stats = {}
-
-        if user_obj.role == "translator":
-            # Получаем предложения, назначенные переводчику
-            assigned_sentences = Sentence.objects.filter(assigned_to=user_obj)
-            user_translations = Translation.objects.filter(translator=user_obj)
-
-            # Статистика по оригинальным текстам (назначенные предложения)
-            total_words = 0
-            total_characters = 0
-            total_characters_without_spaces = 0
-
-            for sentence in assigned_sentences:
-                # Подсчет слов (разделение по пробелам)
-                words = sentence.original_text.split()
-                total_words += len(words)
-
-                # Подсчет символов с пробелами
-                total_characters += len(sentence.original_text)
-
-                # Подсчет символов без пробелов
-                total_characters_without_spaces += len(sentence.original_text.replace(" ", ""))
-
-            # Статистика по переводам
-            total_translated_words = 0
-            total_translated_characters = 0
-            total_translated_characters_without_spaces = 0
-
-            for translation in user_translations:
-                if translation.translated_text:
-                    # Подсчет слов в переводе
-                    translated_words = translation.translated_text.split()
-                    total_translated_words += len(translated_words)
-
-                    # Подсчет символов в переводе
-                    total_translated_characters += len(translation.translated_text)
-
-                    # Подсчет символов без пробелов в переводе
-                    total_translated_characters_without_spaces += len(translation.translated_text.replace(" ", ""))
-
-            stats = {
-                "total_sentences": assigned_sentences.count(),
-                "translated_sentences": user_translations.count(),
-                "total_words": total_words,
-                "total_characters": total_characters,
-                "total_characters_without_spaces": total_characters_without_spaces,
-                "total_translated_words": total_translated_words,
-                "total_translated_characters": total_translated_characters,
-                "total_translated_characters_without_spaces": total_translated_characters_without_spaces,
-            }
-
-        elif user_obj.role == "corrector":
-            # Получаем переводы, проверенные корректором
-            user_corrections = Translation.objects.filter(sentence__corrector=user_obj)
-
-            # Статистика по оригинальным текстам (предложения с проверенными переводами)
-            total_words = 0
-            total_characters = 0
-            total_characters_without_spaces = 0
-
-            for correction in user_corrections:
-                sentence = correction.sentence
-                # Подсчет слов (разделение по пробелам)
-                words = sentence.original_text.split()
-                total_words += len(words)
-
-                # Подсчет символов с пробелами
-                total_characters += len(sentence.original_text)
-
-                # Подсчет символов без пробелов
-                total_characters_without_spaces += len(sentence.original_text.replace(" ", ""))
-
-            # Статистика по переводам
-            total_translated_words = 0
-            total_translated_characters = 0
-            total_translated_characters_without_spaces = 0
-
-            for correction in user_corrections:
-                if correction.translated_text:
-                    # Подсчет слов в переводе
-                    translated_words = correction.translated_text.split()
-                    total_translated_words += len(translated_words)
-
-                    # Подсчет символов в переводе
-                    total_translated_characters += len(correction.translated_text)
-
-                    # Подсчет символов без пробелов в переводе
-                    total_translated_characters_without_spaces += len(correction.translated_text.replace(" ", ""))
-
-            stats = {
-                "total_sentences": user_corrections.count(),
-                "translated_sentences": user_corrections.count(),
-                "total_words": total_words,
-                "total_characters": total_characters,
-                "total_characters_without_spaces": total_characters_without_spaces,
-                "total_translated_words": total_translated_words,
-                "total_translated_characters": total_translated_characters,
-                "total_translated_characters_without_spaces": total_translated_characters_without_spaces,
-            }
-
-        elif user_obj.role in ["admin", "representative"]:
-            # Получаем документы, загруженные пользователем
-            user_documents = Document.objects.filter(uploaded_by=user_obj)
-
-            # Статистика по всем предложениям в загруженных документах
-            total_words = 0
-            total_characters = 0
-            total_characters_without_spaces = 0
-
-            for document in user_documents:
-                for sentence in document.sentences.all():
-                    # Подсчет слов (разделение по пробелам)
-                    words = sentence.original_text.split()
-                    total_words += len(words)
-
-                    # Подсчет символов с пробелами
-                    total_characters += len(sentence.original_text)
-
-                    # Подсчет символов без пробелов
-                    total_characters_without_spaces += len(sentence.original_text.replace(" ", ""))
-
-            # Статистика по переводам в загруженных документах
-            total_translated_words = 0
-            total_translated_characters = 0
-            total_translated_characters_without_spaces = 0
-
-            for document in user_documents:
-                for sentence in document.sentences.filter(translation__isnull=False):
-                    if sentence.translation and sentence.translation.translated_text:
-                        # Подсчет слов в переводе
-                        translated_words = sentence.translation.translated_text.split()
-                        total_translated_words += len(translated_words)
-
-                        # Подсчет символов в переводе
-                        total_translated_characters += len(sentence.translation.translated_text)
-
-                        # Подсчет символов без пробелов в переводе
-                        total_translated_characters_without_spaces += len(
-                            sentence.translation.translated_text.replace(" ", "")
-                        )
-
-            total_sentences = sum(doc.sentences.count() for doc in user_documents)
-            translated_sentences = sum(
-                doc.sentences.filter(translation__isnull=False).count() for doc in user_documents
-            )
-
-            stats = {
-                "total_sentences": total_sentences,
-                "translated_sentences": translated_sentences,
-                "total_words": total_words,
-                "total_characters": total_characters,
-                "total_characters_without_spaces": total_characters_without_spaces,
-                "total_translated_words": total_translated_words,
-                "total_translated_characters": total_translated_characters,
-                "total_translated_characters_without_spaces": total_translated_characters_without_spaces,
-            }
-
-        return stats
+        return UserStats.for_user(user_obj)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -286,9 +127,15 @@ class UserDetailView(LoginRequiredMixin, AdminOrRepresentativeMixin, DetailView)
 
         # Статистика пользователя
         context["user_documents"] = Document.objects.filter(uploaded_by=user_obj)
-        context["user_sentences"] = Sentence.objects.filter(assigned_to=user_obj)
-        context["user_translations"] = Translation.objects.filter(translator=user_obj)
-        context["user_corrections"] = Translation.objects.filter(sentence__corrector=user_obj)
+        context["user_sentences"] = Sentence.objects.filter(assigned_to=user_obj).select_related(
+            "document", "translation"
+        )
+        context["user_translations"] = Translation.objects.filter(translator=user_obj).select_related(
+            "sentence__document"
+        )
+        context["user_corrections"] = Translation.objects.filter(sentence__corrector=user_obj).select_related(
+            "sentence__document"
+        )
 
         # Статистика по статусам переводов
         user_translations = context["user_translations"]
@@ -566,30 +413,22 @@ class UserExportReportView(LoginRequiredMixin, AdminOrRepresentativeMixin, View)
         user_detail_view = UserDetailView()
         user_detail_view.object = user
         context_data = user_detail_view.get_context_data()
+        # Отчет выводит все предложения документов: загружаем их вместе с переводами двумя запросами
+        context_data["user_documents"] = context_data["user_documents"].prefetch_related(
+            Prefetch("sentences", queryset=Sentence.objects.select_related("translation"))
+        )
         user_stats = user_detail_view.get_user_statistics(user)
 
         try:
             file_path = export_user_report(user, user_stats, context_data)
-
-            # Проверяем, что файл существует
-            if not os.path.exists(file_path):
-                raise FileNotFoundError("Файл отчета не был создан")
-
-            # Читаем файл и отправляем как ответ
-            with open(file_path, "rb") as f:
-                response = HttpResponse(
-                    f.read(),
-                    content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                )
-                response["Content-Disposition"] = f'attachment; filename="{os.path.basename(file_path)}"'
-
-            # Удаляем временный файл
-            try:
-                os.remove(file_path)
-            except OSError:
-                pass  # Игнорируем ошибки при удалении временного файла
-
-            return response
+            # Файл отчета отдается потоком и удаляется после отправки
+            return file_download_response(
+                request,
+                file_path,
+                filename=user_report_filename(user),
+                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                delete=True,
+            )
 
         except Exception as e:
             import traceback
@@ -99,6 +99,27 @@ else:
         }
     }
 
+# Кэш: Redis в production (REDIS_URL), память процесса в development
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL"),
+            "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Время жизни закэшированной статистики кабинета (секунды); при изменениях данных кэш сбрасывается сразу
+DASHBOARD_STATS_CACHE_TIMEOUT = int(os.environ.get("DASHBOARD_STATS_CACHE_TIMEOUT", "60"))
+# Статистика документа кэшируется по версии его содержимого (Document.stats_version), устаревшие ключи просто истекают
+DOCUMENT_STATS_CACHE_TIMEOUT = int(os.environ.get("DOCUMENT_STATS_CACHE_TIMEOUT", "86400"))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -141,6 +162,12 @@ STATICFILES_DIRS = [
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Обработчики загрузки считают SHA-256 файла во время приема для поиска дубликатов
+FILE_UPLOAD_HANDLERS = [
+    "translations.upload_handlers.HashingMemoryFileUploadHandler",
+    "translations.upload_handlers.HashingTemporaryFileUploadHandler",
+]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -151,6 +178,31 @@ LOGIN_URL = "/users/login/"
 LOGIN_REDIRECT_URL = "/dashboard/"
 LOGOUT_REDIRECT_URL = "/users/login/"
 
+# Очередь фоновых задач (Celery)
+# Без CELERY_BROKER_URL задачи выполняются синхронно в процессе (для тестов и локальной разработки)
+CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", "")
+CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND", "")
+CELERY_TASK_ALWAYS_EAGER = os.environ.get("CELERY_TASK_ALWAYS_EAGER", str(not CELERY_BROKER_URL)).lower() == "true"
+CELERY_TASK_EAGER_PROPAGATES = True
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Разбор XLSX: каждая текстовая ячейка - отдельное предложение (без объединения и повторного разбиения)
+XLSX_CELL_AS_SENTENCE = os.environ.get("XLSX_CELL_AS_SENTENCE", "False").lower() == "true"
+
+# Разбор DOCX: добавлять абзацы верхних и нижних колонтитулов после основного текста
+DOCX_INCLUDE_HEADERS_FOOTERS = os.environ.get("DOCX_INCLUDE_HEADERS_FOOTERS", "False").lower() == "true"
+
+# Движок XLSX-экспорта: "xlsxwriter" (потоковая запись, память не зависит от размера) или "openpyxl" (прежний)
+XLSX_EXPORT_ENGINE = os.environ.get("XLSX_EXPORT_ENGINE", "xlsxwriter")
+
+# Число процессов, в которых форматы экспорта "все форматы" формируются параллельно
+EXPORT_PROCESSES = int(os.environ.get("EXPORT_PROCESSES", "4"))
+
+# Сколько секунд выгрузка документа хранится для докачки прерванного скачивания (Range)
+EXPORT_RESUME_SECONDS = int(os.environ.get("EXPORT_RESUME_SECONDS", "3600"))
+
 # Логирование
 LOGGING = {
     "version": 1,
@@ -1,16 +1,22 @@
-import os
-
 from django.contrib import admin, messages
-from django.http import HttpResponse
 from django.shortcuts import redirect
 from django.utils.html import format_html
 
+from .downloads import can_resume, file_download_response
 from .export_utils import (
-    export_document_all_formats,
-    export_document_translations,
+    build_document_export,
+    document_export_path,
+    export_filename,
     get_document_statistics,
 )
-from .models import Document, Sentence, Translation, TranslationHistory
+from .models import (
+    Document,
+    IngestionJob,
+    Sentence,
+    Translation,
+    TranslationHistory,
+    UserStats,
+)
 
 
 class TranslationInline(admin.TabularInline):
@@ -56,7 +62,7 @@ class DocumentAdmin(admin.ModelAdmin):
     ]
     list_filter = ["is_processed", "uploaded_at", "uploaded_by__role"]
     search_fields = ["file", "uploaded_by__first_name", "uploaded_by__last_name"]
-    readonly_fields = ["uploaded_at"]
+    readonly_fields = ["uploaded_at", "content_hash", *Document.PROGRESS_COUNTER_FIELDS]
     actions = [
         "export_selected_to_txt",
         "export_selected_to_docx",
@@ -65,7 +71,7 @@ class DocumentAdmin(admin.ModelAdmin):
     ]
 
     def sentences_count(self, obj):
-        return obj.sentences.count()
+        return obj.sentences_total
 
     sentences_count.short_description = "Количество предложений"
 
@@ -75,106 +81,42 @@ class DocumentAdmin(admin.ModelAdmin):
 
     completion_percentage.short_description = "Процент завершения"
 
+    def _export_selected(self, request, queryset, format_type, format_name):
+        """Отдает экспорт одного выбранного документа потоком; файл хранится для докачки EXPORT_RESUME_SECONDS"""
+        if len(queryset) != 1:
+            messages.warning(request, f"Пожалуйста, выберите только один документ для экспорта {format_name}.")
+            return redirect("admin:translations_document_changelist")
+        document = queryset.first()
+        try:
+            file_path = document_export_path(document, format_type)
+            if not can_resume(request, file_path):
+                build_document_export(document, format_type)
+            return file_download_response(request, file_path, filename=export_filename(document, format_type))
+        except Exception as e:
+            messages.error(request, f"Ошибка при экспорте: {str(e)}")
+            return redirect("admin:translations_document_changelist")
+
     def export_selected_to_txt(self, request, queryset):
         """Экспорт выбранных документов в TXT формат"""
-        if len(queryset) == 1:
-            document = queryset.first()
-            try:
-                file_path = export_document_translations(document, "txt")
-                with open(file_path, "rb") as f:
-                    response = HttpResponse(f.read(), content_type="application/octet-stream")
-                    response["Content-Disposition"] = f'attachment; filename="{os.path.basename(file_path)}"'
-
-                # Удаляем временный файл
-                os.remove(file_path)
-                return response
-            except Exception as e:
-                messages.error(request, f"Ошибка при экспорте: {str(e)}")
-                return redirect("admin:translations_document_changelist")
-        else:
-            messages.warning(request, "Пожалуйста, выберите только один документ для экспорта в TXT.")
-            return redirect("admin:translations_document_changelist")
+        return self._export_selected(request, queryset, "txt", "в TXT")
 
     export_selected_to_txt.short_description = "Экспорт в TXT"
 
     def export_selected_to_docx(self, request, queryset):
-        """Экспорт выбранных документов в DOCX формат"""
-        if len(queryset) == 1:
-            document = queryset.first()
-            try:
-                file_path = export_document_translations(document, "docx")
-                with open(file_path, "rb") as f:
-                    response = HttpResponse(
-                        f.read(),
-                        content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                    )
-                    response["Content-Disposition"] = f'attachment; filename="{os.path.basename(file_path)}"'
-
-                # Удаляем временный файл
-                os.remove(file_path)
-                return response
-            except Exception as e:
-                messages.error(request, f"Ошибка при экспорте: {str(e)}")
-                return redirect("admin:translations_document_changelist")
-        else:
-            messages.warning(
-                request,
-                "Пожалуйста, выберите только один документ для экспорта в DOCX.",
-            )
-            return redirect("admin:translations_document_changelist")
+        """Экспорт выбранных документов в DOCX формат (таблица оригинал/перевод)"""
+        return self._export_selected(request, queryset, "docx_table", "в DOCX")
 
     export_selected_to_docx.short_description = "Экспорт в DOCX"
 
     def export_selected_to_xlsx(self, request, queryset):
         """Экспорт выбранных документов в XLSX формат"""
-        if len(queryset) == 1:
-            document = queryset.first()
-            try:
-                file_path = export_document_translations(document, "xlsx")
-                with open(file_path, "rb") as f:
-                    response = HttpResponse(
-                        f.read(),
-                        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    )
-                    response["Content-Disposition"] = f'attachment; filename="{os.path.basename(file_path)}"'
-
-                # Удаляем временный файл
-                os.remove(file_path)
-                return response
-            except Exception as e:
-                messages.error(request, f"Ошибка при экспорте: {str(e)}")
-                return redirect("admin:translations_document_changelist")
-        else:
-            messages.warning(
-                request,
-                "Пожалуйста, выберите только один документ для экспорта в XLSX.",
-            )
-            return redirect("admin:translations_document_changelist")
+        return self._export_selected(request, queryset, "xlsx", "в XLSX")
 
     export_selected_to_xlsx.short_description = "Экспорт в XLSX"
 
     def export_selected_all_formats(self, request, queryset):
         """Экспорт выбранных документов во всех форматах в ZIP архиве"""
-        if len(queryset) == 1:
-            document = queryset.first()
-            try:
-                file_path = export_document_all_formats(document)
-                with open(file_path, "rb") as f:
-                    response = HttpResponse(f.read(), content_type="application/zip")
-                    response["Content-Disposition"] = f'attachment; filename="{os.path.basename(file_path)}"'
-
-                # Удаляем временный файл
-                os.remove(file_path)
-                return response
-            except Exception as e:
-                messages.error(request, f"Ошибка при экспорте: {str(e)}")
-                return redirect("admin:translations_document_changelist")
-        else:
-            messages.warning(
-                request,
-                "Пожалуйста, выберите только один документ для экспорта во всех форматах.",
-            )
-            return redirect("admin:translations_document_changelist")
+        return self._export_selected(request, queryset, "all", "во всех форматах")
 
     export_selected_all_formats.short_description = "Экспорт во всех форматах (ZIP)"
 
@@ -273,3 +215,20 @@ class TranslationHistoryAdmin(admin.ModelAdmin):
     search_fields = ["translated_text", "notes", "user__first_name", "user__last_name"]
     readonly_fields = ["created_at"]
     list_per_page = 100
+
+
+@admin.register(IngestionJob)
+class IngestionJobAdmin(admin.ModelAdmin):
+    list_display = ["document", "status", "parsed", "inserted", "total", "created_at", "updated_at"]
+    list_filter = ["status", "created_at"]
+    readonly_fields = ["created_at", "updated_at"]
+    list_select_related = ["document"]
+
+
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ["user", "role", "sentences", "words", "translated_sentences", "translated_words", "updated_at"]
+    list_filter = ["role"]
+    list_select_related = ["user"]
+    # Счетчики поддерживаются сигналами и командой rebuild_user_stats
+    readonly_fields = ["user", "role", *UserStats.COUNTER_FIELDS, "updated_at"]
@@ -7,4 +7,5 @@ class TranslationsConfig(AppConfig):
     verbose_name = "Предложения и переводы"
 
     def ready(self):
+        import translations.checks
         import translations.signals
@@ -0,0 +1,118 @@
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import Document, SimilarityBand, TranslationHistory, UserStats
+from .similarity import build_bands
+
+_current_batch: ContextVar[Optional["SignalBatch"]] = ContextVar("translations_signal_batch", default=None)
+
+
+class SignalBatch:
+    """
+    Отложенные побочные эффекты сигналов translations.signals.
+    Сигналы складывают сюда изменения вместо немедленных запросов, flush() применяет их разом.
+    """
+
+    def __init__(self):
+        self.documents: Dict[int, Document] = {}
+        self.counter_deltas: Dict[int, Counter] = defaultdict(Counter)
+        self.counter_refresh: Set[int] = set()
+        self.stats_versions: Set[int] = set()
+        self.history: List[TranslationHistory] = []
+        self.similarity: Dict[int, Optional[str]] = {}
+        self.commit_callbacks: Dict[str, Callable[[], None]] = {}
+        self.user_stats: Dict[Tuple[int, str], Counter] = defaultdict(Counter)
+
+    def touch_document(self, document: Document) -> None:
+        """Статус документа нужно пересчитать"""
+        self.documents.setdefault(document.pk, document)
+
+    def change_progress_counters(self, document: Document, old_status=None, new_status=None) -> None:
+        self.touch_document(document)
+        self.counter_deltas[document.pk].update(Document.progress_counter_deltas(old_status, new_status))
+
+    def refresh_progress_counters(self, document: Document) -> None:
+        """Счетчики документа нужно пересчитать полностью (после массовых вставок и удалений)"""
+        self.touch_document(document)
+        self.counter_refresh.add(document.pk)
+        self.stats_versions.add(document.pk)
+
+    def bump_stats_version(self, document: Document) -> None:
+        """Версию статистики документа нужно увеличить: одним UPDATE на все документы пакета"""
+        self.stats_versions.add(document.pk)
+
+    def add_history(self, history: TranslationHistory) -> None:
+        self.history.append(history)
+
+    def update_similarity(self, sentence_id: int, text: Optional[str]) -> None:
+        """Переиндексировать предложение (text) или убрать его из индекса похожих (None)"""
+        self.similarity[sentence_id] = text
+
+    def change_user_stats(self, deltas: Dict[Tuple[int, str], Counter]) -> None:
+        """Приращения статистики пользователей суммируются и применяются одним UPDATE на строку UserStats"""
+        for key, values in deltas.items():
+            self.user_stats[key].update(values)
+
+    def call_on_commit(self, key: str, callback: Callable[[], None]) -> None:
+        """Вызвать callback после фиксации транзакции один раз на пакет (повторы с тем же key пропускаются)"""
+        self.commit_callbacks.setdefault(key, callback)
+
+    def flush(self) -> None:
+        with transaction.atomic():
+            if self.history:
+                TranslationHistory.objects.bulk_create(self.history)
+
+            if self.similarity:
+                SimilarityBand.objects.filter(sentence_id__in=self.similarity).delete()
+                indexed = [(sentence_id, text) for sentence_id, text in self.similarity.items() if text is not None]
+                SimilarityBand.objects.bulk_create(build_bands(indexed))
+
+            for document_id, document in self.documents.items():
+                if document_id in self.counter_refresh:
+                    document.refresh_progress_counters()
+                else:
+                    document.apply_progress_counter_deltas(self.counter_deltas.get(document_id, {}))
+                document.update_status()
+
+            if self.stats_versions:
+                Document.objects.filter(pk__in=self.stats_versions).update(stats_version=F("stats_version") + 1)
+                for document_id in self.stats_versions & self.documents.keys():
+                    self.documents[document_id].__dict__.pop("stats_version", None)
+
+            if self.user_stats:
+                UserStats.apply_deltas(self.user_stats)
+
+            for callback in self.commit_callbacks.values():
+                transaction.on_commit(callback)
+
+
+def current_batch() -> Optional[SignalBatch]:
+    """Активный пакет сигналов или None, если сигналы обрабатываются сразу"""
+    return _current_batch.get()
+
+
+@contextmanager
+def batched_signals() -> Iterator[SignalBatch]:
+    """
+    Откладывает пересчет статуса документов, сдвиг счетчиков, записи истории переводов,
+    обновление индекса похожих предложений и статистики пользователей до выхода из блока:
+    статус пересчитывается один раз на документ, история сохраняется одним bulk_create.
+    Вложенные блоки используют внешний пакет. При исключении отложенные изменения отбрасываются.
+    """
+    batch = _current_batch.get()
+    if batch is not None:
+        yield batch
+        return
+
+    batch = SignalBatch()
+    token = _current_batch.set(batch)
+    try:
+        yield batch
+    finally:
+        _current_batch.reset(token)
+    batch.flush()
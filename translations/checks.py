@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Кэши, содержимое которых видно только в процессе, записавшем его
+PROCESS_LOCAL_CACHE_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+@register(Tags.caches)
+def check_ingestion_progress_cache(app_configs, **kwargs):
+    """
+    Прогресс загрузки документа воркер передает веб-процессу через кэш.
+    С настоящим брокером Celery кэш должен быть общим для процессов, иначе прогресс не виден до завершения задачи.
+    """
+    if getattr(settings, "CELERY_TASK_ALWAYS_EAGER", True):
+        return []
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend in PROCESS_LOCAL_CACHE_BACKENDS:
+        return [
+            Error(
+                f"Кэш {backend} не виден воркеру Celery: прогресс загрузки документов не будет отображаться.",
+                hint="Задайте REDIS_URL вместе с CELERY_BROKER_URL или включите CELERY_TASK_ALWAYS_EAGER.",
+                id="translations.E001",
+            )
+        ]
+    return []
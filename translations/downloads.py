@@ -0,0 +1,142 @@
+import mimetypes
+import os
+import re
+import zlib
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+from django.http import FileResponse, HttpResponse
+from django.utils.text import slugify
+
+# Размер блока, которым тело файла отдается серверу
+DOWNLOAD_BLOCK_SIZE = 64 * 1024
+
+# Поддерживается один диапазон: bytes=начало-конец, bytes=начало- или bytes=-длина_хвоста
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class _FileRange:
+    """Читает length байт файла с позиции start; close() закрывает файл и удаляет его, если он временный"""
+
+    def __init__(self, path: str, start: int, length: int, delete: bool):
+        self.path = path
+        self.delete = delete
+        self.remaining = length
+        self.file = open(path, "rb")
+        self.file.seek(start)
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self) -> None:
+        self.file.close()
+        if self.delete:
+            _remove(self.path)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _file_etag(path: str) -> str:
+    """
+    ETag по пути, времени изменения и размеру файла, без чтения содержимого.
+    Пересобранный файл получает новый ETag: докачка по прежнему ETag получает файл целиком,
+    а не склеивает части разных сборок
+    """
+    stat = os.stat(path)
+    return f'"{zlib.crc32(os.fsencode(path)):x}-{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def can_resume(request, path: str) -> bool:
+    """Запрос докачивает файл path: есть Range, а If-Range совпадает с ETag текущего файла"""
+    if not request.META.get("HTTP_RANGE"):
+        return False
+    try:
+        return request.META.get("HTTP_IF_RANGE") == _file_etag(path)
+    except FileNotFoundError:
+        return False
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Диапазон (начало, конец включительно) из заголовка Range для файла размером size.
+    None - заголовок не поддерживается и файл отдается целиком; ValueError - диапазон за пределами файла.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError("Пустой диапазон")
+        start, end = max(size - suffix, 0), size - 1
+    if start >= size:
+        raise ValueError("Диапазон за пределами файла")
+    return start, end
+
+
+def attachment_header(filename: str) -> str:
+    """Content-Disposition для скачивания: ASCII-имя для старых клиентов и полное имя в filename* (RFC 6266)"""
+    stem, ext = os.path.splitext(filename)
+    fallback = f"{slugify(stem, allow_unicode=False) or 'file'}{ext}"
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def file_download_response(
+    request, path: str, filename: Optional[str] = None, content_type: Optional[str] = None, delete: bool = False
+) -> HttpResponse:
+    """
+    Отдает файл path как вложение блоками по DOWNLOAD_BLOCK_SIZE: память не зависит от размера файла.
+    Поддерживает докачку: Range с одним диапазоном учитывается только вместе с совпавшим If-Range.
+    С delete=True файл одноразовый: он удаляется, когда сервер закроет ответ, поэтому докачка
+    не предлагается (нет Accept-Ranges и ETag) и Range не учитывается.
+    """
+    filename = filename or os.path.basename(path)
+    if content_type is None:
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        if content_type == "text/plain":
+            content_type = "text/plain; charset=utf-8"
+    size = os.path.getsize(path)
+    etag = None if delete else _file_etag(path)
+
+    start, end = 0, size - 1
+    range_header = request.META.get("HTTP_RANGE")
+    byte_range = None
+    if etag and range_header and size and request.META.get("HTTP_IF_RANGE") == etag:
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+    if byte_range is not None:
+        start, end = byte_range
+
+    response = FileResponse(
+        _FileRange(path, start, end - start + 1, delete),
+        content_type=content_type,
+        status=206 if byte_range is not None else 200,
+    )
+    response.block_size = DOWNLOAD_BLOCK_SIZE
+    response["Content-Length"] = end - start + 1
+    response["Content-Disposition"] = attachment_header(filename)
+    if etag:
+        response["Accept-Ranges"] = "bytes"
+        response["ETag"] = etag
+    if byte_range is not None:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
@@ -1,26 +1,137 @@
 import csv
+import functools
+import io
+import itertools
 import logging
+import multiprocessing
 import os
+import pickle
+import re
 import shutil
 import tempfile
+import time
 import zipfile
-from typing import Dict, List, Tuple
-
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import (
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+from xml.sax.saxutils import escape
+
+import django
+from django.conf import settings
+from django.core.cache import cache
 from django.core.files.storage import default_storage
-from django.http import HttpResponse
-from django.utils.encoding import smart_str
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
 
 import docx
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
 import openpyxl
-import re
+import xlsxwriter
+from docx.oxml import OxmlElement
+from docx.text.paragraph import Paragraph
 
-from .models import Document
-import logging
+from users.models import User
+
+from .models import Document, Sentence
 
 docx_logger = logging.getLogger("docx_export")
 
+# Строк, читаемых из базы за один раз при потоковом экспорте
+EXPORT_CHUNK_SIZE = 2000
+
+USER_ROLE_LABELS = dict(User.ROLE_CHOICES)
+
+# Поля строки экспорта в одном запросе: предложение, перевод, переводчик и корректор
+EXPORT_ROW_FIELDS = (
+    "sentence_number",
+    "original_text",
+    "translation__translated_text",
+    "translation__status",
+    "translation__translated_at",
+    "translation__corrected_at",
+    "translation__translator__first_name",
+    "translation__translator__last_name",
+    "translation__translator__role",
+    "corrector__first_name",
+    "corrector__last_name",
+    "corrector__role",
+)
+
+
+class ExportRow(NamedTuple):
+    """Строка экспорта документа; translated_text равен None, если перевода нет"""
+
+    number: int
+    original_text: str
+    translated_text: Optional[str]
+    status: Optional[str]
+    translated_at: Optional[datetime]
+    corrected_at: Optional[datetime]
+    translator: str
+    corrector: str
+
+
+# Куда пишет формат экспорта: путь к файлу или открытый двоичный поток (например, запись ZIP-архива)
+ExportOutput = Union[str, BinaryIO]
+
+
+def _user_label(first_name: str, last_name: str, role: str) -> str:
+    """Подпись пользователя как str(User), без загрузки объекта"""
+    return f"{first_name} {last_name} ({USER_ROLE_LABELS.get(role, role)})"
+
+
+def iter_export_rows(document: Document) -> Iterator[ExportRow]:
+    """
+    Строки экспорта по порядку предложений: один запрос, читается блоками по EXPORT_CHUNK_SIZE.
+    Форматы экспорта принимают эти строки параметром rows; без него каждый формат читает их сам
+    """
+    rows = (
+        document.sentences.order_by("sentence_number")
+        .values_list(*EXPORT_ROW_FIELDS)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for values in rows:
+        translator, corrector = values[6:9], values[9:]
+        yield ExportRow(
+            *values[:6],
+            translator=_user_label(*translator) if translator[2] else "",
+            corrector=_user_label(*corrector) if corrector[2] else "",
+        )
+
+
+def write_rows_snapshot(rows: Iterable[ExportRow], file: BinaryIO) -> int:
+    """
+    Записывает строки экспорта в двоичный файл-снимок блоками по EXPORT_CHUNK_SIZE (pickle).
+    В памяти одновременно только один блок; возвращает число строк
+    """
+    total = 0
+    for chunk in iter(lambda: list(itertools.islice(rows, EXPORT_CHUNK_SIZE)), []):
+        pickle.dump(chunk, file, protocol=pickle.HIGHEST_PROTOCOL)
+        total += len(chunk)
+    return total
+
+
+def iter_rows_snapshot(path: str) -> Iterator[ExportRow]:
+    """Строки экспорта из снимка write_rows_snapshot() в исходном порядке"""
+    with open(path, "rb") as file:
+        while True:
+            try:
+                chunk = pickle.load(file)
+            except EOFError:
+                return
+            yield from chunk
+
+
 # Кеш для скомпилированных regex-паттернов (толерантных к пробелам)
 _REPLACEMENT_REGEX_CACHE: Dict[str, re.Pattern] = {}
 
@@ -102,75 +213,99 @@ def _generate_sentence_variants(text: str) -> List[str]:
     return variants
 
 
-def export_to_txt(document: Document, output_path: str) -> str:
+def export_to_txt(
+    document: Document, output_path: ExportOutput, rows: Optional[Iterable[ExportRow]] = None
+) -> ExportOutput:
     """
     Экспортирует переводы документа в TXT файл
     """
-    sentences = document.sentences.all().order_by("sentence_number")
+    if rows is None:
+        rows = iter_export_rows(document)
 
-    with open(output_path, "w", encoding="utf-8") as file:
-        for sentence in sentences:
-            original_text = sentence.original_text or ""
-            translated_text = sentence.translation.translated_text if sentence.has_translation else ""
-            file.write(f"\t{original_text}\t{translated_text}\n")
+    if isinstance(output_path, str):
+        file = open(output_path, "w", encoding="utf-8")
+    else:
+        file = io.TextIOWrapper(output_path, encoding="utf-8")
+    with file:
+        for row in rows:
+            file.write(f"\t{row.original_text or ''}\t{row.translated_text or ''}\n")
 
     return output_path
 
 
-def _create_tc(text: str) -> OxmlElement:
-    tc = OxmlElement("w:tc")
-    p = OxmlElement("w:p")
-    r = OxmlElement("w:r")
-    t = OxmlElement("w:t")
-    text = text or ""
-    # Сохраняем пробелы, если есть ведущие/замыкающие
-    if text.strip() != text:
-        t.set(qn("xml:space"), "preserve")
-    t.text = text
-    r.append(t)
-    p.append(r)
-    tc.append(p)
-    return tc
-
+# Заголовки таблицы DOCX-экспорта: №, Оригинал, Перевод
+DOCX_TABLE_HEADERS = ["№", "Оригинал", "Перевод"]
 
-def _append_row_fast(table, values):
-    tr = OxmlElement("w:tr")
-    for v in values:
-        tr.append(_create_tc(str(v) if v is not None else ""))
-    table._tbl.append(tr)
+# Символы, недопустимые в XML 1.0: lxml отказывается их сериализовать, поэтому они удаляются
+_XML_INVALID_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+# Кроме &, <, > lxml экранирует возврат каретки
+_XML_TEXT_ENTITIES = {"\r": "&#13;"}
 
 
-def export_to_docx(document: Document, output_path: str) -> str:
+@functools.lru_cache(maxsize=None)
+def _docx_table_template() -> Tuple[Tuple[Tuple[str, bytes], ...], bytes, bytes]:
     """
-    Экспортирует переводы документа в DOCX файл в виде таблицы
+    Пакет python-docx с таблицей "Table Grid" и строкой заголовков, собирается один раз на процесс.
+    Возвращает части пакета и word/document.xml, разрезанный после строки заголовков:
+    строки данных вставляются между половинами
     """
-    docx_logger.info(f"Начало экспорта DOCX (таблица) для документа id={document.id} title='{document.title}'")
     doc = docx.Document()
+    table = doc.add_table(rows=1, cols=len(DOCX_TABLE_HEADERS))
+    table.style = "Table Grid"
+    for cell, header in zip(table.rows[0].cells, DOCX_TABLE_HEADERS):
+        cell.text = header
+    buffer = io.BytesIO()
+    doc.save(buffer)
 
-    sentences = list(document.sentences.all().order_by("sentence_number"))
-    total_rows = len(sentences)
-    docx_logger.info(f"Создание таблицы на {total_rows} строк (+1 заголовок)")
+    with zipfile.ZipFile(buffer) as package:
+        parts = tuple((name, package.read(name)) for name in package.namelist())
+    head, tail = dict(parts)["word/document.xml"].split(b"</w:tbl>", 1)
+    return parts, head, b"</w:tbl>" + tail
 
-    # Таблица с заголовками: №, Оригинал, Перевод
-    table = doc.add_table(rows=1, cols=3)
-    table.style = "Table Grid"
-    header_cells = table.rows[0].cells
-    header_cells[0].text = "№"
-    header_cells[1].text = "Оригинал"
-    header_cells[2].text = "Перевод"
-
-    # Быстрый режим добавления строк через oxml (значительно быстрее для больших таблиц)
-    for idx, sentence in enumerate(sentences, start=1):
-        orig = sentence.original_text or ""
-        trans = sentence.translation.translated_text if sentence.has_translation else ""
-        _append_row_fast(table, [sentence.sentence_number, orig, trans])
-        if idx % 1000 == 0:
-            docx_logger.info(f"Заполнено строк: {idx}/{total_rows}")
-    docx_logger.info(f"Сформирована таблица: строк={total_rows}; путь сохранения='{output_path}'")
 
+def _docx_cell(text: str) -> str:
+    """Ячейка таблицы в той же разметке, что строит python-docx"""
+    text = _XML_INVALID_CHARS.sub("", text)
+    # Сохраняем пробелы, если есть ведущие/замыкающие
+    space = ' xml:space="preserve"' if text.strip() != text else ""
+    return f"<w:tc><w:p><w:r><w:t{space}>{escape(text, _XML_TEXT_ENTITIES)}</w:t></w:r></w:p></w:tc>"
+
+
+def export_to_docx(
+    document: Document, output_path: ExportOutput, rows: Optional[Iterable[ExportRow]] = None
+) -> ExportOutput:
+    """
+    Экспортирует переводы документа в DOCX файл в виде таблицы.
+    word/document.xml пишется в архив построчно по мере чтения предложений из базы,
+    поэтому память не зависит от размера документа
+    """
+    docx_logger.info(f"Начало экспорта DOCX (таблица) для документа id={document.id} title='{document.title}'")
+    parts, head, tail = _docx_table_template()
+    if rows is None:
+        rows = iter_export_rows(document)
+
+    total_rows = 0
     try:
-        doc.save(output_path)
-        docx_logger.info(f"DOCX (таблица) сохранен: '{output_path}'")
+        with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as package:
+            for name, content in parts:
+                if name != "word/document.xml":
+                    package.writestr(name, content)
+                    continue
+                with package.open(name, "w") as document_xml:
+                    document_xml.write(head)
+                    chunk = []
+                    for row in rows:
+                        cells = (str(row.number), row.original_text or "", row.translated_text or "")
+                        chunk.append("<w:tr>" + "".join(_docx_cell(text) for text in cells) + "</w:tr>")
+                        if len(chunk) == EXPORT_CHUNK_SIZE:
+                            document_xml.write("".join(chunk).encode())
+                            total_rows += len(chunk)
+                            chunk = []
+                            docx_logger.info(f"Записано строк: {total_rows}")
+                    document_xml.write("".join(chunk).encode())
+                    total_rows += len(chunk)
+                    document_xml.write(tail)
+        docx_logger.info(f"DOCX (таблица) сохранен: строк={total_rows}; путь='{output_path}'")
     except Exception as e:
         docx_logger.exception(f"Ошибка сохранения DOCX (таблица): {e}")
         raise
@@ -265,46 +400,66 @@ def _replace_in_wt_elements(doc: docx.Document, replacements: List[Tuple[str, st
             t.text = text
 
 
-def export_to_docx_translated_only(document: Document, original_docx_path: str, output_path: str) -> str:
+def _has_valid_translation(row: ExportRow) -> bool:
+    # Более строгая проверка: перевод должен существовать и содержать осмысленный текст (минимум 3 символа)
+    return bool(row.translated_text) and len(row.translated_text.strip()) >= 3
+
+
+def _paragraph_appender(doc: docx.Document):
+    """
+    Добавляет абзацы в конец тела документа, как doc.add_paragraph.
+    doc.add_paragraph ищет w:sectPr перебором всех элементов тела, и документ на N абзацев собирается за O(N^2)
+    """
+    sect_pr = doc.element.body.sectPr
+
+    def add_paragraph(text: str = "") -> Paragraph:
+        p = OxmlElement("w:p")
+        if sect_pr is not None:
+            sect_pr.addprevious(p)
+        else:
+            doc.element.body.append(p)
+        paragraph = Paragraph(p, doc._body)
+        if text:
+            paragraph.add_run(text)
+        return paragraph
+
+    return add_paragraph
+
+
+def export_to_docx_translated_only(
+    document: Document, output_path: ExportOutput, rows: Optional[Iterable[ExportRow]] = None
+) -> ExportOutput:
     """
-    Создает DOCX с переведенным текстом, сохраняя структуру исходного документа.
-    Если исходный файл недоступен или замена не работает корректно, создает новый документ.
+    Создает новый DOCX с полным текстом перевода: абзац на предложение,
+    непереведенные предложения идут в оригинале с пометкой [НЕ ПЕРЕВЕДЕНО]
     """
     docx_logger.info(f"Начало экспорта DOCX (переведенный текст) для документа id={document.id} title='{document.title}'")
     
     # Получаем все предложения с переводами
-    sentences = list(document.sentences.all().order_by("sentence_number"))
-    # Более строгая проверка: перевод должен существовать и содержать осмысленный текст (минимум 3 символа)
-    translated_sentences = [s for s in sentences if hasattr(s, 'translation') and s.translation and s.translation.translated_text and len(s.translation.translated_text.strip()) >= 3]
+    sentences = list(iter_export_rows(document) if rows is None else rows)
+    translated_sentences = [row for row in sentences if _has_valid_translation(row)]
     
     docx_logger.info(f"Всего предложений: {len(sentences)}, с переводами: {len(translated_sentences)}")
 
     
     # Создаем новый документ
     doc = docx.Document()
+    add_paragraph = _paragraph_appender(doc)
     
     # Добавляем переведенные предложения
     if len(sentences) == 0:
-        doc.add_paragraph("Нет предложений для перевода.")
+        add_paragraph("Нет предложений для перевода.")
     else:
         for sentence in sentences:
-            # Более строгая проверка наличия перевода (минимум 3 символа для осмысленного перевода)
-            has_valid_translation = (
-                hasattr(sentence, 'translation') and 
-                sentence.translation and 
-                sentence.translation.translated_text and 
-                len(sentence.translation.translated_text.strip()) >= 3
-            )
-            
-            if has_valid_translation:
+            if _has_valid_translation(sentence):
                 # Добавляем переведенный текст
-                translated_text = sentence.translation.translated_text.strip()
-                doc.add_paragraph(translated_text)
+                translated_text = sentence.translated_text.strip()
+                add_paragraph(translated_text)
             else:
                 # Если перевода нет, добавляем оригинальный текст с пометкой
                 original_text = sentence.original_text.strip()
                 if original_text:
-                    paragraph = doc.add_paragraph()
+                    paragraph = add_paragraph()
                     paragraph.add_run(f"[НЕ ПЕРЕВЕДЕНО] ").bold = True
                     paragraph.add_run(original_text).italic = True
     
@@ -319,66 +474,99 @@ def export_to_docx_translated_only(document: Document, original_docx_path: str,
     return output_path
 
 
-def export_to_xlsx(document: Document, output_path: str) -> str:
+# Лист "Переводы" XLSX-экспорта: заголовки, подписи статусов перевода (остальные - "На проверке")
+XLSX_HEADERS = [
+    "№",
+    "Оригинальный текст",
+    "Переведенный текст",
+    "Переводчик",
+    "Корректор",
+    "Статус",
+    "Дата перевода",
+    "Дата корректировки",
+]
+XLSX_STATUS_LABELS = {"approved": "Одобрен", "rejected": "Отклонен"}
+XLSX_MAX_COLUMN_WIDTH = 50
+
+
+def export_to_xlsx(
+    document: Document, output_path: ExportOutput, rows: Optional[Iterable[ExportRow]] = None
+) -> ExportOutput:
     """
-    Экспортирует переводы документа в XLSX файл
+    Экспортирует переводы документа в XLSX файл движком settings.XLSX_EXPORT_ENGINE
     """
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = "Переводы"
+    return _xlsx_writer()(document, output_path, rows)
 
-    # Заголовки
-    headers = [
-        "№",
-        "Оригинальный текст",
-        "Переведенный текст",
-        "Переводчик",
-        "Корректор",
-        "Статус",
-        "Дата перевода",
-        "Дата корректировки",
-    ]
 
-    for col, header in enumerate(headers, 1):
-        sheet.cell(row=1, column=col, value=header)
+def _xlsx_writer():
+    """Функция XLSX-экспорта для движка settings.XLSX_EXPORT_ENGINE"""
+    if getattr(settings, "XLSX_EXPORT_ENGINE", "xlsxwriter") == "openpyxl":
+        return export_to_xlsx_openpyxl
+    return export_to_xlsx_xlsxwriter
 
-    # Данные
-    sentences = document.sentences.all().order_by("sentence_number")
 
-    for row, sentence in enumerate(sentences, 2):
-        sheet.cell(row=row, column=1, value=sentence.sentence_number)
-        sheet.cell(row=row, column=2, value=sentence.original_text)
+def _xlsx_rows(rows: Iterable[ExportRow]) -> Iterator[list]:
+    """Значения ячеек строк листа "Переводы" """
+    for row in rows:
+        if row.translated_text is None:
+            yield [row.number, row.original_text, "Не переведено"]
+            continue
+        yield [
+            row.number,
+            row.original_text,
+            row.translated_text,
+            row.translator,
+            row.corrector,
+            XLSX_STATUS_LABELS.get(row.status, "На проверке"),
+            row.translated_at.strftime("%Y-%m-%d %H:%M"),
+            row.corrected_at.strftime("%Y-%m-%d %H:%M") if row.corrected_at else "",
+        ]
 
-        if sentence.has_translation:
-            translation = sentence.translation
-            sheet.cell(row=row, column=3, value=translation.translated_text)
-            sheet.cell(row=row, column=4, value=str(translation.translator))
-            sheet.cell(
-                row=row,
-                column=5,
-                value=str(sentence.corrector) if sentence.corrector else "",
-            )
 
-            # Статус
-            if translation.status == "approved":
-                status = "Одобрен"
-            elif translation.status == "rejected":
-                status = "Отклонен"
+def export_to_xlsx_xlsxwriter(
+    document: Document, output_path: ExportOutput, rows: Optional[Iterable[ExportRow]] = None
+) -> ExportOutput:
+    """
+    Экспортирует переводы документа в XLSX через XlsxWriter в режиме constant_memory:
+    строки уходят на диск по мере чтения из базы, ширина столбцов считается в том же проходе
+    """
+    if rows is None:
+        rows = iter_export_rows(document)
+    workbook = xlsxwriter.Workbook(output_path, {"constant_memory": True})
+    sheet = workbook.add_worksheet("Переводы")
+    widths = [0] * len(XLSX_HEADERS)
+
+    for row, values in enumerate(itertools.chain([XLSX_HEADERS], _xlsx_rows(rows))):
+        for col, value in enumerate(values):
+            if isinstance(value, str):
+                # Пустая строка - пустая ячейка, как в openpyxl
+                if value:
+                    sheet.write_string(row, col, value)
             else:
-                status = "На проверке"
-            sheet.cell(row=row, column=6, value=status)
-            sheet.cell(
-                row=row,
-                column=7,
-                value=translation.translated_at.strftime("%Y-%m-%d %H:%M"),
-            )
-            sheet.cell(
-                row=row,
-                column=8,
-                value=(translation.corrected_at.strftime("%Y-%m-%d %H:%M") if translation.corrected_at else ""),
-            )
-        else:
-            sheet.cell(row=row, column=3, value="Не переведено")
+                sheet.write_number(row, col, value)
+            widths[col] = max(widths[col], len(str(value)))
+
+    for col, width in enumerate(widths):
+        sheet.set_column(col, col, min(width + 2, XLSX_MAX_COLUMN_WIDTH))
+    workbook.close()
+    return output_path
+
+
+def export_to_xlsx_openpyxl(
+    document: Document, output_path: ExportOutput, rows: Optional[Iterable[ExportRow]] = None
+) -> ExportOutput:
+    """
+    Экспортирует переводы документа в XLSX через openpyxl: вся книга собирается в памяти
+    """
+    if rows is None:
+        rows = iter_export_rows(document)
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Переводы"
+
+    sheet.append(XLSX_HEADERS)
+    for values in _xlsx_rows(rows):
+        sheet.append(values)
 
     # Автоматическая ширина столбцов
     for column in sheet.columns:
@@ -390,156 +578,219 @@ def export_to_xlsx(document: Document, output_path: str) -> str:
                     max_length = len(str(cell.value))
             except Exception:
                 continue
-        adjusted_width = min(max_length + 2, 50)
+        adjusted_width = min(max_length + 2, XLSX_MAX_COLUMN_WIDTH)
         sheet.column_dimensions[column_letter].width = adjusted_width
 
     workbook.save(output_path)
     return output_path
 
 
-def export_document_translations(document: Document, format_type: str) -> str:
+# Окончания имен файлов экспорта документа по форматам; "all" - ZIP со всеми форматами
+EXPORT_FILENAME_SUFFIXES = {
+    "txt": "_(inh).txt",
+    "docx_table": "_table_(inh).docx",
+    "docx_translated": "_full_(inh).docx",
+    "xlsx": "_(inh).xlsx",
+    "all": "_(inh)_all_formats.zip",
+}
+
+
+def export_filename(document: Document, format_type: str) -> str:
+    """Имя файла экспорта документа для скачивания (Content-Disposition)"""
+    if format_type not in EXPORT_FILENAME_SUFFIXES:
+        raise ValueError(f"Неподдерживаемый формат экспорта: {format_type}")
+    return f"{document.title.replace(' ', '_')}{EXPORT_FILENAME_SUFFIXES[format_type]}"
+
+
+def _new_export_path(suffix: str) -> str:
     """
-    Основная функция для экспорта переводов документа
+    Новый файл с уникальным именем в каталоге exports: одновременные выгрузки одного документа
+    пишут и удаляют каждая свой файл. Читаемое имя передается отдельно, только в Content-Disposition
     """
-    # Создаем папку для экспорта, если её нет
     export_dir = os.path.join(default_storage.location, "exports")
     os.makedirs(export_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=export_dir, suffix=suffix)
+    os.close(fd)
+    return path
 
-    # Генерируем базовые имена
-    base_name = f"{document.title.replace(' ', '_')}"  # для не-DOCX
-    docx_base_name = document.title.replace(' ', '_')  # для DOCX именования по требованию
-
-    if format_type == "txt":
-        output_path = os.path.join(export_dir, f"{base_name}_(inh).txt")
-        return export_to_txt(document, output_path)
-    elif format_type == "docx_table":
-        output_path = os.path.join(export_dir, f"{docx_base_name}_table_(inh).docx")
-        return export_to_docx(document, output_path)
-    elif format_type == "docx_translated":
-        output_path = os.path.join(export_dir, f"{docx_base_name}_full_(inh).docx")
-        # Используем новую логику создания документа с переведенным текстом
-        # Пытаемся использовать исходный DOCX для совместимости с сигнатурой функции
-        original_path = None
-        try:
-            if document.file and document.file.name.lower().endswith(".docx"):
-                original_path = default_storage.path(document.file.name)
-        except Exception:
-            original_path = None
-
-        # Если исходный файл не найден, используем пустую строку
-        if not original_path or not os.path.exists(original_path):
-            original_path = ""
-            
-        return export_to_docx_translated_only(document, original_path, output_path)
-    elif format_type == "xlsx":
-        output_path = os.path.join(export_dir, f"{base_name}_(inh).xlsx")
-        return export_to_xlsx(document, output_path)
-    else:
+
+def export_document_translations(document: Document, format_type: str) -> str:
+    """
+    Основная функция для экспорта переводов документа.
+    Возвращает путь к новому файлу; имя для скачивания дает export_filename()
+    """
+    if format_type == "all" or format_type not in EXPORT_FILENAME_SUFFIXES:
         raise ValueError(f"Неподдерживаемый формат экспорта: {format_type}")
 
+    output_path = _new_export_path(os.path.splitext(EXPORT_FILENAME_SUFFIXES[format_type])[1])
+    try:
+        if format_type == "txt":
+            export_to_txt(document, output_path)
+        elif format_type == "docx_table":
+            export_to_docx(document, output_path)
+        elif format_type == "docx_translated":
+            export_to_docx_translated_only(document, output_path)
+        else:
+            export_to_xlsx(document, output_path)
+    except Exception:
+        os.remove(output_path)
+        raise
+    return output_path
+
+
+# Процессы формата "все форматы" запускаются заново (spawn), а не копируются из веб-процесса (fork):
+# копия унаследовала бы его соединения с базой и потоки. Рабочие процессы базу не читают
+EXPORT_PROCESS_START_METHOD = "spawn"
+
+
+def _render_from_snapshot(export, document: Document, snapshot_path: str, output_path: str) -> str:
+    """Рабочий процесс экспорта "все форматы": один формат из снимка строк"""
+    return export(document, output_path, iter_rows_snapshot(snapshot_path))
+
 
 def export_document_all_formats(document: Document) -> str:
     """
-    Экспортирует документ во всех поддерживаемых форматах и упаковывает в ZIP архив
+    Экспортирует документ во всех поддерживаемых форматах и упаковывает в ZIP архив.
+    Строки документа читаются одним запросом во временный файл-снимок, поэтому все форматы соответствуют
+    одному состоянию документа, а память не зависит от его размера. Форматы собираются из снимка
+    параллельно в отдельных процессах (Python-код форматов не распараллеливается потоками из-за GIL),
+    и общее время близко ко времени самого медленного формата
+    """
+    # Генерируем базовое имя файлов в архиве; для DOCX — схема именования, основанная на названии документа
+    base_name = f"translation_{document.id}_{document.title.replace(' ', '_')}"
+    docx_base_name = document.title.replace(" ", "_")
+    writers = [
+        (f"{base_name}.txt", export_to_txt),
+        (f"{docx_base_name}_table_(inh).docx", export_to_docx),
+        (f"{docx_base_name}_full_(inh).docx", export_to_docx_translated_only),
+        # Движок выбирается здесь: переопределения настроек не видны в новых процессах
+        (f"{base_name}.xlsx", _xlsx_writer()),
+    ]
+
+    snapshot_path = _new_export_path(".rows")
+    parts = []
+    zip_path = None
+    try:
+        with open(snapshot_path, "wb") as snapshot:
+            write_rows_snapshot(iter_export_rows(document), snapshot)
+
+        parts = [_new_export_path(os.path.splitext(name)[1]) for name, _ in writers]
+        workers = max(1, min(len(writers), getattr(settings, "EXPORT_PROCESSES", 4)))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(EXPORT_PROCESS_START_METHOD),
+            initializer=django.setup,
+        ) as pool:
+            futures = [
+                pool.submit(_render_from_snapshot, export, document, snapshot_path, part)
+                for (_, export), part in zip(writers, parts)
+            ]
+            for future in futures:
+                future.result()
+
+        zip_path = _new_export_path(".zip")
+        with zipfile.ZipFile(zip_path, "w") as zipf:
+            for (name, _), part in zip(writers, parts):
+                entry = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+                entry.external_attr = 0o644 << 16
+                # DOCX и XLSX уже сжаты (это ZIP-пакеты), повторно сжимается только TXT
+                entry.compress_type = zipfile.ZIP_DEFLATED if name.endswith(".txt") else zipfile.ZIP_STORED
+                with open(part, "rb") as source, zipf.open(entry, "w") as output:
+                    shutil.copyfileobj(source, output, 1024 * 1024)
+    except Exception:
+        if zip_path:
+            os.remove(zip_path)
+        raise
+    finally:
+        for path in [snapshot_path, *parts]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    return zip_path
+
+
+def document_export_path(document: Document, format_type: str) -> str:
+    """
+    Постоянный путь выгрузки документа: документ, версия его содержимого и формат.
+    Прерванное скачивание докачивается из этого же файла, пока он не пересобран
     """
-    # Создаем временную директорию для файлов
-    with tempfile.TemporaryDirectory() as temp_dir:
-        # Генерируем базовое имя файла
-        base_name = f"translation_{document.id}_{document.title.replace(' ', '_')}"
-
-        # Экспортируем во все форматы
-        txt_path = os.path.join(temp_dir, f"{base_name}.txt")
-        # Для DOCX — используем схему именования, основанную на названии документа
-        docx_base_name = document.title.replace(' ', '_')
-        docx_table_path = os.path.join(temp_dir, f"{docx_base_name}_table_(inh).docx")
-        docx_translated_path = os.path.join(temp_dir, f"{docx_base_name}_full_(inh).docx")
-        xlsx_path = os.path.join(temp_dir, f"{base_name}.xlsx")
-
-        # Создаем файлы
-        export_to_txt(document, txt_path)
-        export_to_docx(document, docx_table_path)
-        # Сгенерировать translated_only DOCX
-        original_path = None
-        try:
-            if document.file and document.file.name.lower().endswith(".docx"):
-                original_path = default_storage.path(document.file.name)
-        except Exception:
-            original_path = None
-
-        # Если исходный файл не найден, используем пустую строку
-        if not original_path or not os.path.exists(original_path):
-            original_path = ""
-            
-        export_to_docx_translated_only(document, original_path, docx_translated_path)
-
-        export_to_xlsx(document, xlsx_path)
-
-        # Создаем ZIP архив
-        zip_path = os.path.join(temp_dir, f"{base_name}_all_formats.zip")
-
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-            # Добавляем файлы в архив
-            zipf.write(txt_path, os.path.basename(txt_path))
-            zipf.write(docx_table_path, os.path.basename(docx_table_path))
-            zipf.write(docx_translated_path, os.path.basename(docx_translated_path))
-            zipf.write(xlsx_path, os.path.basename(xlsx_path))
-
-        # Копируем архив в постоянную директорию
-        export_dir = os.path.join(default_storage.location, "exports")
-        os.makedirs(export_dir, exist_ok=True)
-
-        final_zip_path = os.path.join(export_dir, f"{base_name}_all_formats.zip")
-
-        # Копируем файл
-        shutil.copy2(zip_path, final_zip_path)
-
-        return final_zip_path
+    if format_type not in EXPORT_FILENAME_SUFFIXES:
+        raise ValueError(f"Неподдерживаемый формат экспорта: {format_type}")
+    ext = os.path.splitext(EXPORT_FILENAME_SUFFIXES[format_type])[1]
+    return os.path.join(
+        default_storage.location, "exports", f"document_{document.pk}_v{document.stats_version}_{format_type}{ext}"
+    )
+
+
+def build_document_export(document: Document, format_type: str) -> str:
+    """
+    Собирает выгрузку заново и атомарно подменяет файл document_export_path(): скачивание, начатое раньше,
+    дочитывает прежний файл. Выгрузки старше EXPORT_RESUME_SECONDS удаляются
+    """
+    path = document_export_path(document, format_type)
+    if format_type == "all":
+        built_path = export_document_all_formats(document)
+    else:
+        built_path = export_document_translations(document, format_type)
+    os.replace(built_path, path)
+    _remove_expired_exports()
+    return path
+
+
+def _remove_expired_exports() -> None:
+    """Удаляет постоянные выгрузки, время докачки которых истекло"""
+    cutoff = time.time() - getattr(settings, "EXPORT_RESUME_SECONDS", 60 * 60)
+    with os.scandir(os.path.join(default_storage.location, "exports")) as entries:
+        for entry in entries:
+            try:
+                if entry.name.startswith("document_") and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+def document_statistics_cache_key(document: Document) -> str:
+    return f"translations:document_stats:{document.pk}:{document.stats_version}"
 
 
 def get_document_statistics(document: Document) -> Dict:
     """
-    Возвращает статистику по документу
+    Возвращает статистику по документу из кэша. Ключ включает версию содержимого документа,
+    которую сигналы увеличивают при записи предложений и переводов, поэтому явный сброс не нужен
     """
-    total_sentences = document.sentences.count()
-    translated_sentences = document.sentences.filter(translation__isnull=False).count()
-    approved_sentences = document.sentences.filter(translation__status="approved").count()
-    rejected_sentences = document.sentences.filter(translation__status="rejected").count()
-    pending_sentences = document.sentences.filter(translation__status="pending").count()
-
-    # Статистика по словам и знакам в предложениях
-    sentences = document.sentences.all()
-    total_words = 0
-    total_characters = 0
-    total_characters_without_spaces = 0
-
-    for sentence in sentences:
-        # Подсчет слов (разделение по пробелам)
-        words = sentence.original_text.split()
-        total_words += len(words)
-
-        # Подсчет символов с пробелами
-        total_characters += len(sentence.original_text)
-
-        # Подсчет символов без пробелов
-        total_characters_without_spaces += len(sentence.original_text.replace(" ", ""))
-
-    # Статистика по словам и знакам в переводах
-    translations = document.sentences.filter(translation__isnull=False)
-    total_translated_words = 0
-    total_translated_characters = 0
-    total_translated_characters_without_spaces = 0
-
-    for sentence in translations:
-        if sentence.translation:
-            # Подсчет слов в переводе
-            translated_words = sentence.translation.translated_text.split()
-            total_translated_words += len(translated_words)
-
-            # Подсчет символов в переводе
-            total_translated_characters += len(sentence.translation.translated_text)
-
-            # Подсчет символов без пробелов в переводе
-            total_translated_characters_without_spaces += len(sentence.translation.translated_text.replace(" ", ""))
+    key = document_statistics_cache_key(document)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_document_statistics(document)
+        cache.set(key, stats, settings.DOCUMENT_STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def compute_document_statistics(document: Document) -> Dict:
+    """
+    Считает статистику по документу
+    """
+    # Одним агрегирующим запросом по сохраненным метрикам предложений и переводов, без загрузки текстов
+    stats = document.sentences.order_by().aggregate(
+        total_sentences=Count("id"),
+        translated_sentences=Count("translation"),
+        approved_sentences=Count("translation", filter=Q(translation__status="approved")),
+        rejected_sentences=Count("translation", filter=Q(translation__status="rejected")),
+        pending_sentences=Count("translation", filter=Q(translation__status="pending")),
+        total_words=Coalesce(Sum("word_count"), 0),
+        total_characters=Coalesce(Sum("character_count"), 0),
+        total_characters_without_spaces=Coalesce(Sum("character_count_no_spaces"), 0),
+        total_translated_words=Coalesce(Sum("translation__word_count"), 0),
+        total_translated_characters=Coalesce(Sum("translation__character_count"), 0),
+        total_translated_characters_without_spaces=Coalesce(Sum("translation__character_count_no_spaces"), 0),
+    )
+    total_sentences = stats["total_sentences"]
+    translated_sentences = stats["translated_sentences"]
+    approved_sentences = stats["approved_sentences"]
+    total_words = stats["total_words"]
+    total_characters = stats["total_characters"]
+    total_translated_words = stats["total_translated_words"]
+    total_translated_characters = stats["total_translated_characters"]
 
     # Средние показатели
     average_words_per_sentence = total_words / total_sentences if total_sentences > 0 else 0
@@ -552,17 +803,7 @@ def get_document_statistics(document: Document) -> Dict:
     )
 
     return {
-        "total_sentences": total_sentences,
-        "translated_sentences": translated_sentences,
-        "approved_sentences": approved_sentences,
-        "rejected_sentences": rejected_sentences,
-        "pending_sentences": pending_sentences,
-        "total_words": total_words,
-        "total_characters": total_characters,
-        "total_characters_without_spaces": total_characters_without_spaces,
-        "total_translated_words": total_translated_words,
-        "total_translated_characters": total_translated_characters,
-        "total_translated_characters_without_spaces": total_translated_characters_without_spaces,
+        **stats,
         "average_words_per_sentence": round(average_words_per_sentence, 1),
         "average_characters_per_sentence": round(average_characters_per_sentence, 1),
         "average_translated_words_per_translation": round(average_translated_words_per_translation, 1),
@@ -578,35 +819,65 @@ def get_document_statistics(document: Document) -> Dict:
     }
 
 
-def export_sentences_to_csv(queryset):
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = "attachment; filename=sentences.csv"
-    writer = csv.writer(response)
-    writer.writerow(
-        [
-            "Документ",
-            "№ предложения",
-            "Оригинальный текст",
-            "Статус",
-            "Назначено",
-            "Перевод",
-            "Дата создания",
-            "Дата обновления",
+# Заголовки CSV-экспорта предложений и поля values_list, из которых собирается строка
+SENTENCES_CSV_HEADERS = [
+    "Документ",
+    "№ предложения",
+    "Оригинальный текст",
+    "Статус",
+    "Назначено",
+    "Перевод",
+    "Дата создания",
+    "Дата обновления",
+]
+SENTENCES_CSV_FIELDS = (
+    "document__file",
+    "sentence_number",
+    "original_text",
+    "status",
+    "assigned_to__first_name",
+    "assigned_to__last_name",
+    "translation__translated_text",
+    "created_at",
+    "updated_at",
+)
+
+
+class _EchoBuffer:
+    """Псевдобуфер для csv.writer: write() возвращает готовую строку CSV вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def _sentences_csv_rows(queryset):
+    """Строки CSV предложений queryset; объекты моделей не создаются, в памяти один блок строк"""
+    statuses = dict(Sentence.STATUS_CHOICES)
+    rows = queryset.values_list(*SENTENCES_CSV_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    yield SENTENCES_CSV_HEADERS
+    for file_name, number, original_text, status, first_name, last_name, translated_text, created, updated in rows:
+        yield [
+            Document.title_from_file(file_name),
+            number,
+            original_text,
+            statuses.get(status, status),
+            f"{first_name or ''} {last_name or ''}".strip(),
+            translated_text or "",
+            created.strftime("%d.%m.%Y %H:%M"),
+            updated.strftime("%d.%m.%Y %H:%M"),
         ]
+
+
+def export_sentences_to_csv(queryset):
+    """
+    Потоковый CSV-экспорт предложений: первая строка уходит клиенту сразу,
+    память не зависит от числа предложений
+    """
+    writer = csv.writer(_EchoBuffer())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in _sentences_csv_rows(queryset)), content_type="text/csv"
     )
-    for s in queryset:
-        writer.writerow(
-            [
-                smart_str(s.document.title),
-                s.sentence_number,
-                smart_str(s.original_text),
-                s.get_status_display(),
-                smart_str(s.assigned_to.get_full_name() if s.assigned_to else ""),
-                smart_str(s.translation.translated_text if hasattr(s, "translation") else ""),
-                s.created_at.strftime("%d.%m.%Y %H:%M"),
-                s.updated_at.strftime("%d.%m.%Y %H:%M"),
-            ]
-        )
+    response["Content-Disposition"] = "attachment; filename=sentences.csv"
     return response
 
 
@@ -879,7 +1150,7 @@ def export_user_report_to_xlsx(user_obj, user_stats, context_data, output_path:
                                 max_length = len(str(cell.value))
                         except Exception:
                             continue
-                    adjusted_width = min(max_length + 2, 50)
+                    adjusted_width = min(max_length + 2, XLSX_MAX_COLUMN_WIDTH)
                     worksheet.column_dimensions[column_letter].width = adjusted_width
 
         # Лист с предложениями
@@ -1035,21 +1306,23 @@ def export_user_report_to_xlsx(user_obj, user_stats, context_data, output_path:
         raise
 
 
+def user_report_filename(user_obj, format_type: str = "xlsx") -> str:
+    """Имя файла отчета по пользователю для скачивания"""
+    return f"user_report_{user_obj.id}_{user_obj.username.replace(' ', '_')}.{format_type}"
+
+
 def export_user_report(user_obj, user_stats, context_data, format_type: str = "xlsx") -> str:
     """
     Основная функция для экспорта отчета по пользователю
     """
     try:
-        # Создаем папку для экспорта, если её нет
-        export_dir = os.path.join(default_storage.location, "exports")
-        os.makedirs(export_dir, exist_ok=True)
-
-        # Генерируем имя файла
-        base_name = f"user_report_{user_obj.id}_{user_obj.username.replace(' ', '_')}"
-
         if format_type == "xlsx":
-            output_path = os.path.join(export_dir, f"{base_name}.xlsx")
-            return export_user_report_to_xlsx(user_obj, user_stats, context_data, output_path)
+            output_path = _new_export_path(".xlsx")
+            try:
+                return export_user_report_to_xlsx(user_obj, user_stats, context_data, output_path)
+            except Exception:
+                os.remove(output_path)
+                raise
         else:
             raise ValueError(f"Неподдерживаемый формат экспорта: {format_type}")
     except Exception as e:
@@ -0,0 +1,61 @@
+import factory
+
+from users.factories import UserFactory
+
+from .models import Document, IngestionJob, Sentence, Translation
+
+
+class DocumentFactory(factory.django.DjangoModelFactory):
+    """Обработанный документ: content_hash задан, поэтому файл не читается и фоновая обработка не запускается"""
+
+    class Meta:
+        model = Document
+
+    file = factory.Sequence(lambda n: f"documents/document{n}.txt")
+    uploaded_by = factory.SubFactory(UserFactory, role="admin")
+    content_hash = factory.Sequence(lambda n: f"{n:064x}")
+    is_processed = True
+
+
+class SentenceFactory(factory.django.DjangoModelFactory):
+    """
+    Предложение документа. Для больших объемов используйте build_batch() и bulk_create():
+    метрики текста тогда заполняет set_text_metrics(), а счетчики документа - refresh_progress_counters()
+    """
+
+    class Meta:
+        model = Sentence
+        skip_postgeneration_save = True
+
+    document = factory.SubFactory(DocumentFactory)
+    sentence_number = factory.Sequence(lambda n: n + 1)
+    original_text = factory.Faker("sentence", nb_words=10, locale="ru_RU")
+
+    @factory.post_generation
+    def text_metrics(sentence, create, extracted, **kwargs):
+        if not create:
+            sentence.set_text_metrics()
+
+
+class TranslationFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Translation
+        skip_postgeneration_save = True
+
+    sentence = factory.SubFactory(SentenceFactory)
+    translator = factory.SubFactory(UserFactory)
+    translated_text = factory.Faker("sentence", nb_words=8)
+    status = "pending"
+
+    @factory.post_generation
+    def text_metrics(translation, create, extracted, **kwargs):
+        if not create:
+            translation.set_text_metrics()
+
+
+class IngestionJobFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = IngestionJob
+
+    document = factory.SubFactory(DocumentFactory)
+    status = "completed"
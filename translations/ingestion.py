@@ -0,0 +1,173 @@
+import logging
+import os
+import time
+from dataclasses import dataclass
+from itertools import islice
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .batching import batched_signals
+from .memory import find_approved_translations
+from .models import Document, IngestionJob, Sentence, UserStats
+from .user_stats import created_sentences_deltas, removing_sentences
+from .utils import detect_file_encoding, iter_validated_sentences
+
+logger = logging.getLogger(__name__)
+
+# Количество предложений в одном INSERT
+INGESTION_BATCH_SIZE = 1000
+
+
+@dataclass
+class IngestionResult:
+    """Итог загрузки предложений документа"""
+
+    document_id: int
+    sentences: int
+    elapsed: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.sentences / self.elapsed if self.elapsed > 0 else float(self.sentences)
+
+
+def ingest_document(
+    document: Document,
+    batch_size: int = INGESTION_BATCH_SIZE,
+    progress: Optional[Callable[..., None]] = None,
+    xlsx_cell_as_sentence: Optional[bool] = None,
+    docx_headers_footers: Optional[bool] = None,
+) -> IngestionResult:
+    """
+    Потоково разбирает файл документа один раз и в одной транзакции сохраняет предложения пачками bulk_create,
+    не держа весь документ в памяти. Статус документа пересчитывается один раз в конце.
+    progress(parsed=..., inserted=..., total=...) вызывается после каждой пачки: parsed - разобрано предложений,
+    inserted - сохранено, total - оценка общего числа предложений по доле прочитанных байтов файла.
+    xlsx_cell_as_sentence (по умолчанию settings.XLSX_CELL_AS_SENTENCE) - считать ячейку XLSX одним предложением.
+    docx_headers_footers (по умолчанию settings.DOCX_INCLUDE_HEADERS_FOOTERS) - добавлять абзацы колонтитулов DOCX.
+    """
+    started = time.perf_counter()
+    if xlsx_cell_as_sentence is None:
+        xlsx_cell_as_sentence = getattr(settings, "XLSX_CELL_AS_SENTENCE", False)
+    if docx_headers_footers is None:
+        docx_headers_footers = getattr(settings, "DOCX_INCLUDE_HEADERS_FOOTERS", False)
+
+    file_path = default_storage.path(document.file.name)
+    file_extension = os.path.splitext(document.file.name)[1]
+    # Кодировка TXT определяется один раз и сохраняется в документе для повторной обработки
+    if file_extension.lower() == ".txt" and not document.encoding:
+        document.encoding = detect_file_encoding(file_path)
+    file_size = os.path.getsize(file_path)
+
+    with open(file_path, "rb") as source:
+        sentences_data = iter_validated_sentences(
+            source,
+            file_extension,
+            xlsx_cell_as_sentence,
+            docx_headers_footers,
+            txt_encoding=document.encoding or None,
+        )
+
+        def estimated_total(parsed):
+            """Оценка числа предложений по доле уже прочитанных байтов файла"""
+            position = source.tell()
+            return max(parsed, round(parsed * file_size / position)) if position else None
+
+        # Первая пачка разбирается до начала транзакции: ошибки открытия файла не затрагивают базу
+        batch = list(islice(sentences_data, batch_size))
+        parsed = len(batch)
+        if progress:
+            progress(parsed=parsed, inserted=0, total=estimated_total(parsed))
+
+        # Удаление прежних предложений, вставка новых и пересчет счетчиков фиксируются одной транзакцией:
+        # если файл не удалось дочитать, у документа остаются прежние предложения и счетчики.
+        # Прогресс передается через progress(), не дожидаясь фиксации.
+        total = 0
+        with transaction.atomic():
+            # Повторная обработка заменяет ранее извлеченные предложения
+            previous = Sentence.objects.filter(document=document)
+            with removing_sentences(previous):
+                previous.delete()
+
+            while batch:
+                sentences = [
+                    Sentence(
+                        document=document,
+                        sentence_number=sentence_number,
+                        original_text=sentence_text,
+                    )
+                    for sentence_number, sentence_text in batch
+                ]
+                for sentence in sentences:
+                    sentence.set_text_metrics()
+                # Память переводов: утвержденные переводы совпадающих предложений ищутся одним запросом на пачку
+                suggestions = find_approved_translations(sentence.text_hash for sentence in sentences)
+                for sentence in sentences:
+                    sentence.suggested_translation = suggestions.get(sentence.text_hash, "")
+
+                Sentence.objects.bulk_create(sentences)
+                UserStats.apply_deltas(created_sentences_deltas(sentences))
+                total += len(batch)
+                batch = list(islice(sentences_data, batch_size))
+                parsed += len(batch)
+                if progress:
+                    progress(parsed=parsed, inserted=total, total=estimated_total(parsed))
+
+            # Счетчики и статус документа пересчитываются один раз при выходе из batched_signals()
+            with batched_signals() as signals:
+                document.is_processed = True
+                document.save(update_fields=["is_processed", "encoding"])
+                signals.refresh_progress_counters(document)
+
+    result = IngestionResult(
+        document_id=document.id,
+        sentences=total,
+        elapsed=time.perf_counter() - started,
+    )
+    logger.info(
+        "Документ id=%s: загружено %s предложений за %.2f с (%.0f строк/с)",
+        result.document_id,
+        result.sentences,
+        result.elapsed,
+        result.rows_per_second,
+    )
+    return result
+
+
+def start_ingestion(document: Document) -> IngestionJob:
+    """
+    Создает задачу загрузки документа и ставит её в очередь после фиксации транзакции.
+    В режиме CELERY_TASK_ALWAYS_EAGER задача выполняется сразу в текущем процессе.
+    """
+    from .tasks import ingest_document_task
+
+    job = IngestionJob.objects.create(document=document)
+    transaction.on_commit(lambda: ingest_document_task.delay(job.id))
+    return job
+
+
+def run_ingestion_job(job_id: int) -> Optional[IngestionResult]:
+    """Выполняет задачу загрузки: разбирает документ и публикует прогресс в IngestionJob"""
+    job = IngestionJob.objects.select_related("document").get(pk=job_id)
+    job.update_progress(status="running", error="")
+
+    try:
+        # Прогресс пишется в кэш: UPDATE задачи внутри транзакции загрузки не виден до её фиксации
+        result = ingest_document(job.document, progress=job.publish_progress)
+    except Exception as e:
+        logger.exception("Ошибка при обработке документа %s", job.document_id)
+        error = " ".join(e.messages) if isinstance(e, ValidationError) else str(e)
+        job.update_progress(status="failed", error=error)
+        # Документ, который так и не удалось обработать, не должен считаться дубликатом при повторной загрузке
+        Document.objects.filter(pk=job.document_id, is_processed=False).update(content_hash="")
+        # Транзакция загрузки откатилась: счетчики и статус пересчитываются по сохранившимся предложениям
+        with transaction.atomic(), batched_signals() as signals:
+            signals.refresh_progress_counters(job.document)
+        return None
+
+    job.update_progress(status="completed", parsed=result.sentences, inserted=result.sentences, total=result.sentences)
+    return result
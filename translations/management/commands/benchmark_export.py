@@ -0,0 +1,200 @@
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+import docx
+import openpyxl
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+
+from translations.export_utils import (
+    DOCX_TABLE_HEADERS,
+    export_document_all_formats,
+    export_to_docx,
+    export_to_docx_translated_only,
+    export_to_txt,
+    export_to_xlsx,
+    export_to_xlsx_openpyxl,
+    export_to_xlsx_xlsxwriter,
+)
+from translations.models import Document, Sentence, Translation
+from users.models import User
+
+
+def _create_tc(text):
+    tc = OxmlElement("w:tc")
+    p = OxmlElement("w:p")
+    r = OxmlElement("w:r")
+    t = OxmlElement("w:t")
+    if text.strip() != text:
+        t.set(qn("xml:space"), "preserve")
+    t.text = text
+    r.append(t)
+    p.append(r)
+    tc.append(p)
+    return tc
+
+
+def _legacy_export_docx(document, output_path):
+    """Прежний экспорт таблицы DOCX: дерево lxml всего документа в памяти, затем doc.save"""
+    doc = docx.Document()
+    table = doc.add_table(rows=1, cols=len(DOCX_TABLE_HEADERS))
+    table.style = "Table Grid"
+    for cell, header in zip(table.rows[0].cells, DOCX_TABLE_HEADERS):
+        cell.text = header
+    for sentence in document.sentences.select_related("translation").order_by("sentence_number"):
+        translated_text = sentence.translation.translated_text if sentence.has_translation else ""
+        tr = OxmlElement("w:tr")
+        for text in (str(sentence.sentence_number), sentence.original_text or "", translated_text):
+            tr.append(_create_tc(text))
+        table._tbl.append(tr)
+    doc.save(output_path)
+    return output_path
+
+
+class Command(BaseCommand):
+    help = "Замеряет скорость и пиковое потребление памяти экспорта большого документа"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=["xlsx", "docx", "all"], default="xlsx", help="Формат экспорта")
+        parser.add_argument("--rows", type=int, default=100_000, help="Количество предложений в тестовом документе")
+        parser.add_argument("--document", type=int, help="Экспортировать существующий документ вместо тестового")
+        parser.add_argument("--skip-legacy", action="store_true", help="Не запускать прежнюю реализацию")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Тестовый документ создается в транзакции и откатывается после замеров
+            if options["document"]:
+                try:
+                    document = Document.objects.get(id=options["document"])
+                except Document.DoesNotExist:
+                    raise CommandError(f"Документ {options['document']} не найден")
+            else:
+                self.stdout.write(f"Создание документа на {options['rows']} предложений...")
+                document = self._generate_document(options["rows"])
+            getattr(self, f"benchmark_{options['format']}")(document, options["skip_legacy"])
+            transaction.set_rollback(True)
+
+    def benchmark_xlsx(self, document, skip_legacy):
+        cases = [("xlsx XlsxWriter constant_memory", export_to_xlsx_xlsxwriter)]
+        if not skip_legacy:
+            cases.insert(0, ("xlsx openpyxl", export_to_xlsx_openpyxl))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = [self._measure(name, export, document, temp_dir, "xlsx") for name, export in cases]
+            if len(paths) > 1:
+                same = self._read_xlsx(paths[0]) == self._read_xlsx(paths[1])
+                self.stdout.write(f"Содержимое и ширина столбцов совпадают: {'да' if same else 'НЕТ'}")
+
+    def benchmark_docx(self, document, skip_legacy):
+        cases = [("docx потоковая запись document.xml", export_to_docx)]
+        if not skip_legacy:
+            cases.insert(0, ("docx python-docx", _legacy_export_docx))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = [self._measure(name, export, document, temp_dir, "docx") for name, export in cases]
+            if len(paths) > 1:
+                same = self._read_docx(paths[0]) == self._read_docx(paths[1])
+                self.stdout.write(f"Части пакета совпадают побайтно: {'да' if same else 'НЕТ'}")
+
+    def benchmark_all(self, document, skip_legacy):
+        """
+        Архив всех форматов против каждого формата по отдельности. Форматы архива собираются в дочерних процессах,
+        поэтому для архива пик памяти показан только для основного процесса (снимок строк и упаковка ZIP)
+        """
+        cases = [
+            ("txt", "txt", export_to_txt),
+            ("docx таблица", "docx", export_to_docx),
+            ("docx переведенный текст", "docx", export_to_docx_translated_only),
+            ("xlsx", "xlsx", export_to_xlsx),
+            (
+                "все форматы в ZIP",
+                "zip",
+                lambda document, path: shutil.move(export_document_all_formats(document), path),
+            ),
+        ]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name, extension, export in cases:
+                self._measure(name, export, document, temp_dir, extension)
+
+    def _generate_document(self, rows):
+        suffix = int(time.time() * 1000)
+        users = {
+            role: User.objects.create(
+                username=f"benchmark_{role}_{suffix}", email=f"{role}_{suffix}@example.com", role=role
+            )
+            for role in ("admin", "translator", "corrector")
+        }
+        document = Document.objects.create(
+            file=f"documents/benchmark_{suffix}.txt",
+            uploaded_by=users["admin"],
+            content_hash=f"{suffix:064x}",
+            is_processed=True,
+        )
+        sentences = Sentence.objects.bulk_create(
+            (
+                Sentence(
+                    document=document,
+                    sentence_number=number,
+                    original_text=f"Жил-был в старину человек номер {number}, и было у него три сына.",
+                    assigned_to=users["translator"],
+                    corrector=users["corrector"] if number % 4 else None,
+                )
+                for number in range(1, rows + 1)
+            ),
+            batch_size=2000,
+        )
+        statuses = ["pending", "approved", "rejected"]
+        Translation.objects.bulk_create(
+            (
+                Translation(
+                    sentence=sentence,
+                    translator=users["translator"],
+                    translated_text=f"Цхьа хIама хиннай, {sentence.sentence_number}.",
+                    status=statuses[sentence.sentence_number % 3],
+                )
+                for sentence in sentences
+                if sentence.sentence_number % 2
+            ),
+            batch_size=2000,
+        )
+        return document
+
+    def _measure(self, name, export, document, temp_dir, extension):
+        path = os.path.join(temp_dir, f"{name.replace(' ', '_')}.{extension}")
+        # Время замеряется без tracemalloc: трассировка заметно замедляет экспорт
+        started = time.perf_counter()
+        export(document, path)
+        elapsed = time.perf_counter() - started
+
+        tracemalloc.start()
+        export(document, path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(
+            f"{name}: {elapsed:.2f} с, пик памяти {peak / 1024 / 1024:.1f} МБ, "
+            f"файл {os.path.getsize(path) / 1024 / 1024:.1f} МБ"
+        )
+        return path
+
+    def _read_xlsx(self, path):
+        workbook = openpyxl.load_workbook(path)
+        sheet = workbook.active
+        # XlsxWriter хранит ширину с отступом Excel (4 символа - 4.71), сравнивается ширина в символах
+        # openpyxl объединяет соседние столбцы одной ширины в диапазон min-max
+        widths = {
+            column: int(dimension.width)
+            for dimension in sheet.column_dimensions.values()
+            for column in range(dimension.min, dimension.max + 1)
+        }
+        return sheet.title, list(sheet.iter_rows(values_only=True)), widths
+
+    def _read_docx(self, path):
+        with zipfile.ZipFile(path) as package:
+            return {name: package.read(name) for name in package.namelist()}
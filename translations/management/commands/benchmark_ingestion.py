@@ -0,0 +1,132 @@
+import os
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.core.management.base import BaseCommand
+
+import docx
+import openpyxl
+
+from translations.utils import (
+    W_NAMESPACE,
+    extract_sentences_from_text,
+    iter_docx_sentences,
+    iter_xlsx_sentences,
+)
+
+
+def _legacy_process_xlsx(file_path):
+    """Прежний разбор XLSX: полная загрузка книги, объединение текста и повторное разбиение"""
+    workbook = openpyxl.load_workbook(file_path, data_only=True)
+    text_content = []
+    for sheet_name in workbook.sheetnames:
+        for row in workbook[sheet_name].iter_rows(values_only=True):
+            for cell_value in row:
+                if cell_value and isinstance(cell_value, str):
+                    text_content.append(str(cell_value))
+    return extract_sentences_from_text(" ".join(text_content))
+
+
+def _legacy_process_docx(file_path):
+    """Прежний разбор DOCX через объектную модель python-docx (только абзацы тела)"""
+    doc = docx.Document(file_path)
+    return [p.text.strip() for p in doc.paragraphs if p.text.strip()]
+
+
+class Command(BaseCommand):
+    help = "Замеряет скорость и пиковое потребление памяти при разборе больших файлов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=["xlsx", "docx"], default="xlsx", help="Формат тестового файла")
+        parser.add_argument("--rows", type=int, default=200_000, help="Количество строк в тестовом файле")
+        parser.add_argument("--skip-legacy", action="store_true", help="Не запускать прежнюю реализацию")
+
+    def handle(self, *args, **options):
+        getattr(self, f"benchmark_{options['format']}")(options["rows"], options["skip_legacy"])
+
+    def benchmark_xlsx(self, rows, skip_legacy):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "benchmark.xlsx")
+            self.stdout.write(f"Генерация XLSX на {rows} строк...")
+            self._generate_xlsx(file_path, rows)
+            self.stdout.write(f"Размер файла: {os.path.getsize(file_path) / 1024 / 1024:.1f} МБ")
+
+            cases = [
+                ("xlsx read-only, разбиение текста", lambda: iter_xlsx_sentences(file_path)),
+                ("xlsx read-only, ячейка = предложение", lambda: iter_xlsx_sentences(file_path, cell_as_sentence=True)),
+            ]
+            if not skip_legacy:
+                cases.insert(0, ("xlsx прежний разбор", lambda: _legacy_process_xlsx(file_path)))
+
+            for name, factory in cases:
+                self._measure(name, factory, rows)
+
+    def benchmark_docx(self, rows, skip_legacy):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "benchmark.docx")
+            self.stdout.write(f"Генерация DOCX на {rows} абзацев...")
+            self._generate_docx(file_path, rows)
+            self.stdout.write(f"Размер файла: {os.path.getsize(file_path) / 1024 / 1024:.1f} МБ")
+
+            cases = [("docx потоковый разбор lxml", lambda: iter_docx_sentences(file_path))]
+            if not skip_legacy:
+                cases.insert(0, ("docx python-docx", lambda: _legacy_process_docx(file_path)))
+
+            for name, factory in cases:
+                self._measure(name, factory, rows)
+
+    def _generate_docx(self, file_path, rows):
+        # Тело документа пишется напрямую в XML: python-docx создает большие файлы слишком медленно
+        template = os.path.join(os.path.dirname(docx.__file__), "templates", "default.docx")
+        with zipfile.ZipFile(template) as source:
+            parts = {name: source.read(name) for name in source.namelist() if name != "word/document.xml"}
+
+        with zipfile.ZipFile(file_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name, content in parts.items():
+                archive.writestr(name, content)
+            with archive.open("word/document.xml", "w") as document_xml:
+                document_xml.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n')
+                document_xml.write(f'<w:document xmlns:w="{W_NAMESPACE}"><w:body>'.encode())
+                for i in range(rows):
+                    text = escape(f"Жил-был в старину человек номер {i}, и было у него три сына.")
+                    paragraph = (
+                        f"<w:p><w:r><w:t>{text}</w:t></w:r><w:r><w:tab/><w:t>Конец абзаца {i}.</w:t></w:r></w:p>"
+                    )
+                    if i % 100 == 99:
+                        # Периодически добавляем таблицу, чтобы проверить разбор ячеек
+                        cell = f"<w:tc><w:p><w:r><w:t>Ячейка таблицы {i}</w:t></w:r></w:p></w:tc>"
+                        paragraph += f"<w:tbl><w:tr>{cell}{cell}</w:tr></w:tbl>"
+                    document_xml.write(paragraph.encode())
+                document_xml.write(b"<w:sectPr/></w:body></w:document>")
+
+    def _generate_xlsx(self, file_path, rows):
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet("Данные")
+        for i in range(rows):
+            sheet.append(
+                [
+                    i + 1,
+                    f"Жил-был в старину человек номер {i}, и было у него три сына.",
+                    f"Когда сыновья выросли, отец {i} позвал их к себе и сказал.",
+                ]
+            )
+        workbook.save(file_path)
+
+    def _measure(self, name, factory, rows):
+        # Время замеряется без tracemalloc: трассировка заметно замедляет разбор
+        started = time.perf_counter()
+        sentences = sum(1 for _ in factory())
+        elapsed = time.perf_counter() - started
+
+        tracemalloc.start()
+        for _ in factory():
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(
+            f"{name}: {sentences} предложений за {elapsed:.2f} с "
+            f"({rows / elapsed:.0f} строк/с), пик памяти {peak / 1024 / 1024:.1f} МБ"
+        )
@@ -0,0 +1,108 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from translations.models import Document, Sentence, SimilarityBand, Translation
+from translations.similarity import build_bands, find_similar
+
+SYLLABLES = (
+    "ба ва га да жа за ка ла ма на па ра са та ха ца ча ша би ви ги ди зи ки ли ми ни ри си ти "
+    "бо во го до жо ко ло мо но по ро со то хо бу ву гу ду ку лу му ну ру су ту хъ гӏ кх аь оь уь".split()
+)
+VOCABULARY_SIZE = 20000
+
+# Целевое время поиска похожих предложений
+TARGET_MS = 50
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет время поиска похожих предложений на синтетическом корпусе. "
+        "Данные создаются внутри транзакции и откатываются после замера. "
+        "Если p95 превышает целевое время, команда завершается с ошибкой."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sentences", type=int, default=1_000_000, help="Размер корпуса")
+        parser.add_argument("--queries", type=int, default=200, help="Количество поисковых запросов")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Размер пачки при наполнении")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        self.words = ["".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(VOCABULARY_SIZE)]
+        with transaction.atomic():
+            texts = self._populate(options["sentences"], options["batch_size"], rng)
+            self._run_queries(texts, options["queries"], rng)
+            transaction.set_rollback(True)
+
+    def _random_sentence(self, rng):
+        words = rng.choices(self.words, k=rng.randint(6, 16))
+        return " ".join(words).capitalize() + "."
+
+    def _populate(self, count, batch_size, rng):
+        user = get_user_model().objects.create(username=f"benchmark-{rng.getrandbits(32)}", role="translator")
+        # bulk_create обходит save() и сигналы документа: файл и фоновая обработка не нужны
+        document = Document.objects.bulk_create([Document(file="benchmark.txt", uploaded_by=user, is_processed=True)])[
+            0
+        ]
+
+        started = time.perf_counter()
+        texts = []
+        for offset in range(0, count, batch_size):
+            batch_texts = [self._random_sentence(rng) for _ in range(min(batch_size, count - offset))]
+            sentences = Sentence.objects.bulk_create(
+                [
+                    Sentence(document=document, sentence_number=offset + i + 1, original_text=text, status=2)
+                    for i, text in enumerate(batch_texts)
+                ]
+            )
+            if sentences[0].pk is None:
+                # Бэкенд не вернул первичные ключи после bulk_create
+                sentences = list(document.sentences.filter(sentence_number__gt=offset).order_by("sentence_number"))
+            Translation.objects.bulk_create(
+                [
+                    Translation(
+                        sentence=sentence,
+                        translated_text=f"Перевод {sentence.sentence_number}",
+                        translator=user,
+                        status="approved",
+                    )
+                    for sentence in sentences
+                ]
+            )
+            SimilarityBand.objects.bulk_create(
+                build_bands((sentence.id, sentence.original_text) for sentence in sentences)
+            )
+            texts.extend(batch_texts[: max(1, len(batch_texts) // 100)])
+            self.stdout.write(f"Создано предложений: {offset + len(batch_texts)}")
+
+        self.stdout.write(f"Наполнение индекса: {time.perf_counter() - started:.1f} с")
+        return texts
+
+    def _run_queries(self, texts, queries, rng):
+        timings = []
+        found = 0
+        for _ in range(queries):
+            # Запрос - слегка измененное существующее предложение
+            words = rng.choice(texts).rstrip(".").split()
+            words[rng.randrange(len(words))] = rng.choice(self.words)
+            started = time.perf_counter()
+            results = find_similar(" ".join(words) + ".")
+            timings.append((time.perf_counter() - started) * 1000)
+            found += bool(results)
+
+        timings.sort()
+        p50 = statistics.median(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(
+            f"Запросов: {queries}, найдены похожие: {found}; "
+            f"p50 {p50:.1f} мс, p95 {p95:.1f} мс, максимум {timings[-1]:.1f} мс"
+        )
+        if p95 > TARGET_MS:
+            # Ненулевой код возврата, чтобы замер в CI не проходил молча
+            raise CommandError(f"p95 {p95:.1f} мс превышает {TARGET_MS} мс")
+        self.stdout.write(self.style.SUCCESS(f"p95 укладывается в {TARGET_MS} мс"))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from translations.models import Sentence, SimilarityBand
+from translations.similarity import build_bands
+
+
+class Command(BaseCommand):
+    help = "Перестраивает индекс похожих предложений (MinHash LSH) по всем утвержденным переводам"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Количество предложений в пачке")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        approved = Sentence.objects.filter(translation__status="approved").order_by("id")
+
+        with transaction.atomic():
+            SimilarityBand.objects.all().delete()
+            last_id = 0
+            indexed = 0
+            while True:
+                batch = list(approved.filter(id__gt=last_id).values_list("id", "original_text")[:batch_size])
+                if not batch:
+                    break
+                last_id = batch[-1][0]
+                SimilarityBand.objects.bulk_create(build_bands(batch))
+                indexed += len(batch)
+                self.stdout.write(f"Проиндексировано предложений: {indexed}")
+
+        self.stdout.write(self.style.SUCCESS(f"Индекс перестроен: {indexed} предложений"))
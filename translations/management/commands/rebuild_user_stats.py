@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from translations.user_stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает сводную статистику пользователей (UserStats) по всем предложениям и переводам"
+
+    def handle(self, *args, **options):
+        rows = rebuild_user_stats()
+        self.stdout.write(self.style.SUCCESS(f"Статистика пересчитана: {rows} строк"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+
+from translations.models import Document
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счетчики предложений и статусы всех документов двумя UPDATE-запросами"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = Document.objects.update(**Document.progress_counter_subqueries())
+            # Те же правила, что и в Document.update_status(); документы без предложений не трогаем
+            Document.objects.filter(sentences_total__gt=0).update(
+                status=Case(
+                    When(sentences_corrected=F("sentences_total"), then=Value("corrected")),
+                    When(
+                        sentences_total=F("sentences_translated") + F("sentences_corrected"), then=Value("translated")
+                    ),
+                    default=Value("pending"),
+                )
+            )
+        self.stdout.write(self.style.SUCCESS(f"Счетчики пересчитаны для {updated} документов"))
@@ -0,0 +1,34 @@
+from typing import Dict, Iterable
+
+from django.db.models import F
+
+from .models import Translation
+
+
+def find_approved_translations(hashes: Iterable[str]) -> Dict[str, str]:
+    """
+    Возвращает утвержденные переводы для хешей текста одним запросом: {text_hash: translated_text}.
+    Если у хеша несколько утвержденных переводов, берется последний проверенный.
+    """
+    hashes = set(hashes)
+    if not hashes:
+        return {}
+
+    rows = (
+        Translation.objects.filter(status="approved", sentence__text_hash__in=hashes)
+        .order_by("sentence__text_hash", F("corrected_at").desc(nulls_last=True), "-translated_at")
+        .values_list("sentence__text_hash", "translated_text")
+    )
+    translations = {}
+    for hash_value, translated_text in rows:
+        translations.setdefault(hash_value, translated_text)
+    return translations
+
+
+def get_memory_suggestion(sentence) -> str:
+    """Перевод из памяти для предложения: сохраненный при загрузке или найденный сейчас"""
+    if sentence.suggested_translation:
+        return sentence.suggested_translation
+    if not sentence.text_hash:
+        return ""
+    return find_approved_translations([sentence.text_hash]).get(sentence.text_hash, "")
@@ -0,0 +1,55 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("translations", "0007_translation_corrector"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IngestionJob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "В очереди"),
+                            ("running", "Выполняется"),
+                            ("completed", "Завершена"),
+                            ("failed", "Ошибка"),
+                        ],
+                        default="queued",
+                        max_length=20,
+                        verbose_name="Статус",
+                    ),
+                ),
+                ("parsed", models.PositiveIntegerField(default=0, verbose_name="Разобрано предложений")),
+                ("inserted", models.PositiveIntegerField(default=0, verbose_name="Сохранено предложений")),
+                ("total", models.PositiveIntegerField(blank=True, null=True, verbose_name="Всего предложений")),
+                ("error", models.TextField(blank=True, verbose_name="Ошибка")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="Дата обновления")),
+                (
+                    "document",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ingestion_jobs",
+                        to="translations.document",
+                        verbose_name="Документ",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Задача загрузки",
+                "verbose_name_plural": "Задачи загрузки",
+                "ordering": ["-created_at"],
+                "get_latest_by": "created_at",
+            },
+        ),
+    ]
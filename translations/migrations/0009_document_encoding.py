@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("translations", "0008_ingestionjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="encoding",
+            field=models.CharField(
+                blank=True,
+                help_text="Кодировка TXT файла, определяется при первой обработке",
+                max_length=32,
+                verbose_name="Кодировка",
+            ),
+        ),
+    ]
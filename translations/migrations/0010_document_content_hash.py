@@ -0,0 +1,53 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:18
+
+import hashlib
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+BACKFILL_BATCH_SIZE = 200
+
+
+def backfill_content_hash(apps, schema_editor):
+    """Считает SHA-256 уже загруженных файлов пачками; отсутствующие файлы пропускаются"""
+    Document = apps.get_model("translations", "Document")
+    last_id = 0
+    while True:
+        batch = list(Document.objects.filter(content_hash="", id__gt=last_id).order_by("id")[:BACKFILL_BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        updated = []
+        for document in batch:
+            if not document.file or not default_storage.exists(document.file.name):
+                continue
+            hasher = hashlib.sha256()
+            with default_storage.open(document.file.name, "rb") as file:
+                for chunk in file.chunks():
+                    hasher.update(chunk)
+            document.content_hash = hasher.hexdigest()
+            updated.append(document)
+        Document.objects.bulk_update(updated, ["content_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("translations", "0009_document_encoding"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="Используется для поиска повторно загруженных файлов",
+                max_length=64,
+                verbose_name="SHA-256 файла",
+            ),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:19
+
+import hashlib
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+BACKFILL_BATCH_SIZE = 2000
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def backfill_text_hash(apps, schema_editor):
+    """Заполняет хеш нормализованного текста существующих предложений пачками"""
+    Sentence = apps.get_model("translations", "Sentence")
+    last_id = 0
+    while True:
+        batch = list(
+            Sentence.objects.filter(id__gt=last_id).order_by("id").only("id", "original_text")[:BACKFILL_BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        for sentence in batch:
+            normalized = WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFC", sentence.original_text)).strip()
+            sentence.text_hash = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        Sentence.objects.bulk_update(batch, ["text_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("translations", "0010_document_content_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sentence",
+            name="suggested_translation",
+            field=models.TextField(
+                blank=True,
+                help_text="Утвержденный перевод такого же предложения из другого документа",
+                verbose_name="Перевод из памяти",
+            ),
+        ),
+        migrations.AddField(
+            model_name="sentence",
+            name="text_hash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="SHA-256 нормализованного оригинального текста для памяти переводов",
+                max_length=64,
+                verbose_name="Хеш текста",
+            ),
+        ),
+        migrations.RunPython(backfill_text_hash, migrations.RunPython.noop),
+    ]
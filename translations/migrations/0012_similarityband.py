@@ -0,0 +1,55 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from translations.similarity import band_keys
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def fill_similarity_index(apps, schema_editor):
+    """Индексирует предложения с уже утвержденными переводами пачками по id"""
+    Sentence = apps.get_model("translations", "Sentence")
+    SimilarityBand = apps.get_model("translations", "SimilarityBand")
+    approved = Sentence.objects.filter(translation__status="approved").order_by("id")
+    last_id = 0
+    while True:
+        batch = list(approved.filter(id__gt=last_id).values_list("id", "original_text")[:BACKFILL_BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        SimilarityBand.objects.bulk_create(
+            SimilarityBand(sentence_id=sentence_id, key=key) for sentence_id, text in batch for key in band_keys(text)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("translations", "0011_sentence_translation_memory"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SimilarityBand",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("key", models.BigIntegerField(db_index=True, verbose_name="Ключ полосы")),
+                (
+                    "sentence",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="similarity_bands",
+                        to="translations.sentence",
+                        verbose_name="Предложение",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Полоса индекса похожих предложений",
+                "verbose_name_plural": "Индекс похожих предложений",
+            },
+        ),
+        migrations.RunPython(fill_similarity_index, migrations.RunPython.noop),
+    ]
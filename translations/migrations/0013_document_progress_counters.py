@@ -0,0 +1,69 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:48
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+STATUS_COUNTER_FIELDS = {
+    0: "sentences_unconfirmed",
+    1: "sentences_translated",
+    2: "sentences_corrected",
+    3: "sentences_rejected",
+}
+
+
+def fill_progress_counters(apps, schema_editor):
+    """Заполняет счетчики предложений существующих документов одним UPDATE"""
+    Document = apps.get_model("translations", "Document")
+    Sentence = apps.get_model("translations", "Sentence")
+
+    def count(**filters):
+        sentences = (
+            Sentence.objects.filter(document=OuterRef("pk"), **filters)
+            .order_by()
+            .values("document")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        return Coalesce(Subquery(sentences), 0)
+
+    counters = {"sentences_total": count()}
+    for status, field in STATUS_COUNTER_FIELDS.items():
+        counters[field] = count(status=status)
+    Document.objects.update(**counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("translations", "0012_similarityband"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="sentences_corrected",
+            field=models.PositiveIntegerField(default=0, verbose_name="Подтверждено корректором"),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="sentences_rejected",
+            field=models.PositiveIntegerField(default=0, verbose_name="Отклонено корректором"),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="sentences_total",
+            field=models.PositiveIntegerField(default=0, verbose_name="Всего предложений"),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="sentences_translated",
+            field=models.PositiveIntegerField(default=0, verbose_name="Подтверждено переводчиком"),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="sentences_unconfirmed",
+            field=models.PositiveIntegerField(default=0, verbose_name="Не подтверждено"),
+        ),
+        migrations.RunPython(fill_progress_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("translations", "0013_document_progress_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="sentence",
+            index=models.Index(fields=["created_at", "id"], name="sentence_created_at_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="sentence",
+            index=models.Index(fields=["status", "id"], name="sentence_status_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="sentence",
+            index=models.Index(fields=["sentence_number", "id"], name="sentence_number_id_idx"),
+        ),
+    ]
@@ -0,0 +1,151 @@
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "ALTER TABLE translations_sentence ADD COLUMN search_vector tsvector",
+    """
+    CREATE FUNCTION translations_sentence_search_vector(original text, translated text) RETURNS tsvector AS $$
+        SELECT setweight(to_tsvector('simple', coalesce(original, '')), 'A')
+            || setweight(to_tsvector('simple', coalesce(translated, '')), 'B')
+    $$ LANGUAGE sql IMMUTABLE
+    """,
+    """
+    UPDATE translations_sentence AS sentence
+    SET search_vector = translations_sentence_search_vector(
+        sentence.original_text,
+        (SELECT translated_text FROM translations_translation WHERE sentence_id = sentence.id)
+    )
+    """,
+    "CREATE INDEX translations_sentence_search_idx ON translations_sentence USING gin (search_vector)",
+    # Индексы для поиска подстроки: Django строит icontains как UPPER(столбец) LIKE UPPER(%s)
+    "CREATE INDEX translations_sentence_text_trgm_idx ON translations_sentence "
+    "USING gin (UPPER(original_text) gin_trgm_ops)",
+    "CREATE INDEX translations_translation_text_trgm_idx ON translations_translation "
+    "USING gin (UPPER(translated_text) gin_trgm_ops)",
+    """
+    CREATE FUNCTION translations_sentence_search_trigger() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := translations_sentence_search_vector(
+            NEW.original_text,
+            (SELECT translated_text FROM translations_translation WHERE sentence_id = NEW.id)
+        );
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER translations_sentence_search_update
+    BEFORE INSERT OR UPDATE OF original_text ON translations_sentence
+    FOR EACH ROW EXECUTE FUNCTION translations_sentence_search_trigger()
+    """,
+    """
+    CREATE FUNCTION translations_translation_search_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            UPDATE translations_sentence
+            SET search_vector = translations_sentence_search_vector(original_text, NULL)
+            WHERE id = OLD.sentence_id;
+            RETURN OLD;
+        END IF;
+        UPDATE translations_sentence
+        SET search_vector = translations_sentence_search_vector(original_text, NEW.translated_text)
+        WHERE id = NEW.sentence_id;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER translations_translation_search_update
+    AFTER INSERT OR DELETE OR UPDATE OF translated_text ON translations_translation
+    FOR EACH ROW EXECUTE FUNCTION translations_translation_search_trigger()
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    "DROP TRIGGER IF EXISTS translations_translation_search_update ON translations_translation",
+    "DROP TRIGGER IF EXISTS translations_sentence_search_update ON translations_sentence",
+    "DROP FUNCTION IF EXISTS translations_translation_search_trigger()",
+    "DROP FUNCTION IF EXISTS translations_sentence_search_trigger()",
+    "DROP INDEX IF EXISTS translations_translation_text_trgm_idx",
+    "DROP INDEX IF EXISTS translations_sentence_text_trgm_idx",
+    "ALTER TABLE translations_sentence DROP COLUMN IF EXISTS search_vector",
+    "DROP FUNCTION IF EXISTS translations_sentence_search_vector(text, text)",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE translations_sentence_fts
+    USING fts5(original_text, translated_text, tokenize = 'unicode61 remove_diacritics 0')
+    """,
+    """
+    INSERT INTO translations_sentence_fts(rowid, original_text, translated_text)
+    SELECT sentence.id, sentence.original_text, coalesce(translation.translated_text, '')
+    FROM translations_sentence AS sentence
+    LEFT JOIN translations_translation AS translation ON translation.sentence_id = sentence.id
+    """,
+    """
+    CREATE TRIGGER translations_sentence_fts_insert AFTER INSERT ON translations_sentence BEGIN
+        INSERT INTO translations_sentence_fts(rowid, original_text, translated_text)
+        VALUES (new.id, new.original_text, '');
+    END
+    """,
+    """
+    CREATE TRIGGER translations_sentence_fts_update AFTER UPDATE OF original_text ON translations_sentence BEGIN
+        UPDATE translations_sentence_fts SET original_text = new.original_text WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER translations_sentence_fts_delete AFTER DELETE ON translations_sentence BEGIN
+        DELETE FROM translations_sentence_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER translations_translation_fts_insert AFTER INSERT ON translations_translation BEGIN
+        UPDATE translations_sentence_fts SET translated_text = new.translated_text WHERE rowid = new.sentence_id;
+    END
+    """,
+    """
+    CREATE TRIGGER translations_translation_fts_update
+    AFTER UPDATE OF translated_text ON translations_translation BEGIN
+        UPDATE translations_sentence_fts SET translated_text = new.translated_text WHERE rowid = new.sentence_id;
+    END
+    """,
+    """
+    CREATE TRIGGER translations_translation_fts_delete AFTER DELETE ON translations_translation BEGIN
+        UPDATE translations_sentence_fts SET translated_text = '' WHERE rowid = old.sentence_id;
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS translations_translation_fts_delete",
+    "DROP TRIGGER IF EXISTS translations_translation_fts_update",
+    "DROP TRIGGER IF EXISTS translations_translation_fts_insert",
+    "DROP TRIGGER IF EXISTS translations_sentence_fts_delete",
+    "DROP TRIGGER IF EXISTS translations_sentence_fts_update",
+    "DROP TRIGGER IF EXISTS translations_sentence_fts_insert",
+    "DROP TABLE IF EXISTS translations_sentence_fts",
+]
+
+
+def run_statements(statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for statement in statements.get(vendor, []):
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("translations", "0014_sentence_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_statements({"postgresql": POSTGRES_FORWARD, "sqlite": SQLITE_FORWARD}),
+            run_statements({"postgresql": POSTGRES_BACKWARD, "sqlite": SQLITE_BACKWARD}),
+        ),
+    ]
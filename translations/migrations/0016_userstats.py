@@ -0,0 +1,114 @@
+# Generated by Django 5.0.1 on 2026-10-18 12:12
+
+from collections import Counter, defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def text_metrics(text, prefix):
+    text = text or ""
+    return {
+        f"{prefix}words": len(text.split()),
+        f"{prefix}characters": len(text),
+        f"{prefix}characters_no_spaces": len(text.replace(" ", "")),
+    }
+
+
+def fill_user_stats(apps, schema_editor):
+    """Заполняет статистику пользователей одним проходом по предложениям с их переводами"""
+    Sentence = apps.get_model("translations", "Sentence")
+    UserStats = apps.get_model("translations", "UserStats")
+
+    totals = defaultdict(Counter)
+    rows = Sentence.objects.order_by().values_list(
+        "document__uploaded_by_id",
+        "assigned_to_id",
+        "corrector_id",
+        "original_text",
+        "translation__translator_id",
+        "translation__translated_text",
+    )
+    for uploader_id, assigned_to_id, corrector_id, original_text, translator_id, translated_text in rows.iterator(
+        chunk_size=2000
+    ):
+        original = Counter(sentences=1, **text_metrics(original_text, ""))
+        totals[(uploader_id, "uploader")].update(original)
+        if assigned_to_id:
+            totals[(assigned_to_id, "translator")].update(original)
+        if translated_text is not None:
+            translated = Counter(translated_sentences=1, **text_metrics(translated_text, "translated_"))
+            totals[(uploader_id, "uploader")].update(translated)
+            if translator_id:
+                totals[(translator_id, "translator")].update(translated)
+            if corrector_id:
+                totals[(corrector_id, "corrector")].update(original)
+                totals[(corrector_id, "corrector")].update(translated)
+
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=user_id, role=role, **values) for (user_id, role), values in totals.items()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("translations", "0015_sentence_search_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserStats",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "role",
+                    models.CharField(
+                        choices=[
+                            ("translator", "Переводчик"),
+                            ("corrector", "Корректор"),
+                            ("uploader", "Загрузивший документы"),
+                        ],
+                        max_length=20,
+                        verbose_name="Роль",
+                    ),
+                ),
+                ("sentences", models.PositiveBigIntegerField(default=0, verbose_name="Предложений")),
+                ("words", models.PositiveBigIntegerField(default=0, verbose_name="Слов")),
+                ("characters", models.PositiveBigIntegerField(default=0, verbose_name="Символов")),
+                (
+                    "characters_no_spaces",
+                    models.PositiveBigIntegerField(default=0, verbose_name="Символов без пробелов"),
+                ),
+                (
+                    "translated_sentences",
+                    models.PositiveBigIntegerField(default=0, verbose_name="Переведенных предложений"),
+                ),
+                ("translated_words", models.PositiveBigIntegerField(default=0, verbose_name="Слов перевода")),
+                ("translated_characters", models.PositiveBigIntegerField(default=0, verbose_name="Символов перевода")),
+                (
+                    "translated_characters_no_spaces",
+                    models.PositiveBigIntegerField(default=0, verbose_name="Символов перевода без пробелов"),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="Дата обновления")),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stats",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Статистика пользователя",
+                "verbose_name_plural": "Статистика пользователей",
+                "unique_together": {("user", "role")},
+            },
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.0.1 on 2026-10-18 12:15
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def text_metrics(text):
+    text = text or ""
+    return len(text.split()), len(text), len(text.replace(" ", ""))
+
+
+def backfill(schema_editor, model, text_field):
+    """
+    Заполняет метрики текста пачками по первичному ключу: в памяти не больше BATCH_SIZE текстов.
+    Пачка записывается одним executemany, без построения CASE-выражений bulk_update
+    """
+    quote = schema_editor.quote_name
+    sql = "UPDATE {} SET {} = %s, {} = %s, {} = %s WHERE {} = %s".format(
+        quote(model._meta.db_table),
+        quote("word_count"),
+        quote("character_count"),
+        quote("character_count_no_spaces"),
+        quote("id"),
+    )
+    last_id = 0
+    while True:
+        rows = list(model.objects.filter(id__gt=last_id).order_by("id").values_list("id", text_field)[:BATCH_SIZE])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(sql, [(*text_metrics(text), pk) for pk, text in rows])
+
+
+def fill_text_metrics(apps, schema_editor):
+    backfill(schema_editor, apps.get_model("translations", "Sentence"), "original_text")
+    backfill(schema_editor, apps.get_model("translations", "Translation"), "translated_text")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("translations", "0016_userstats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sentence",
+            name="character_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Символов"),
+        ),
+        migrations.AddField(
+            model_name="sentence",
+            name="character_count_no_spaces",
+            field=models.PositiveIntegerField(default=0, verbose_name="Символов без пробелов"),
+        ),
+        migrations.AddField(
+            model_name="sentence",
+            name="word_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Слов"),
+        ),
+        migrations.AddField(
+            model_name="translation",
+            name="character_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Символов"),
+        ),
+        migrations.AddField(
+            model_name="translation",
+            name="character_count_no_spaces",
+            field=models.PositiveIntegerField(default=0, verbose_name="Символов без пробелов"),
+        ),
+        migrations.AddField(
+            model_name="translation",
+            name="word_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Слов"),
+        ),
+        migrations.RunPython(fill_text_metrics, migrations.RunPython.noop),
+    ]
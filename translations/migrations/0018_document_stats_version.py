@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("translations", "0017_text_metrics"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="stats_version",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Версия статистики"),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("translations", "0018_document_stats_version"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="document",
+            name="sentences_corrected",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Подтверждено корректором"),
+        ),
+        migrations.AlterField(
+            model_name="document",
+            name="sentences_rejected",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Отклонено корректором"),
+        ),
+        migrations.AlterField(
+            model_name="document",
+            name="sentences_total",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Всего предложений"),
+        ),
+        migrations.AlterField(
+            model_name="document",
+            name="sentences_translated",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Подтверждено переводчиком"),
+        ),
+        migrations.AlterField(
+            model_name="document",
+            name="sentences_unconfirmed",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Не подтверждено"),
+        ),
+    ]
@@ -1,8 +1,14 @@
 import os
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.validators import FileExtensionValidator
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .utils import TEXT_METRIC_FIELDS, file_sha256, text_hash, text_metrics
 
 
 class Document(models.Model):
@@ -22,6 +28,28 @@ class Document(models.Model):
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name="Загрузил")
     uploaded_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата загрузки")
     is_processed = models.BooleanField(default=False, verbose_name="Обработан")
+    encoding = models.CharField(
+        max_length=32,
+        blank=True,
+        verbose_name="Кодировка",
+        help_text="Кодировка TXT файла, определяется при первой обработке",
+    )
+    # Счетчики предложений по статусам: сдвигаются сигналами при смене статуса предложения,
+    # массовые операции пересчитывают их refresh_progress_counters()
+    sentences_total = models.PositiveIntegerField(default=0, editable=False, verbose_name="Всего предложений")
+    sentences_unconfirmed = models.PositiveIntegerField(default=0, editable=False, verbose_name="Не подтверждено")
+    sentences_translated = models.PositiveIntegerField(default=0, editable=False, verbose_name="Подтверждено переводчиком")
+    sentences_corrected = models.PositiveIntegerField(default=0, editable=False, verbose_name="Подтверждено корректором")
+    sentences_rejected = models.PositiveIntegerField(default=0, editable=False, verbose_name="Отклонено корректором")
+    # Растет при каждой записи предложений и переводов документа: ключ кэша get_document_statistics
+    stats_version = models.PositiveIntegerField(default=0, editable=False, verbose_name="Версия статистики")
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        verbose_name="SHA-256 файла",
+        help_text="Используется для поиска повторно загруженных файлов",
+    )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending", verbose_name="Статус")
     translator = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -42,6 +70,17 @@ class Document(models.Model):
         limit_choices_to={"role": "corrector"},
     )
 
+    # Поле счетчика для каждого статуса предложения
+    STATUS_COUNTER_FIELDS = {
+        0: "sentences_unconfirmed",
+        1: "sentences_translated",
+        2: "sentences_corrected",
+        3: "sentences_rejected",
+    }
+    PROGRESS_COUNTER_FIELDS = ["sentences_total", *STATUS_COUNTER_FIELDS.values()]
+    # Поля, которые save() без update_fields не записывает: их меняют только атомарные UPDATE
+    DERIVED_FIELDS = {*PROGRESS_COUNTER_FIELDS, "stats_version"}
+
     class Meta:
         verbose_name = "Документ"
         verbose_name_plural = "Документы"
@@ -53,22 +92,98 @@ class Document(models.Model):
     @property
     def title(self):
         """Возвращает название файла без расширения"""
-        if self.file:
-            filename = os.path.basename(self.file.name)
-            return os.path.splitext(filename)[0]
+        return self.title_from_file(self.file.name)
+
+    @staticmethod
+    def title_from_file(name):
+        """Название документа по пути файла (для выборок values() без объектов Document)"""
+        if name:
+            return os.path.splitext(os.path.basename(name))[0]
         return "Документ без файла"
 
+    def save(self, *args, **kwargs):
+        # Хеш содержимого считается один раз при создании записи (для загрузок - обработчиком загрузки)
+        if self._state.adding and self.file and not self.content_hash:
+            self.content_hash = file_sha256(self.file)
+        if not self._state.adding and not args and kwargs.get("update_fields") is None:
+            # Счетчики сдвигаются только через F(), а версию статистики меняет только bump_stats_version():
+            # сохранение формы или устаревшего объекта не откатывает их назад
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DERIVED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def progress_counter_subqueries(cls):
+        """Выражения для пересчета всех счетчиков одним UPDATE по набору документов"""
+
+        def count(**filters):
+            sentences = (
+                Sentence.objects.filter(document=OuterRef("pk"), **filters)
+                .order_by()
+                .values("document")
+                .annotate(count=Count("id"))
+                .values("count")
+            )
+            return Coalesce(Subquery(sentences), 0)
+
+        counters = {"sentences_total": count()}
+        for status, field in cls.STATUS_COUNTER_FIELDS.items():
+            counters[field] = count(status=status)
+        return counters
+
+    def refresh_progress_counters(self):
+        """Пересчитывает счетчики документа по предложениям (после массовых вставок и удалений)"""
+        Document.objects.filter(pk=self.pk).update(**self.progress_counter_subqueries())
+        self.refresh_from_db(fields=self.PROGRESS_COUNTER_FIELDS)
+
+    @classmethod
+    def progress_counter_deltas(cls, old_status=None, new_status=None):
+        """
+        Изменения счетчиков {поле: приращение}: old_status=None - предложение добавлено,
+        new_status=None - удалено, иначе статус предложения изменился
+        """
+        deltas = {}
+        if old_status is None:
+            deltas["sentences_total"] = 1
+        else:
+            deltas[cls.STATUS_COUNTER_FIELDS[old_status]] = -1
+        if new_status is None:
+            deltas["sentences_total"] = deltas.get("sentences_total", 0) - 1
+        else:
+            field = cls.STATUS_COUNTER_FIELDS[new_status]
+            deltas[field] = deltas.get(field, 0) + 1
+        return deltas
+
+    def apply_progress_counter_deltas(self, deltas):
+        """Атомарно применяет приращения счетчиков одним UPDATE через F()"""
+        changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        if changes:
+            Document.objects.filter(pk=self.pk).update(**changes)
+
+    def change_progress_counters(self, old_status=None, new_status=None):
+        """Сдвигает счетчики при добавлении предложения или смене его статуса"""
+        self.apply_progress_counter_deltas(self.progress_counter_deltas(old_status, new_status))
+
+    def bump_stats_version(self):
+        """Атомарно увеличивает версию содержимого, тем самым сбрасывая кэш статистики документа"""
+        Document.objects.filter(pk=self.pk).update(stats_version=F("stats_version") + 1)
+        # Поле становится отложенным: новое значение загрузится из БД при следующем обращении
+        self.__dict__.pop("stats_version", None)
+
     def update_status(self):
-        """Автоматически обновляет статус документа на основе статуса предложений"""
-        sentences = self.sentences.all()
-        
-        if not sentences.exists():
+        """Автоматически обновляет статус документа на основе счетчиков предложений"""
+        self.refresh_from_db(fields=self.PROGRESS_COUNTER_FIELDS)
+        total_sentences = self.sentences_total
+
+        if not total_sentences:
             return
-        
-        total_sentences = sentences.count()
-        approved_sentences = sentences.filter(status=2).count()  # Подтвердил корректор
-        translated_sentences = sentences.filter(status__in=[1, 2]).count()  # Подтвердил переводчик или корректор
-        
+
+        approved_sentences = self.sentences_corrected  # Подтвердил корректор
+        translated_sentences = self.sentences_translated + self.sentences_corrected  # Переводчик или корректор
+
         if approved_sentences == total_sentences:
             # Все предложения утверждены корректором
             new_status = "corrected"
@@ -78,15 +193,15 @@ class Document(models.Model):
         else:
             # Документ еще в обработке
             new_status = "pending"
-        
+
         if self.status != new_status:
             self.status = new_status
             self.save(update_fields=['status'])
 
     def get_translation_stats(self):
         """Возвращает статистику переведенных предложений"""
-        total_sentences = self.sentences.count()
-        translated_sentences = self.sentences.filter(status__in=[1, 2]).count()  # Подтвердил переводчик или корректор
+        total_sentences = self.sentences_total
+        translated_sentences = self.sentences_translated + self.sentences_corrected  # Переводчик или корректор
         return {
             'total': total_sentences,
             'translated': translated_sentences,
@@ -95,9 +210,9 @@ class Document(models.Model):
 
     def get_correction_stats(self):
         """Возвращает статистику предложений, подтвержденных корректором"""
-        total_sentences = self.sentences.count()
+        total_sentences = self.sentences_total
         # Предложения, подтвержденные корректором (статус 2)
-        correction_sentences = self.sentences.filter(status=2).count()
+        correction_sentences = self.sentences_corrected
         return {
             'total': total_sentences,
             'correction': correction_sentences,
@@ -132,6 +247,22 @@ class Sentence(models.Model):
         verbose_name="Документ",
     )
     original_text = models.TextField(verbose_name="Оригинальный текст")
+    text_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        verbose_name="Хеш текста",
+        help_text="SHA-256 нормализованного оригинального текста для памяти переводов",
+    )
+    suggested_translation = models.TextField(
+        blank=True,
+        verbose_name="Перевод из памяти",
+        help_text="Утвержденный перевод такого же предложения из другого документа",
+    )
+    # Метрики оригинала считаются при записи, статистика суммирует их в базе (см. utils.text_metrics)
+    word_count = models.PositiveIntegerField(default=0, verbose_name="Слов")
+    character_count = models.PositiveIntegerField(default=0, verbose_name="Символов")
+    character_count_no_spaces = models.PositiveIntegerField(default=0, verbose_name="Символов без пробелов")
     sentence_number = models.PositiveIntegerField(verbose_name="Номер предложения")
     status = models.IntegerField(choices=STATUS_CHOICES, default=0, verbose_name="Статус")
     assigned_to = models.ForeignKey(
@@ -158,10 +289,43 @@ class Sentence(models.Model):
         verbose_name_plural = "Предложения"
         ordering = ["document", "sentence_number"]
         unique_together = ["document", "sentence_number"]
+        # Ключи курсорной пагинации списка предложений
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="sentence_created_at_id_idx"),
+            models.Index(fields=["status", "id"], name="sentence_status_id_idx"),
+            models.Index(fields=["sentence_number", "id"], name="sentence_number_id_idx"),
+        ]
 
     def __str__(self):
         return f"{self.document.title} - Предложение {self.sentence_number}"
 
+    # Статус на момент загрузки из БД: по нему сигнал сдвигает счетчики документа
+    _loaded_status = None
+    # Исполнители и метрики текста на момент загрузки из БД: по ним сигнал сдвигает статистику пользователей
+    _loaded_stats = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get("status")
+        if not instance.get_deferred_fields() & {"assigned_to_id", "corrector_id", *TEXT_METRIC_FIELDS}:
+            instance._loaded_stats = (instance.assigned_to_id, instance.corrector_id, instance.metrics)
+        return instance
+
+    @property
+    def metrics(self):
+        """(слова, символы, символы без пробелов) оригинала"""
+        return self.word_count, self.character_count, self.character_count_no_spaces
+
+    def set_text_metrics(self):
+        """Заполняет хеш и метрики оригинала; вызывается и перед bulk_create, который обходит save()"""
+        self.text_hash = text_hash(self.original_text)
+        self.word_count, self.character_count, self.character_count_no_spaces = text_metrics(self.original_text)
+
+    def save(self, *args, **kwargs):
+        self.set_text_metrics()
+        super().save(*args, **kwargs)
+
     @property
     def has_translation(self):
         """Проверяет, есть ли перевод для предложения"""
@@ -193,6 +357,9 @@ class Translation(models.Model):
         verbose_name="Предложение",
     )
     translated_text = models.TextField(verbose_name="Переведенный текст")
+    word_count = models.PositiveIntegerField(default=0, verbose_name="Слов")
+    character_count = models.PositiveIntegerField(default=0, verbose_name="Символов")
+    character_count_no_spaces = models.PositiveIntegerField(default=0, verbose_name="Символов без пробелов")
     translator = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -220,7 +387,27 @@ class Translation(models.Model):
     def __str__(self):
         return f"Перевод предложения {self.sentence.sentence_number}"
 
+    # Переводчик и метрики текста на момент загрузки из БД: по ним сигнал сдвигает статистику пользователей
+    _loaded_stats = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields() & {"translator_id", *TEXT_METRIC_FIELDS}:
+            instance._loaded_stats = (instance.translator_id, instance.metrics)
+        return instance
+
+    @property
+    def metrics(self):
+        """(слова, символы, символы без пробелов) перевода"""
+        return self.word_count, self.character_count, self.character_count_no_spaces
+
+    def set_text_metrics(self):
+        """Заполняет метрики перевода; вызывается и перед bulk_create, который обходит save()"""
+        self.word_count, self.character_count, self.character_count_no_spaces = text_metrics(self.translated_text)
+
     def save(self, *args, **kwargs):
+        self.set_text_metrics()
         # Обновляем статус предложения при сохранении перевода
         if self.status == "approved":
             self.sentence.status = 2
@@ -268,3 +455,196 @@ class TranslationHistory(models.Model):
 
     def __str__(self):
         return f"История перевода {self.translation.id} - {self.action}"
+
+
+class SimilarityBand(models.Model):
+    """
+    Полоса MinHash LSH предложения с утвержденным переводом (индекс похожих предложений).
+    На каждое предложение приходится NUM_BANDS строк, см. translations/similarity.py.
+    """
+
+    sentence = models.ForeignKey(
+        Sentence,
+        on_delete=models.CASCADE,
+        related_name="similarity_bands",
+        verbose_name="Предложение",
+    )
+    key = models.BigIntegerField(db_index=True, verbose_name="Ключ полосы")
+
+    class Meta:
+        verbose_name = "Полоса индекса похожих предложений"
+        verbose_name_plural = "Индекс похожих предложений"
+
+    def __str__(self):
+        return f"Полоса {self.key} предложения {self.sentence_id}"
+
+
+class UserStats(models.Model):
+    """
+    Сводная статистика пользователя по роли: предложения, слова и символы оригиналов и переводов.
+    Сдвигается приращениями при записи предложений и переводов (см. translations/user_stats.py),
+    полностью пересчитывается командой rebuild_user_stats.
+    """
+
+    ROLE_CHOICES = [
+        ("translator", "Переводчик"),
+        ("corrector", "Корректор"),
+        ("uploader", "Загрузивший документы"),
+    ]
+
+    COUNTER_FIELDS = [
+        "sentences",
+        "words",
+        "characters",
+        "characters_no_spaces",
+        "translated_sentences",
+        "translated_words",
+        "translated_characters",
+        "translated_characters_no_spaces",
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="stats",
+        verbose_name="Пользователь",
+    )
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES, verbose_name="Роль")
+    sentences = models.PositiveBigIntegerField(default=0, verbose_name="Предложений")
+    words = models.PositiveBigIntegerField(default=0, verbose_name="Слов")
+    characters = models.PositiveBigIntegerField(default=0, verbose_name="Символов")
+    characters_no_spaces = models.PositiveBigIntegerField(default=0, verbose_name="Символов без пробелов")
+    translated_sentences = models.PositiveBigIntegerField(default=0, verbose_name="Переведенных предложений")
+    translated_words = models.PositiveBigIntegerField(default=0, verbose_name="Слов перевода")
+    translated_characters = models.PositiveBigIntegerField(default=0, verbose_name="Символов перевода")
+    translated_characters_no_spaces = models.PositiveBigIntegerField(
+        default=0, verbose_name="Символов перевода без пробелов"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    class Meta:
+        verbose_name = "Статистика пользователя"
+        verbose_name_plural = "Статистика пользователей"
+        unique_together = ["user", "role"]
+
+    def __str__(self):
+        return f"{self.user} - {self.get_role_display()}"
+
+    @staticmethod
+    def role_for_user(user):
+        """Роль статистики, которую показывает кабинет пользователя"""
+        if user.role in ["translator", "corrector"]:
+            return user.role
+        return "uploader"
+
+    @classmethod
+    def for_user(cls, user):
+        """Статистика пользователя в формате UserDetailView.get_user_statistics (один запрос)"""
+        stats = cls.objects.filter(user=user, role=cls.role_for_user(user)).first() or cls()
+        return {
+            "total_sentences": stats.sentences,
+            "translated_sentences": stats.translated_sentences,
+            "total_words": stats.words,
+            "total_characters": stats.characters,
+            "total_characters_without_spaces": stats.characters_no_spaces,
+            "total_translated_words": stats.translated_words,
+            "total_translated_characters": stats.translated_characters,
+            "total_translated_characters_without_spaces": stats.translated_characters_no_spaces,
+        }
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """
+        Атомарно применяет приращения {(user_id, role): {поле: приращение}}: одним UPDATE через F() на строку,
+        недостающие строки создаются. Значения не опускаются ниже нуля, точные числа восстанавливает rebuild_user_stats.
+        """
+        for (user_id, role), delta in deltas.items():
+            delta = {field: value for field, value in delta.items() if value}
+            if not delta or user_id is None:
+                continue
+            changes = {field: Greatest(F(field) + value, Value(0)) for field, value in delta.items()}
+            if cls.objects.filter(user_id=user_id, role=role).update(**changes):
+                continue
+            try:
+                with transaction.atomic():
+                    initial = {field: max(value, 0) for field, value in delta.items()}
+                    cls.objects.create(user_id=user_id, role=role, **initial)
+            except IntegrityError:
+                # Строку успел создать параллельный запрос
+                cls.objects.filter(user_id=user_id, role=role).update(**changes)
+
+
+class IngestionJob(models.Model):
+    """Фоновая задача извлечения предложений из загруженного документа"""
+
+    STATUS_CHOICES = [
+        ("queued", "В очереди"),
+        ("running", "Выполняется"),
+        ("completed", "Завершена"),
+        ("failed", "Ошибка"),
+    ]
+
+    # Время жизни прогресса выполняющейся задачи в кэше (секунды)
+    PROGRESS_CACHE_TIMEOUT = 60 * 60
+
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.CASCADE,
+        related_name="ingestion_jobs",
+        verbose_name="Документ",
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued", verbose_name="Статус")
+    parsed = models.PositiveIntegerField(default=0, verbose_name="Разобрано предложений")
+    inserted = models.PositiveIntegerField(default=0, verbose_name="Сохранено предложений")
+    total = models.PositiveIntegerField(null=True, blank=True, verbose_name="Всего предложений")
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    class Meta:
+        verbose_name = "Задача загрузки"
+        verbose_name_plural = "Задачи загрузки"
+        ordering = ["-created_at"]
+        get_latest_by = "created_at"
+
+    def __str__(self):
+        return f"Загрузка документа {self.document_id} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        """Проверяет, завершена ли задача (успешно или с ошибкой)"""
+        return self.status in ["completed", "failed"]
+
+    def update_progress(self, **fields):
+        """Сохраняет прогресс одним UPDATE без повторного чтения строки"""
+        fields["updated_at"] = timezone.now()
+        IngestionJob.objects.filter(pk=self.pk).update(**fields)
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    @property
+    def progress_cache_key(self):
+        return f"ingestion_job_progress:{self.pk}"
+
+    def publish_progress(self, **fields):
+        """Передает счетчики прогресса выполняющейся задачи через кэш, минуя транзакцию загрузки"""
+        for name, value in fields.items():
+            setattr(self, name, value)
+        cache.set(self.progress_cache_key, fields, self.PROGRESS_CACHE_TIMEOUT)
+
+    def as_progress_dict(self):
+        """Прогресс задачи для опроса со страницы загрузки"""
+        if self.status == "running":
+            for name, value in (cache.get(self.progress_cache_key) or {}).items():
+                setattr(self, name, value)
+        return {
+            "id": self.id,
+            "document_id": self.document_id,
+            "status": self.status,
+            "status_display": self.get_status_display(),
+            "parsed": self.parsed,
+            "inserted": self.inserted,
+            "total": self.total,
+            "error": self.error,
+            "finished": self.is_finished,
+        }
@@ -0,0 +1,169 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+from django.db.models import F, Q
+
+# Точный подсчет выполняется не дальше этого числа строк: COUNT(*) по всей таблице растет вместе с ней
+APPROXIMATE_COUNT_LIMIT = 1000
+
+CURSOR_PARAM = "cursor"
+
+
+def _encode_value(value):
+    # Дата передается полностью, с микросекундами: иначе строки с одной и той же секундой будут потеряны
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(ordering: Sequence[str], values: Sequence, before: bool = False) -> str:
+    """Непрозрачный курсор: значения ключа сортировки граничной строки и направление перехода"""
+    payload = {"o": list(ordering), "v": [_encode_value(value) for value in values], "b": before}
+    data = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, ordering: Sequence[str]):
+    """
+    Возвращает (values, before) или None, если курсор поврежден
+    либо выдан для другой сортировки - тогда показывается первая страница
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(data)
+        if payload["o"] != list(ordering) or len(payload["v"]) != len(ordering):
+            return None
+        return [_decode_value(value) for value in payload["v"]], bool(payload["b"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        return None
+
+
+class KeysetPage:
+    """Страница курсорной пагинации: итерируется как список объектов, ссылки строятся через querystring"""
+
+    def __init__(self, paginator, object_list, has_previous, has_next, params):
+        self.paginator = paginator
+        self.object_list = object_list
+        self._has_previous = has_previous
+        self._has_next = has_next
+        self.params = params
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    def _querystring(self, cursor):
+        params = self.params.copy()
+        params[CURSOR_PARAM] = cursor
+        return params.urlencode()
+
+    @property
+    def previous_querystring(self):
+        if not self._has_previous:
+            return ""
+        return self._querystring(self.paginator.cursor_for(self.object_list[0], before=True))
+
+    @property
+    def next_querystring(self):
+        if not self._has_next:
+            return ""
+        return self._querystring(self.paginator.cursor_for(self.object_list[-1]))
+
+
+class KeysetPaginator:
+    """
+    Курсорная (keyset) пагинация: следующая страница выбирается условием WHERE по ключу сортировки
+    последней показанной строки, а не через OFFSET, поэтому любая страница стоит столько же, сколько первая.
+
+    ordering - поля сортировки (с "-" для убывания), вместе они должны однозначно определять строку,
+    например ("document_id", "sentence_number") или ("-created_at", "-id").
+    """
+
+    def __init__(self, queryset, ordering: Sequence[str], per_page: int, count: Optional[int] = None):
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip("-") for name in self.ordering]
+        self.descending = [name.startswith("-") for name in self.ordering]
+        # Значения ключа читаются из аннотаций, чтобы поля связанных моделей не требовали отдельных запросов
+        self.aliases = [f"keyset_{index}" for index in range(len(self.fields))]
+        self.queryset = queryset.annotate(**{alias: F(field) for alias, field in zip(self.aliases, self.fields)})
+        self.per_page = per_page
+        self._count = count
+
+    def _count_rows(self):
+        if self._count is None:
+            limited = self.queryset.order_by().values("pk")[: APPROXIMATE_COUNT_LIMIT + 1]
+            self._count = limited.count()
+        return self._count
+
+    @property
+    def count(self):
+        """Количество строк, но не больше APPROXIMATE_COUNT_LIMIT + 1"""
+        return self._count_rows()
+
+    @property
+    def count_is_exact(self):
+        return self._count_rows() <= APPROXIMATE_COUNT_LIMIT
+
+    @property
+    def count_display(self):
+        if self.count_is_exact:
+            return str(self.count)
+        return f"более {APPROXIMATE_COUNT_LIMIT}"
+
+    def cursor_for(self, obj, before: bool = False) -> str:
+        return encode_cursor(self.ordering, [getattr(obj, alias) for alias in self.aliases], before)
+
+    def _boundary_filter(self, values: List, before: bool) -> Q:
+        # (a, b) > (x, y) раскрывается в a > x OR (a = x AND b > y); направление учитывается для каждого поля
+        condition = Q()
+        for index, (field, descending) in enumerate(zip(self.fields, self.descending)):
+            lookup = "lt" if descending != before else "gt"
+            step = Q(**dict(zip(self.fields[:index], values[:index])), **{f"{field}__{lookup}": values[index]})
+            condition |= step
+        return condition
+
+    def get_page(self, params) -> KeysetPage:
+        """Страница по параметрам запроса: курсор берется из ?cursor=, остальные параметры сохраняются в ссылках"""
+        cursor = params.get(CURSOR_PARAM)
+        decoded = decode_cursor(cursor, self.ordering) if cursor else None
+        params = params.copy()
+        params.pop(CURSOR_PARAM, None)
+        params.pop("page", None)
+
+        if decoded is not None:
+            values, before = decoded
+            queryset = self.queryset.filter(self._boundary_filter(values, before))
+            if before:
+                # Предыдущая страница: идем в обратном порядке от первой строки и разворачиваем результат
+                reverse_ordering = [name[1:] if name.startswith("-") else f"-{name}" for name in self.ordering]
+                rows = list(queryset.order_by(*reverse_ordering)[: self.per_page + 1])
+                page = KeysetPage(self, rows[: self.per_page][::-1], len(rows) > self.per_page, True, params)
+            else:
+                rows = list(queryset.order_by(*self.ordering)[: self.per_page + 1])
+                page = KeysetPage(self, rows[: self.per_page], True, len(rows) > self.per_page, params)
+            if rows:
+                return page
+            # За курсором ничего не осталось (строки удалены) - показываем первую страницу
+
+        rows = list(self.queryset.order_by(*self.ordering)[: self.per_page + 1])
+        return KeysetPage(self, rows[: self.per_page], False, len(rows) > self.per_page, params)
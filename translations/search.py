@@ -0,0 +1,192 @@
+import re
+from typing import List, Tuple
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from users.models import User
+
+from .models import Document, Sentence, Translation
+
+# Полнотекстовый индекс охватывает оригинал предложения и текст его перевода.
+# PostgreSQL: колонка search_vector (tsvector) с GIN-индексом, SQLite: таблица FTS5.
+# Оба индекса поддерживаются триггерами базы данных, поэтому bulk_create и update() их тоже обновляют.
+
+# Для ингушского языка нет словаря со стеммингом, поэтому слова индексируются как есть
+POSTGRES_SEARCH_CONFIG = "simple"
+SQLITE_FTS_TABLE = "translations_sentence_fts"
+
+# Триггеры SQLite создаются миграцией 0015 и восстанавливаются после каждой миграции:
+# при изменении столбцов SQLite пересоздает таблицу, и ее триггеры теряются
+SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS translations_sentence_fts_insert AFTER INSERT ON translations_sentence BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, original_text, translated_text) VALUES (new.id, new.original_text, '');
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS translations_sentence_fts_update
+    AFTER UPDATE OF original_text ON translations_sentence BEGIN
+        UPDATE {SQLITE_FTS_TABLE} SET original_text = new.original_text WHERE rowid = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS translations_sentence_fts_delete AFTER DELETE ON translations_sentence BEGIN
+        DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS translations_translation_fts_insert AFTER INSERT ON translations_translation BEGIN
+        UPDATE {SQLITE_FTS_TABLE} SET translated_text = new.translated_text WHERE rowid = new.sentence_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS translations_translation_fts_update
+    AFTER UPDATE OF translated_text ON translations_translation BEGIN
+        UPDATE {SQLITE_FTS_TABLE} SET translated_text = new.translated_text WHERE rowid = new.sentence_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS translations_translation_fts_delete AFTER DELETE ON translations_translation BEGIN
+        UPDATE {SQLITE_FTS_TABLE} SET translated_text = '' WHERE rowid = old.sentence_id;
+    END
+    """,
+]
+
+WORD_PATTERN = re.compile(r"\w+")
+MAX_SEARCH_TERMS = 8
+
+
+def parse_search_query(query: str) -> Tuple[List[str], str]:
+    """
+    Разбирает строку поиска: (terms, phrase).
+    Слова ищутся по полнотекстовому индексу как префиксы. Запрос в кавычках или без единого слова
+    ищется как подстрока (phrase) - в PostgreSQL такой поиск использует триграммные индексы.
+    Если ни одно предложение не содержит слов с такими началами, запрос тоже ищется как подстрока
+    (см. search_sentences), поэтому часть слова по-прежнему находится.
+    """
+    query = query.strip()
+    if len(query) > 2 and query[0] == query[-1] == '"':
+        return [], query[1:-1].strip()
+    terms = WORD_PATTERN.findall(query.lower())[:MAX_SEARCH_TERMS]
+    if not terms:
+        return [], query
+    return terms, ""
+
+
+def _postgres_text_match(terms):
+    column = f'"{Sentence._meta.db_table}"."search_vector"'
+    tsquery = " & ".join(f"{term}:*" for term in terms)
+    params = (POSTGRES_SEARCH_CONFIG, tsquery)
+    match = RawSQL(f"{column} @@ to_tsquery(%s::regconfig, %s)", params, output_field=BooleanField())
+    # Нормализация 1 делит оценку на логарифм длины текста: короткие совпадения выше, как у bm25() в SQLite
+    rank = RawSQL(f"ts_rank({column}, to_tsquery(%s::regconfig, %s), 1)", params, output_field=FloatField())
+    return match, rank
+
+
+def _sqlite_text_match(terms):
+    sentence_id = f'"{Sentence._meta.db_table}"."id"'
+    fts_query = " ".join(f'"{term}"*' for term in terms)
+    match = RawSQL(
+        f"{sentence_id} IN (SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s)",
+        (fts_query,),
+        output_field=BooleanField(),
+    )
+    # bm25() доступен только в запросе с MATCH: оценки всех совпадений считаются одним производным запросом,
+    # а строка предложения находит свою оценку по rowid. LIMIT -1 не дает SQLite подставить условие rowid
+    # внутрь MATCH: иначе поиск и статистика bm25() повторялись бы для каждой строки. Производная таблица
+    # строится один раз с автоматическим индексом по rowid. bm25() тем меньше, чем лучше совпадение,
+    # поэтому знак меняется
+    rank = RawSQL(
+        f"(SELECT matches.score FROM (SELECT rowid, -bm25({SQLITE_FTS_TABLE}) AS score FROM {SQLITE_FTS_TABLE} "
+        f"WHERE {SQLITE_FTS_TABLE} MATCH %s LIMIT -1) AS matches WHERE matches.rowid = {sentence_id})",
+        (fts_query,),
+        output_field=FloatField(),
+    )
+    return match, rank
+
+
+def _text_match(terms):
+    """Условие и оценка поиска слов по индексу; None, если для базы данных индекса нет"""
+    if connection.vendor == "postgresql":
+        return _postgres_text_match(terms)
+    if connection.vendor == "sqlite":
+        return _sqlite_text_match(terms)
+    return None
+
+
+def ensure_sqlite_triggers(db_connection):
+    """Создает недостающие триггеры индекса FTS5 (только SQLite и только если таблица индекса уже есть)"""
+    if db_connection.vendor != "sqlite" or SQLITE_FTS_TABLE not in db_connection.introspection.table_names():
+        return
+    with db_connection.cursor() as cursor:
+        for statement in SQLITE_TRIGGERS:
+            cursor.execute(statement)
+
+
+def search_sentences(queryset, query, match_files=False, match_assignees=False, match_translators=False):
+    """
+    Фильтрует queryset предложений по строке поиска и добавляет аннотацию search_rank (больше - релевантнее).
+
+    Текст оригинала и перевода ищется по полнотекстовому индексу. Если по началам слов ничего не найдено
+    или для базы данных нет индекса, текст ищется как подстрока (icontains), как до появления индекса.
+    Дополнительные условия
+    (имя файла документа, имя назначенного переводчика или автора перевода) задаются подзапросами
+    по небольшим таблицам, чтобы база могла объединить их с индексом без просмотра всех предложений.
+    """
+    terms, phrase = parse_search_query(query)
+    text_match = _text_match(terms) if terms else None
+    if text_match and not queryset.filter(text_match[0]).exists():
+        # Запрос может быть серединой слова: такие совпадения находит только поиск подстроки
+        text_match = None
+    if text_match:
+        match, rank = text_match
+        condition = Q(match)
+        rank = Coalesce(rank, Value(0.0))
+    else:
+        phrase = phrase or query.strip()
+        condition = Q(original_text__icontains=phrase) | Q(
+            id__in=Translation.objects.filter(translated_text__icontains=phrase).values("sentence_id")
+        )
+        rank = Value(0.0)
+
+    text = phrase or query.strip()
+    if match_files:
+        condition |= Q(document__in=Document.objects.filter(file__icontains=text))
+    if match_assignees or match_translators:
+        users = User.objects.filter(Q(first_name__icontains=text) | Q(last_name__icontains=text))
+        if match_assignees:
+            condition |= Q(assigned_to__in=users)
+        if match_translators:
+            condition |= Q(id__in=Translation.objects.filter(translator__in=users).values("sentence_id"))
+
+    return queryset.filter(condition).annotate(search_rank=rank)
+
+
+def highlight(text, query):
+    """Экранирует текст и выделяет совпадения с запросом тегом <mark>"""
+    text = "" if text is None else str(text)
+    terms, phrase = parse_search_query(query or "")
+    if terms:
+        # Слова запроса ищутся как начала слов текста, выделяется слово целиком;
+        # если их нет, предложение найдено поиском подстроки, и выделяется она
+        pattern = r"(?<!\w)(?:" + "|".join(re.escape(term) for term in terms) + r")\w*"
+        if not re.search(pattern, text, re.IGNORECASE):
+            pattern = re.escape(query.strip())
+    elif phrase:
+        pattern = re.escape(phrase)
+    else:
+        return escape(text)
+
+    parts = []
+    position = 0
+    for found in re.finditer(pattern, text, re.IGNORECASE):
+        parts.append(escape(text[position : found.start()]))
+        parts.append(f"<mark>{escape(found.group(0))}</mark>")
+        position = found.end()
+    parts.append(escape(text[position:]))
+    return mark_safe("".join(parts))
@@ -1,11 +1,18 @@
-import os
-
-from django.core.files.storage import default_storage
-from django.db.models.signals import post_save
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save
 from django.dispatch import receiver
 
-from .models import Document, Sentence, Translation
-from .utils import extract_and_validate_sentences
+from .batching import current_batch
+from .ingestion import start_ingestion
+from .models import Document, Sentence, Translation, TranslationHistory
+from .search import ensure_sqlite_triggers
+from .similarity import index_sentence, remove_sentence
+from .user_stats import (
+    is_removed,
+    sentence_deleted,
+    sentence_saved,
+    translation_changed,
+)
 
 
 @receiver(post_save, sender=Translation)
@@ -33,59 +40,161 @@ def create_translation_history(sender, instance, created, **kwargs):
     else:
         user = instance.translator
 
-    # Создаем запись в истории
-    instance.history.create(
+    # Создаем запись в истории (внутри batched_signals() - одним bulk_create при выходе из блока)
+    history = TranslationHistory(
+        translation=instance,
         translated_text=instance.translated_text,
         user=user,
         action=action,
         notes=notes or "",
     )
+    batch = current_batch()
+    if batch is not None:
+        batch.add_history(history)
+    else:
+        history.save()
 
 
 @receiver(post_save, sender=Document)
 def process_document_sentences(sender, instance, created, **kwargs):
     """Обрабатывает загруженный документ и создает предложения"""
     if created and not instance.is_processed:
-        try:
-            # Получаем путь к файлу
-            file_path = default_storage.path(instance.file.name)
-            file_extension = os.path.splitext(instance.file.name)[1]
-
-            # Извлекаем предложения из файла
-            sentences_data = extract_and_validate_sentences(file_path, file_extension)
-
-            # Создаем предложения в базе данных
-            sentences_to_create = []
-            for sentence_number, sentence_text in sentences_data:
-                sentences_to_create.append(
-                    Sentence(
-                        document=instance,
-                        original_text=sentence_text,
-                        sentence_number=sentence_number,
-                    )
-                )
-
-            # Массовое создание предложений
-            if sentences_to_create:
-                Sentence.objects.bulk_create(sentences_to_create)
-
-            # Отмечаем документ как обработанный
-            instance.is_processed = True
-            instance.save(update_fields=["is_processed"])
-
-        except Exception as e:
-            # В случае ошибки логируем её (в продакшене лучше использовать proper logging)
-            print(f"Ошибка при обработке документа {instance.id}: {str(e)}")
-            # Можно также отправить уведомление администратору
+        # Разбор файла выполняется в фоновой задаче, ошибки сохраняются в IngestionJob
+        start_ingestion(instance)
 
 
 @receiver(post_save, sender=Sentence)
-def update_document_status_on_sentence_change(sender, instance, **kwargs):
-    """Обновляет статус документа при изменении статуса предложения"""
-    instance.document.update_status()
+def update_document_status_on_sentence_change(sender, instance, created, **kwargs):
+    """Сдвигает счетчики документа и обновляет его статус при изменении статуса предложения"""
+    old_status = None if created else instance._loaded_status
+    if not created and old_status == instance.status:
+        return
+
+    document = instance.document
+    batch = current_batch()
+    if not created and old_status is None:
+        # Исходный статус неизвестен (например, предложение загружено без поля status)
+        if batch is not None:
+            batch.refresh_progress_counters(document)
+        else:
+            document.refresh_progress_counters()
+    elif batch is not None:
+        batch.change_progress_counters(document, old_status, instance.status)
+    else:
+        document.change_progress_counters(old_status, instance.status)
+    instance._loaded_status = instance.status
+
+    if batch is None:
+        document.update_status()
+
+
+@receiver(post_delete, sender=Sentence)
+def update_document_status_on_sentence_delete(sender, instance, **kwargs):
+    """Вычитает удаленное предложение из счетчиков документа и обновляет его статус"""
+    if is_removed(instance.pk):
+        # Счетчики пересчитает код, удаляющий предложения массово (removing_sentences)
+        return
+
+    document = instance.document
+    batch = current_batch()
+    if instance._loaded_status is None:
+        # Исходный статус неизвестен (например, предложение загружено без поля status)
+        if batch is not None:
+            batch.refresh_progress_counters(document)
+        else:
+            document.refresh_progress_counters()
+    elif batch is not None:
+        batch.change_progress_counters(document, old_status=instance._loaded_status)
+    else:
+        document.change_progress_counters(old_status=instance._loaded_status)
+
+    if batch is None:
+        document.update_status()
 
 
 @receiver(post_save, sender=Translation)
 def update_document_status_on_translation_change(sender, instance, **kwargs):
     """Обновляет статус документа при изменении перевода"""
-    instance.sentence.document.update_status()
+    batch = current_batch()
+    if batch is not None:
+        batch.touch_document(instance.sentence.document)
+    else:
+        instance.sentence.document.update_status()
+
+
+@receiver(post_save, sender=Translation)
+def update_similarity_index(sender, instance, **kwargs):
+    """Поддерживает индекс похожих предложений: в него входят только предложения с утвержденным переводом"""
+    text = instance.sentence.original_text if instance.status == "approved" else None
+    batch = current_batch()
+    if batch is not None:
+        batch.update_similarity(instance.sentence_id, text)
+    elif text is not None:
+        index_sentence(instance.sentence_id, text)
+    else:
+        remove_sentence(instance.sentence_id)
+
+
+@receiver(post_delete, sender=Translation)
+def remove_from_similarity_index(sender, instance, **kwargs):
+    """Предложение без перевода убирается из индекса похожих предложений"""
+    if is_removed(instance.sentence_id):
+        return
+    batch = current_batch()
+    if batch is not None:
+        batch.update_similarity(instance.sentence_id, None)
+    else:
+        remove_sentence(instance.sentence_id)
+
+
+def bump_document_stats_version(document):
+    batch = current_batch()
+    if batch is not None:
+        batch.bump_stats_version(document)
+    else:
+        document.bump_stats_version()
+
+
+@receiver(post_save, sender=Sentence)
+@receiver(post_delete, sender=Sentence)
+def bump_stats_version_on_sentence_change(sender, instance, **kwargs):
+    """Сбрасывает кэш статистики документа при записи или удалении предложения"""
+    if not is_removed(instance.pk):
+        bump_document_stats_version(instance.document)
+
+
+@receiver(post_save, sender=Translation)
+@receiver(post_delete, sender=Translation)
+def bump_stats_version_on_translation_change(sender, instance, **kwargs):
+    """Сбрасывает кэш статистики документа при записи или удалении перевода"""
+    if not is_removed(instance.sentence_id):
+        bump_document_stats_version(instance.sentence.document)
+
+
+@receiver(post_save, sender=Sentence)
+def update_user_stats_on_sentence_change(sender, instance, created, **kwargs):
+    """Сдвигает статистику пользователей при создании предложения, смене исполнителей или текста"""
+    sentence_saved(instance, created)
+
+
+@receiver(post_delete, sender=Sentence)
+def update_user_stats_on_sentence_delete(sender, instance, **kwargs):
+    sentence_deleted(instance)
+
+
+@receiver(post_save, sender=Translation)
+def update_user_stats_on_translation_change(sender, instance, created, **kwargs):
+    """Сдвигает статистику переводчика, корректора и загрузившего документ при записи перевода"""
+    translation_changed(instance, created=created)
+
+
+@receiver(post_delete, sender=Translation)
+def update_user_stats_on_translation_delete(sender, instance, **kwargs):
+    translation_changed(instance, deleted=True)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    """Восстанавливает триггеры поискового индекса SQLite после пересоздания таблиц миграциями"""
+    if sender.name == "translations":
+        ensure_sqlite_triggers(connections[using])
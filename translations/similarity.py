@@ -0,0 +1,126 @@
+import hashlib
+import struct
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Sentence, SimilarityBand
+from .utils import normalize_text
+
+# Параметры MinHash LSH: 16 полос по 4 значения дают порог сходства кандидатов около 0.5
+SHINGLE_SIZE = 3
+NUM_BANDS = 16
+ROWS_PER_BAND = 4
+NUM_PERMUTATIONS = NUM_BANDS * ROWS_PER_BAND
+
+# Значения всех хеш-функций для n-граммы берутся из одного вывода SHAKE-128 (по 4 байта на функцию):
+# так сигнатура считается встроенными функциями без цикла по перестановкам в Python
+SIGNATURE_FORMAT = struct.Struct(f"<{NUM_PERMUTATIONS}I")
+
+# Сколько кандидатов из индекса проверяется точным сравнением и минимальное сходство для показа
+SIMILAR_CANDIDATES_LIMIT = 100
+SIMILARITY_THRESHOLD = 0.5
+SIMILAR_DEFAULT_LIMIT = 5
+
+
+def _comparable_text(text: str) -> str:
+    return normalize_text(text).lower()
+
+
+def shingles(text: str) -> Set[str]:
+    """Символьные n-граммы нормализованного текста без учета регистра"""
+    text = _comparable_text(text)
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i : i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text: str) -> List[int]:
+    """MinHash-сигнатура текста из NUM_PERMUTATIONS значений"""
+    hashed = [
+        SIGNATURE_FORMAT.unpack(hashlib.shake_128(shingle.encode("utf-8")).digest(SIGNATURE_FORMAT.size))
+        for shingle in shingles(text)
+    ]
+    return list(map(min, zip(*hashed)))
+
+
+def band_keys(text: str) -> List[int]:
+    """Ключи LSH-полос: по одному 64-битному ключу на полосу (номер полосы входит в ключ)"""
+    signature = minhash_signature(text)
+    if not signature:
+        return []
+    keys = []
+    for band in range(NUM_BANDS):
+        values = signature[band * ROWS_PER_BAND : (band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(struct.pack(f"<H{ROWS_PER_BAND}I", band, *values), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+
+def build_bands(sentences: Iterable[Tuple[int, str]]) -> List[SimilarityBand]:
+    """Строки индекса для пар (id предложения, оригинальный текст)"""
+    return [
+        SimilarityBand(sentence_id=sentence_id, key=key) for sentence_id, text in sentences for key in band_keys(text)
+    ]
+
+
+def index_sentence(sentence_id: int, text: str) -> None:
+    """Добавляет (или переиндексирует) предложение с утвержденным переводом"""
+    with transaction.atomic():
+        SimilarityBand.objects.filter(sentence_id=sentence_id).delete()
+        SimilarityBand.objects.bulk_create(build_bands([(sentence_id, text)]))
+
+
+def remove_sentence(sentence_id: int) -> None:
+    """Убирает предложение из индекса (перевод больше не утвержден)"""
+    SimilarityBand.objects.filter(sentence_id=sentence_id).delete()
+
+
+def find_similar(
+    text: str, limit: int = SIMILAR_DEFAULT_LIMIT, exclude_sentence_id: Optional[int] = None
+) -> List[Dict]:
+    """
+    Возвращает до limit наиболее похожих предложений с утвержденными переводами.
+    Кандидаты выбираются по совпадающим LSH-полосам, затем ранжируются по точному коэффициенту Жаккара.
+    """
+    keys = band_keys(text)
+    if not keys:
+        return []
+
+    candidates = SimilarityBand.objects.filter(key__in=keys)
+    if exclude_sentence_id is not None:
+        candidates = candidates.exclude(sentence_id=exclude_sentence_id)
+    candidate_ids = list(
+        candidates.values("sentence_id")
+        .annotate(hits=Count("id"))
+        .order_by("-hits")
+        .values_list("sentence_id", flat=True)[:SIMILAR_CANDIDATES_LIMIT]
+    )
+    if not candidate_ids:
+        return []
+
+    rows = Sentence.objects.filter(id__in=candidate_ids, translation__status="approved").values(
+        "id", "sentence_number", "document_id", "original_text", "translation__translated_text"
+    )
+
+    # Точное сходство - коэффициент Жаккара по n-граммам (операции над множествами выполняются в C)
+    query_shingles = shingles(text)
+    results = []
+    for row in rows:
+        candidate_shingles = shingles(row["original_text"])
+        similarity = len(query_shingles & candidate_shingles) / len(query_shingles | candidate_shingles)
+        if similarity >= SIMILARITY_THRESHOLD:
+            results.append(
+                {
+                    "sentence_id": row["id"],
+                    "sentence_number": row["sentence_number"],
+                    "document_id": row["document_id"],
+                    "original_text": row["original_text"],
+                    "translated_text": row["translation__translated_text"],
+                    "similarity": round(similarity * 100),
+                }
+            )
+
+    results.sort(key=lambda item: item["similarity"], reverse=True)
+    return results[:limit]
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .ingestion import run_ingestion_job
+
+
+@shared_task(name="translations.ingest_document")
+def ingest_document_task(job_id):
+    """Фоновая загрузка предложений документа"""
+    run_ingestion_job(job_id)
@@ -0,0 +1,11 @@
+from django import template
+
+from translations.search import highlight as highlight_matches
+
+register = template.Library()
+
+
+@register.filter
+def highlight(text, query):
+    """Выделяет совпадения с поисковым запросом: {{ sentence.original_text|highlight:search_query }}"""
+    return highlight_matches(text, query)
@@ -0,0 +1,157 @@
+"""
+Бюджеты SQL-запросов страниц translations/urls.py на малом и большом наборах данных (conftest.corpus).
+Число запросов на обоих наборах одинаково, а запрос на строку (N+1) сразу превышает бюджет.
+"""
+
+import json
+
+from django.urls import reverse
+
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+# Пользователь, метод, url(corpus), данные(corpus), бюджет запросов
+CASES = [
+    pytest.param("admin", "get", lambda c: reverse("translations:document_list"), None, 8, id="document_list"),
+    pytest.param(
+        "translator", "get", lambda c: reverse("translations:document_list"), None, 4, id="document_list_translator"
+    ),
+    pytest.param("admin", "get", lambda c: reverse("translations:document_upload"), None, 2, id="document_upload"),
+    pytest.param(
+        "admin",
+        "get",
+        lambda c: reverse("translations:ingestion_job_status", args=[c.job.id]),
+        None,
+        3,
+        id="ingestion_job_status",
+    ),
+    pytest.param(
+        "admin",
+        "get",
+        lambda c: reverse("translations:document_detail", args=[c.document.id]),
+        None,
+        7,
+        id="document_detail",
+    ),
+    pytest.param(
+        "admin",
+        "post",
+        lambda c: reverse("translations:documents_bulk_assign"),
+        lambda c: {"document_ids": [c.document.id], "assigned_to": c.translator.id, "corrector": c.corrector.id},
+        16,
+        id="documents_bulk_assign",
+    ),
+    pytest.param(
+        "admin",
+        "post",
+        lambda c: reverse("translations:document_bulk_assign", args=[c.document.id]),
+        lambda c: {"assigned_to": c.translator.id},
+        12,
+        id="document_bulk_assign",
+    ),
+    pytest.param(
+        "admin",
+        "post",
+        lambda c: reverse("translations:document_delete", args=[c.document.id]),
+        None,
+        21,
+        id="document_delete",
+    ),
+    pytest.param("admin", "get", lambda c: reverse("translations:sentence_list"), None, 5, id="sentence_list"),
+    pytest.param(
+        "admin",
+        "get",
+        lambda c: reverse("translations:sentence_list") + "?search=" + c.search_word,
+        None,
+        6,
+        id="sentence_list_search",
+    ),
+    pytest.param(
+        "representative",
+        "get",
+        lambda c: reverse("translations:sentence_list"),
+        None,
+        5,
+        id="sentence_list_representative",
+    ),
+    pytest.param(
+        "admin",
+        "get",
+        lambda c: reverse("translations:sentence_detail", args=[c.translated_sentence.id]),
+        None,
+        7,
+        id="sentence_detail",
+    ),
+    pytest.param(
+        "admin",
+        "post",
+        lambda c: reverse("translations:sentence_delete", args=[c.sentence.id]),
+        None,
+        12,
+        id="sentence_delete",
+    ),
+    pytest.param(
+        "translator",
+        "post",
+        lambda c: reverse("translations:update_sentence_translation", args=[c.sentence.id]),
+        lambda c: json.dumps({"translated_text": "Новый перевод"}),
+        22,
+        id="update_sentence_translation",
+    ),
+    pytest.param(
+        "admin",
+        "get",
+        lambda c: reverse("translations:sentence_export") + f"?document={c.document.id}",
+        None,
+        1,
+        id="sentence_export",
+    ),
+    pytest.param("admin", "get", lambda c: reverse("translations:translation_list"), None, 4, id="translation_list"),
+    pytest.param(
+        "admin", "get", lambda c: reverse("translations:approved_translations"), None, 4, id="approved_translations"
+    ),
+    pytest.param(
+        "admin", "get", lambda c: reverse("translations:rejected_translations"), None, 4, id="rejected_translations"
+    ),
+    pytest.param(
+        "admin", "get", lambda c: reverse("translations:pending_translations"), None, 4, id="pending_translations"
+    ),
+    pytest.param(
+        "admin",
+        "get",
+        lambda c: reverse("translations:export_document_all", args=[c.document.id]),
+        None,
+        4,
+        id="export_document_all",
+    ),
+    *[
+        pytest.param(
+            "admin",
+            "get",
+            lambda c, export_format=export_format: reverse(
+                "translations:export_document", args=[c.document.id, export_format]
+            ),
+            None,
+            4,
+            id=f"export_document_{export_format}",
+        )
+        for export_format in ["txt", "docx_table", "docx_translated", "xlsx"]
+    ],
+]
+
+
+@pytest.mark.parametrize("user, method, url, data, budget", CASES)
+def test_query_budget(client, corpus, query_budget, user, method, url, data, budget):
+    client.force_login(getattr(corpus, user))
+    url = url(corpus)
+    payload = data(corpus) if data else None
+    with query_budget(budget):
+        if isinstance(payload, str):
+            response = client.post(url, payload, content_type="application/json")
+        else:
+            response = getattr(client, method)(url, payload)
+        if response.streaming:
+            # Потоковый ответ читает базу, пока отдается тело
+            b"".join(response.streaming_content)
+    assert response.status_code < 400
@@ -0,0 +1,1520 @@
+import codecs
+import csv
+import hashlib
+import importlib
+import io
+import os
+import tempfile
+import zipfile
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from unittest import mock, skipUnless
+
+from django.apps import apps as django_apps
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import (
+    InMemoryUploadedFile,
+    SimpleUploadedFile,
+    TemporaryUploadedFile,
+)
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import FileResponse
+from django.http.multipartparser import MultiPartParser
+from django.test import RequestFactory, TestCase
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+import docx
+import openpyxl
+
+from users.models import User
+
+from .batching import SignalBatch, batched_signals, current_batch
+from .checks import check_ingestion_progress_cache
+from .downloads import file_download_response
+from .export_utils import (
+    export_document_all_formats,
+    export_to_docx,
+    export_to_xlsx_openpyxl,
+    export_to_xlsx_xlsxwriter,
+    get_document_statistics,
+    iter_export_rows,
+)
+from .ingestion import ingest_document, run_ingestion_job
+from .memory import find_approved_translations, get_memory_suggestion
+from .models import (
+    Document,
+    IngestionJob,
+    Sentence,
+    SimilarityBand,
+    Translation,
+    TranslationHistory,
+    UserStats,
+)
+from .search import highlight, search_sentences
+from .similarity import NUM_BANDS, find_similar
+from .upload_handlers import (
+    HashingMemoryFileUploadHandler,
+    HashingTemporaryFileUploadHandler,
+)
+from .user_stats import rebuild_user_stats, removing_sentences
+from .utils import (
+    ENCODING_SAMPLE_SIZE,
+    detect_encoding,
+    detect_file_encoding,
+    extract_sentences_from_text,
+    file_sha256,
+    iter_docx_paragraphs,
+    iter_sentences,
+    iter_xlsx_cells,
+    iter_xlsx_sentences,
+    process_docx_file,
+    process_txt_file,
+    process_xlsx_file,
+    text_hash,
+)
+
+
+class IngestionTest(TestCase):
+    """Повторная обработка заменяет предложения документа целиком или не меняет их совсем"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media_root.name))
+        os.makedirs(os.path.join(media_root.name, "documents"))
+        with open(os.path.join(media_root.name, "documents", "ingest.txt"), "w", encoding="utf-8") as file:
+            file.write("Первое предложение. Второе предложение. Третье предложение.")
+        self.document = Document.objects.create(
+            file="documents/ingest.txt", uploaded_by=self.admin, content_hash="ingest".ljust(64, "0")
+        )
+        ingest_document(self.document)
+
+    def sentences(self):
+        return list(self.document.sentences.order_by("sentence_number").values_list("original_text", flat=True))
+
+    def test_file_failing_midway_keeps_previous_sentences(self):
+        def failing_sentences(*args, **kwargs):
+            # Первая пачка читается целиком, ошибка чтения возникает во второй
+            for number in range(1, 1002):
+                yield number, f"Новое предложение {number}."
+            raise ValidationError("Не удалось прочитать файл. Проверьте кодировку.")
+
+        job = IngestionJob.objects.create(document=self.document)
+        with mock.patch("translations.ingestion.iter_validated_sentences", failing_sentences):
+            self.assertIsNone(run_ingestion_job(job.id))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.error, "Не удалось прочитать файл. Проверьте кодировку.")
+        self.assertEqual(self.sentences(), ["Первое предложение.", "Второе предложение.", "Третье предложение."])
+        self.document.refresh_from_db()
+        self.assertTrue(self.document.is_processed)
+        self.assertEqual(self.document.sentences_total, 3)
+        self.assertEqual(self.document.sentences_unconfirmed, 3)
+
+    def test_progress_is_visible_before_commit(self):
+        job = IngestionJob.objects.create(document=self.document)
+        job.update_progress(status="running")
+        job.publish_progress(parsed=1000, inserted=1000)
+        progress = IngestionJob.objects.get(id=job.id).as_progress_dict()
+        self.assertEqual((progress["parsed"], progress["inserted"]), (1000, 1000))
+
+        self.assertIsNotNone(run_ingestion_job(job.id))
+        progress = IngestionJob.objects.get(id=job.id).as_progress_dict()
+        self.assertEqual((progress["status"], progress["inserted"], progress["total"]), ("completed", 3, 3))
+
+    def test_progress_reports_parsed_inserted_and_estimated_total(self):
+        with open(self.document.file.path, "w", encoding="utf-8") as file:
+            file.write(" ".join(f"Предложение номер {number}." for number in range(1, 2001)))
+        calls = []
+        with mock.patch("translations.utils.TXT_CHUNK_SIZE", 4096):
+            ingest_document(self.document, batch_size=500, progress=lambda **fields: calls.append(fields))
+
+        self.assertEqual([call["parsed"] for call in calls], [500, 1000, 1500, 2000, 2000])
+        self.assertEqual([call["inserted"] for call in calls], [0, 500, 1000, 1500, 2000])
+        # Оценка по доле прочитанных байтов известна с первой пачки и сходится к точному числу
+        self.assertTrue(all(1000 <= call["total"] <= 4000 for call in calls))
+        self.assertEqual(calls[-1]["total"], 2000)
+
+    def test_check_requires_shared_cache_for_worker(self):
+        locmem = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        redis = {"default": {"BACKEND": "django_redis.cache.RedisCache", "LOCATION": "redis://localhost:6379/1"}}
+        with self.settings(CELERY_TASK_ALWAYS_EAGER=False, CACHES=locmem):
+            self.assertEqual([error.id for error in check_ingestion_progress_cache(None)], ["translations.E001"])
+        with self.settings(CELERY_TASK_ALWAYS_EAGER=False, CACHES=redis):
+            self.assertEqual(check_ingestion_progress_cache(None), [])
+        with self.settings(CELERY_TASK_ALWAYS_EAGER=True, CACHES=locmem):
+            self.assertEqual(check_ingestion_progress_cache(None), [])
+
+
+class DocumentUploadTest(TestCase):
+    """Загрузка документа с обработкой воркером (без CELERY_TASK_ALWAYS_EAGER)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media_root.name))
+        os.makedirs(os.path.join(media_root.name, "documents"))
+        self.client.force_login(self.admin)
+        self.addCleanup(cache.clear)
+        # Задача только ставится в очередь, как при настоящем брокере
+        self.delay = self.enterContext(mock.patch("translations.tasks.ingest_document_task.delay"))
+
+    def upload(self):
+        file = SimpleUploadedFile("upload.txt", "Первое предложение. Второе предложение.".encode("utf-8"))
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse("translations:document_upload"), {"file": file})
+
+    def test_upload_after_failed_job_creates_new_document(self):
+        response = self.upload()
+        self.assertEqual(response.status_code, 200)
+        job = response.context["job"]
+        self.assertEqual(job.status, "queued")
+        self.delay.assert_called_once_with(job.id)
+
+        with mock.patch(
+            "translations.ingestion.iter_validated_sentences",
+            side_effect=ValidationError("Не удалось прочитать файл. Проверьте кодировку."),
+        ):
+            self.assertIsNone(run_ingestion_job(job.id))
+
+        response = self.upload()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.context["document"].id, job.document_id)
+        self.assertEqual(response.context["job"].status, "queued")
+        self.assertEqual(Document.objects.get(id=job.document_id).content_hash, "")
+
+    def test_upload_of_processed_document_is_duplicate(self):
+        job = self.upload().context["job"]
+        self.assertIsNotNone(run_ingestion_job(job.id))
+
+        response = self.upload()
+        self.assertRedirects(response, reverse("translations:document_detail", args=[job.document_id]))
+        self.assertEqual(Document.objects.count(), 1)
+
+    def status(self, job):
+        response = self.client.get(reverse("translations:ingestion_job_status", args=[job.id]))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_queued_upload_renders_progress(self):
+        response = self.upload()
+        job = response.context["job"]
+        self.assertTemplateUsed(response, "translations/document_upload.html")
+        self.assertContains(response, reverse("translations:ingestion_job_status", args=[job.id]))
+        self.assertContains(response, '<span id="ingestion-status">В очереди</span>', html=True)
+        self.assertContains(response, '<span id="ingestion-total">?</span>', html=True)
+
+    def test_job_lifecycle_in_status_view(self):
+        job = self.upload().context["job"]
+        document_url = reverse("translations:document_detail", args=[job.document_id])
+        self.assertEqual(
+            self.status(job),
+            {
+                "id": job.id,
+                "document_id": job.document_id,
+                "status": "queued",
+                "status_display": "В очереди",
+                "parsed": 0,
+                "inserted": 0,
+                "total": None,
+                "error": "",
+                "finished": False,
+                "document_url": document_url,
+            },
+        )
+
+        # Страница опрашивает задачу, пока воркер сохраняет предложения
+        polled = []
+
+        def ingest_and_poll(document, progress, **kwargs):
+            def poll(**fields):
+                progress(**fields)
+                polled.append(self.status(job))
+
+            return ingest_document(document, progress=poll, **kwargs)
+
+        with mock.patch("translations.ingestion.ingest_document", ingest_and_poll):
+            self.assertIsNotNone(run_ingestion_job(job.id))
+
+        self.assertEqual(
+            [(data["status"], data["parsed"], data["inserted"], data["finished"]) for data in polled],
+            [("running", 2, 0, False), ("running", 2, 2, False)],
+        )
+        data = self.status(job)
+        self.assertEqual((data["status"], data["status_display"]), ("completed", "Завершена"))
+        self.assertEqual((data["parsed"], data["inserted"], data["total"]), (2, 2, 2))
+        self.assertTrue(data["finished"])
+
+    def test_failed_job_in_status_view(self):
+        job = self.upload().context["job"]
+        with mock.patch(
+            "translations.ingestion.iter_validated_sentences",
+            side_effect=ValidationError("Не удалось прочитать файл. Проверьте кодировку."),
+        ):
+            run_ingestion_job(job.id)
+
+        data = self.status(job)
+        self.assertEqual((data["status"], data["status_display"]), ("failed", "Ошибка"))
+        self.assertEqual(data["error"], "Не удалось прочитать файл. Проверьте кодировку.")
+        self.assertTrue(data["finished"])
+
+    def test_eager_upload_redirects_to_document(self):
+        # В режиме CELERY_TASK_ALWAYS_EAGER задача выполняется до ответа, сразу после фиксации документа
+        self.delay.side_effect = run_ingestion_job
+        self.enterContext(mock.patch("django.db.transaction.on_commit", lambda callback: callback()))
+        response = self.upload()
+        document = Document.objects.get()
+        self.assertRedirects(response, reverse("translations:document_detail", args=[document.id]))
+        self.assertEqual(document.ingestion_jobs.latest().status, "completed")
+        self.assertEqual(document.sentences.count(), 2)
+
+
+class DocumentProgressCountersTest(TestCase):
+    """Счетчики предложений документа сдвигаются сигналами и совпадают с полным пересчетом"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+        cls.document = Document.objects.create(
+            file="documents/counters.txt",
+            uploaded_by=cls.admin,
+            content_hash="counters".ljust(64, "0"),
+            is_processed=True,
+        )
+        for number, status in enumerate([0, 1, 1, 2], start=1):
+            Sentence.objects.create(
+                document=cls.document, sentence_number=number, original_text=f"Предложение {number}.", status=status
+            )
+
+    def counters(self):
+        self.document.refresh_from_db()
+        return [getattr(self.document, field) for field in Document.PROGRESS_COUNTER_FIELDS]
+
+    def recounted(self):
+        Document.objects.filter(pk=self.document.pk).update(**Document.progress_counter_subqueries())
+        return self.counters()
+
+    def test_delete_outside_views_updates_counters_and_status(self):
+        Sentence.objects.get(sentence_number=1).delete()
+        Sentence.objects.filter(sentence_number=4).delete()
+        counters = self.counters()
+        self.assertEqual(self.document.sentences_total, 2)
+        self.assertEqual(self.document.status, "translated")
+        self.assertEqual(counters, self.recounted())
+
+    def test_stale_save_keeps_counters(self):
+        stale = Document.objects.get(pk=self.document.pk)
+        Sentence.objects.create(document=self.document, sentence_number=5, original_text="Предложение 5.")
+        stale.status = "pending"
+        stale.save()
+        self.assertEqual(self.counters(), [5, 2, 2, 1, 0])
+        self.assertEqual(self.counters(), self.recounted())
+
+    def test_deltas(self):
+        deltas = Document.progress_counter_deltas
+        self.assertEqual(deltas(None, 0), {"sentences_total": 1, "sentences_unconfirmed": 1})
+        self.assertEqual(deltas(1, 2), {"sentences_translated": -1, "sentences_corrected": 1})
+        self.assertEqual(deltas(3, None), {"sentences_rejected": -1, "sentences_total": -1})
+        self.assertEqual(deltas(1, 1), {"sentences_translated": 0})
+
+    def test_status_changes_shift_counters(self):
+        self.assertEqual(self.counters(), [4, 1, 2, 1, 0])
+        sentence = Sentence.objects.get(sentence_number=1)
+        Translation.objects.create(sentence=sentence, translator=self.admin, translated_text="Перевод")
+        for translation_status in ("approved", "rejected"):
+            translation = Translation.objects.get(sentence=sentence)
+            translation.status = translation_status
+            translation.save()
+        Sentence.objects.create(document=self.document, sentence_number=5, original_text="Предложение 5.")
+
+        counters = self.counters()
+        self.assertEqual(counters, [5, 1, 2, 1, 1])
+        self.assertEqual(counters, self.recounted())
+
+    def test_repair_command_matches_recount(self):
+        Document.objects.filter(pk=self.document.pk).update(
+            sentences_total=0, sentences_translated=7, sentences_corrected=4, status="corrected"
+        )
+        call_command("repair_document_counters", stdout=io.StringIO())
+        counters = self.counters()
+        self.assertEqual(counters, [4, 1, 2, 1, 0])
+        self.assertEqual(self.document.status, "pending")
+        self.assertEqual(counters, self.recounted())
+
+
+class SentenceSegmentationTest(TestCase):
+    """Потоковое разбиение на предложения не зависит от границ блоков"""
+
+    TEXT = (
+        "Первое предложение. Второе   предложение!\nТретье? «Четвертое» со словом т.е. внутри. "
+        "А. С. Пушкин писал стихи. Первое предложение. Последнее без точки"
+    )
+
+    def test_chunk_boundaries_do_not_change_sentences(self):
+        expected = extract_sentences_from_text(self.TEXT)
+        self.assertEqual(
+            expected,
+            [
+                "Первое предложение.",
+                "Второе предложение!",
+                "Третье?",
+                "«Четвертое» со словом т.е. внутри.",
+                "А. С. Пушкин писал стихи.",
+                "Последнее без точки",
+            ],
+        )
+        for size in (1, 2, 3, 7, 19, len(self.TEXT)):
+            chunks = [self.TEXT[start : start + size] for start in range(0, len(self.TEXT), size)]
+            self.assertEqual(list(iter_sentences(chunks)), expected, size)
+
+    def test_txt_file_is_read_in_chunks(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", encoding="utf-8", delete=False) as file:
+            file.write(self.TEXT)
+        self.addCleanup(os.remove, file.name)
+        with mock.patch("translations.utils.TXT_CHUNK_SIZE", 5):
+            self.assertEqual(process_txt_file(file.name), extract_sentences_from_text(self.TEXT))
+
+
+class DocxParagraphsTest(TestCase):
+    """Потоковое чтение word/document.xml дает те же абзацы, что и python-docx"""
+
+    def setUp(self):
+        document = docx.Document()
+        document.sections[0].header.paragraphs[0].text = "Колонтитул"
+        document.add_paragraph("Первый абзац.")
+        paragraph = document.add_paragraph("Жирный")
+        paragraph.runs[0].bold = True
+        paragraph.add_run("\tс табуляцией").add_break()
+        paragraph.add_run("и переносом.")
+        table = document.add_table(rows=2, cols=2)
+        for row_index, row in enumerate(table.rows):
+            for cell_index, cell in enumerate(row.cells):
+                cell.text = f"Ячейка {row_index}-{cell_index}"
+        table.cell(1, 1).add_paragraph("Второй абзац ячейки.")
+        document.add_paragraph("")
+        document.add_paragraph("Последний абзац.")
+
+        with tempfile.NamedTemporaryFile(suffix=".docx", delete=False) as file:
+            document.save(file)
+        self.addCleanup(os.remove, file.name)
+        self.path = file.name
+
+    def test_paragraphs_match_python_docx(self):
+        document = docx.Document(self.path)
+        body = [paragraph.text for paragraph in document.paragraphs]
+        self.assertEqual(list(iter_docx_paragraphs(self.path, include_tables=False)), body)
+
+        cells = [
+            paragraph.text for row in document.tables[0].rows for cell in row.cells for paragraph in cell.paragraphs
+        ]
+        self.assertEqual(cells[-2:], ["Ячейка 1-1", "Второй абзац ячейки."])
+        # Таблица стоит между вторым и третьим абзацами тела
+        self.assertEqual(list(iter_docx_paragraphs(self.path)), body[:2] + cells + body[2:])
+
+        header = [paragraph.text for paragraph in document.sections[0].header.paragraphs]
+        self.assertEqual(list(iter_docx_paragraphs(self.path, include_headers_footers=True))[-1:], header)
+
+    def test_sentences_skip_empty_paragraphs(self):
+        sentences = process_docx_file(self.path)
+        self.assertEqual(sentences[1], "Жирный\tс табуляцией\nи переносом.")
+        self.assertNotIn("", sentences)
+        self.assertEqual(len(sentences), 8)
+
+
+class XlsxCellsTest(TestCase):
+    """Потоковое чтение XLSX (read-only openpyxl) дает те же ячейки и предложения, что и полная загрузка книги"""
+
+    def setUp(self):
+        workbook = openpyxl.Workbook()
+        first = workbook.active
+        first.title = "Первый"
+        first.append(["Первая ячейка. Второе предложение.", 42, None, "", "  Пробелы вокруг.  "])
+        first.append([datetime(2024, 1, 1), "Повтор.", 3.5, "Повтор.", "Без точки"])
+        second = workbook.create_sheet("Второй")
+        second.append(["Ячейка второго листа.", "   ", "Повтор."])
+        # Текст длиннее блока _join_in_chunks: предложения на границах блоков не теряются и не склеиваются
+        for number in range(1, 3001):
+            second.append([f"Длинное предложение номер {number} второго листа.", number])
+
+        with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as file:
+            workbook.save(file)
+        self.addCleanup(os.remove, file.name)
+        self.path = file.name
+
+    def legacy_cells(self):
+        """Текстовые ячейки всех листов, как их собирала прежняя process_xlsx_file"""
+        workbook = openpyxl.load_workbook(self.path, data_only=True)
+        return [
+            value
+            for sheet in workbook.worksheets
+            for row in sheet.iter_rows(values_only=True)
+            for value in row
+            if value and isinstance(value, str)
+        ]
+
+    def test_cells_skip_empty_and_non_string_values(self):
+        cells = list(iter_xlsx_cells(self.path))
+        self.assertEqual(cells, self.legacy_cells())
+        self.assertEqual(
+            cells[:8],
+            [
+                "Первая ячейка. Второе предложение.",
+                "  Пробелы вокруг.  ",
+                "Повтор.",
+                "Повтор.",
+                "Без точки",
+                "Ячейка второго листа.",
+                "   ",
+                "Повтор.",
+            ],
+        )
+        self.assertEqual(len(cells), 3008)
+        with open(self.path, "rb") as file:
+            self.assertEqual(list(iter_xlsx_cells(file)), cells)
+
+    def test_sentences_match_legacy_process_xlsx_file(self):
+        expected = extract_sentences_from_text(" ".join(self.legacy_cells()))
+        self.assertEqual(list(iter_xlsx_sentences(self.path)), expected)
+        self.assertEqual(process_xlsx_file(self.path), expected)
+        self.assertEqual(expected[:3], ["Первая ячейка.", "Второе предложение.", "Пробелы вокруг."])
+        self.assertEqual(expected[-1], "Длинное предложение номер 3000 второго листа.")
+
+    def test_cell_as_sentence(self):
+        sentences = process_xlsx_file(self.path, cell_as_sentence=True)
+        self.assertEqual(
+            sentences[:5],
+            [
+                "Первая ячейка. Второе предложение.",
+                "Пробелы вокруг.",
+                "Повтор.",
+                "Без точки",
+                "Ячейка второго листа.",
+            ],
+        )
+        self.assertEqual(len(sentences), 3005)
+        self.assertEqual(sentences[-1], "Длинное предложение номер 3000 второго листа.")
+
+    def test_invalid_file(self):
+        path = self.path.replace(".xlsx", ".broken.xlsx")
+        with open(path, "wb") as file:
+            file.write(b"not a workbook")
+        self.addCleanup(os.remove, path)
+        with self.assertRaisesMessage(ValidationError, "Ошибка при чтении XLSX файла"):
+            process_xlsx_file(path)
+
+
+class EncodingDetectionTest(TestCase):
+    """Кодировка TXT файла определяется по BOM или по образцу байтов"""
+
+    TEXT = "Гlалгlай мотт. Ингушский язык."
+
+    def write(self, data):
+        with tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as file:
+            file.write(data)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_bom(self):
+        self.assertEqual(detect_encoding(codecs.BOM_UTF8 + self.TEXT.encode("utf-8")), "utf-8-sig")
+        self.assertEqual(detect_encoding(self.TEXT.encode("utf-16")), "utf-16")
+        path = self.write(codecs.BOM_UTF16_BE + self.TEXT.encode("utf-16-be"))
+        self.assertEqual(detect_file_encoding(path), "utf-16")
+        self.assertEqual(process_txt_file(path), ["Гlалгlай мотт.", "Ингушский язык."])
+
+    def test_utf8_sample_cut_inside_character(self):
+        self.assertEqual(detect_encoding(self.TEXT.encode("utf-8")[:3]), "utf-8")
+
+    def test_cp1251_and_latin1(self):
+        self.assertEqual(detect_encoding(self.TEXT.encode("cp1251")), "cp1251")
+        self.assertEqual(detect_encoding("Ça coûte très cher à Noël.".encode("latin-1")), "latin-1")
+
+    def test_sample_starts_at_first_non_ascii_byte(self):
+        # Длинный ASCII-префикс не должен вытеснить кириллицу из образца
+        path = self.write(b"a" * (ENCODING_SAMPLE_SIZE * 2) + b" " + self.TEXT.encode("cp1251"))
+        self.assertEqual(detect_file_encoding(path), "cp1251")
+        self.assertEqual(detect_file_encoding(self.write(b"Plain ASCII.")), "utf-8")
+
+
+class ContentHashTest(TestCase):
+    """SHA-256 файла считается обработчиками загрузки и заполняется миграцией для старых документов"""
+
+    def parse_upload(self, data):
+        body = encode_multipart(BOUNDARY, {"file": SimpleUploadedFile("upload.txt", data)})
+        meta = {"CONTENT_TYPE": MULTIPART_CONTENT, "CONTENT_LENGTH": len(body)}
+        handlers = [HashingMemoryFileUploadHandler(), HashingTemporaryFileUploadHandler()]
+        _, files = MultiPartParser(meta, io.BytesIO(body), handlers).parse()
+        return files["file"]
+
+    def test_upload_handlers_hash_file(self):
+        data = "Предложение для загрузки. ".encode("utf-8") * 1000
+        with self.settings(FILE_UPLOAD_MAX_MEMORY_SIZE=len(data) * 2):
+            file = self.parse_upload(data)
+            self.assertIsInstance(file, InMemoryUploadedFile)
+            self.assertEqual(file.sha256, hashlib.sha256(data).hexdigest())
+
+        with self.settings(FILE_UPLOAD_MAX_MEMORY_SIZE=len(data) // 3):
+            file = self.parse_upload(data)
+            self.addCleanup(file.close)
+            self.assertIsInstance(file, TemporaryUploadedFile)
+            self.assertEqual(file.sha256, hashlib.sha256(data).hexdigest())
+            self.assertEqual(file_sha256(file), file.sha256)
+
+    def test_migration_backfills_content_hash(self):
+        admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media_root.name))
+        os.makedirs(os.path.join(media_root.name, "documents"))
+        for name in ("old.txt", "missing.txt"):
+            with open(os.path.join(media_root.name, "documents", name), "wb") as file:
+                file.write(b"Old document.")
+        stored = Document.objects.create(file="documents/old.txt", uploaded_by=admin, is_processed=True)
+        missing = Document.objects.create(file="documents/missing.txt", uploaded_by=admin, is_processed=True)
+        # Документы, загруженные до появления поля, и файл, удаленный из хранилища
+        Document.objects.update(content_hash="")
+        os.remove(os.path.join(media_root.name, "documents", "missing.txt"))
+
+        migration = importlib.import_module("translations.migrations.0010_document_content_hash")
+        migration.backfill_content_hash(django_apps, None)
+
+        stored.refresh_from_db()
+        missing.refresh_from_db()
+        self.assertEqual(stored.content_hash, hashlib.sha256(b"Old document.").hexdigest())
+        self.assertEqual(missing.content_hash, "")
+
+
+class TranslationMemoryTest(TestCase):
+    """Утвержденные переводы повторяющихся предложений предлагаются при загрузке нового документа"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+        cls.translator = User.objects.create_user("translator", "translator@example.com", "password")
+        cls.source = Document.objects.create(
+            file="documents/memory.txt", uploaded_by=cls.admin, content_hash="memory".ljust(64, "0"), is_processed=True
+        )
+        corrected = [("Старый перевод", "approved", 1), ("Новый перевод", "approved", 2), ("Черновик", "pending", 3)]
+        for number, (text, status, day) in enumerate(corrected, start=1):
+            sentence = Sentence.objects.create(
+                document=cls.source, sentence_number=number, original_text="Дом стоял у реки."
+            )
+            Translation.objects.create(
+                sentence=sentence,
+                translator=cls.translator,
+                translated_text=text,
+                status=status,
+                corrected_at=datetime(2026, 1, day, tzinfo=dt_timezone.utc),
+            )
+
+    def test_latest_approved_translation_is_found(self):
+        hash_value = text_hash(" Дом  стоял\nу реки. ")
+        self.assertEqual(find_approved_translations([hash_value, "missing"]), {hash_value: "Новый перевод"})
+        self.assertEqual(find_approved_translations([]), {})
+
+    def test_ingestion_stores_suggestions(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media_root.name))
+        os.makedirs(os.path.join(media_root.name, "documents"))
+        with open(os.path.join(media_root.name, "documents", "repeat.txt"), "w", encoding="utf-8") as file:
+            file.write("Другое предложение. Дом стоял у реки.")
+        document = Document.objects.create(
+            file="documents/repeat.txt", uploaded_by=self.admin, content_hash="repeat".ljust(64, "0")
+        )
+        ingest_document(document)
+
+        other, repeated = document.sentences.order_by("sentence_number")
+        self.assertEqual((other.suggested_translation, repeated.suggested_translation), ("", "Новый перевод"))
+        self.assertEqual(get_memory_suggestion(repeated), "Новый перевод")
+
+        # Перевод, утвержденный уже после загрузки, находится при открытии предложения
+        self.assertEqual(get_memory_suggestion(other), "")
+        Sentence.objects.filter(document=self.source).update(text_hash=other.text_hash)
+        self.assertEqual(get_memory_suggestion(other), "Новый перевод")
+
+
+class SimilarityIndexTest(TestCase):
+    """Индекс похожих предложений содержит полосы только предложений с утвержденным переводом"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+        cls.translator = User.objects.create_user("translator", "translator@example.com", "password")
+        cls.document = Document.objects.create(
+            file="documents/similar.txt",
+            uploaded_by=cls.admin,
+            content_hash="similar".ljust(64, "0"),
+            is_processed=True,
+        )
+        cls.sentence = Sentence.objects.create(
+            document=cls.document, sentence_number=1, original_text="Мальчик пошел в школу утром."
+        )
+
+    def bands(self):
+        return SimilarityBand.objects.filter(sentence=self.sentence).count()
+
+    def test_index_follows_translation_status(self):
+        translation = Translation.objects.create(
+            sentence=self.sentence, translator=self.translator, translated_text="Кӏаьнк школе вахар", status="pending"
+        )
+        self.assertEqual(self.bands(), 0)
+
+        translation.status = "approved"
+        translation.save()
+        self.assertEqual(self.bands(), NUM_BANDS)
+        similar = find_similar("Мальчик пошёл в школу утром")
+        self.assertEqual([item["sentence_id"] for item in similar], [self.sentence.id])
+        self.assertEqual(similar[0]["translated_text"], "Кӏаьнк школе вахар")
+        self.assertEqual(find_similar("Совсем другое предложение о погоде."), [])
+
+        translation.status = "rejected"
+        translation.save()
+        self.assertEqual(self.bands(), 0)
+
+    def test_migration_indexes_approved_translations(self):
+        Translation.objects.create(
+            sentence=self.sentence, translator=self.translator, translated_text="Кӏаьнк", status="approved"
+        )
+        approved = Sentence.objects.create(document=self.document, sentence_number=2, original_text="Девочка читала.")
+        Translation.objects.create(
+            sentence=approved, translator=self.translator, translated_text="Йо", status="approved"
+        )
+        pending = Sentence.objects.create(document=self.document, sentence_number=3, original_text="Дом у реки.")
+        Translation.objects.create(
+            sentence=pending, translator=self.translator, translated_text="ЦIа", status="pending"
+        )
+        # Переводы, утвержденные до появления индекса
+        SimilarityBand.objects.all().delete()
+
+        migration = importlib.import_module("translations.migrations.0012_similarityband")
+        with mock.patch.object(migration, "BACKFILL_BATCH_SIZE", 1):
+            migration.fill_similarity_index(django_apps, None)
+
+        self.assertEqual(self.bands(), NUM_BANDS)
+        self.assertEqual(SimilarityBand.objects.filter(sentence=approved).count(), NUM_BANDS)
+        self.assertFalse(SimilarityBand.objects.filter(sentence=pending).exists())
+        self.assertEqual(find_similar("Девочка читала")[0]["sentence_id"], approved.id)
+
+    def test_benchmark_fails_above_target(self):
+        options = {"sentences": 20, "queries": 5, "batch_size": 10, "stdout": io.StringIO()}
+        command = "translations.management.commands.benchmark_translation_memory.TARGET_MS"
+        with mock.patch(command, 10_000):
+            call_command("benchmark_translation_memory", **options)
+        self.assertIn("p95 укладывается", options["stdout"].getvalue())
+        with mock.patch(command, -1), self.assertRaisesMessage(CommandError, "превышает -1 мс"):
+            call_command("benchmark_translation_memory", **options)
+        self.assertFalse(Sentence.objects.exclude(document=self.document).exists())
+
+    def test_delete_removes_bands(self):
+        translation = Translation.objects.create(
+            sentence=self.sentence, translator=self.translator, translated_text="Кӏаьнк", status="approved"
+        )
+        with batched_signals():
+            translation.delete()
+            self.assertEqual(self.bands(), NUM_BANDS)
+        self.assertEqual(self.bands(), 0)
+
+        Translation.objects.create(
+            sentence=self.sentence, translator=self.translator, translated_text="Кӏаьнк", status="approved"
+        )
+        self.assertEqual(self.bands(), NUM_BANDS)
+        self.sentence.delete()
+        self.assertFalse(SimilarityBand.objects.exists())
+
+
+class SignalBatchTest(TestCase):
+    """batched_signals() применяет отложенные побочные эффекты сигналов одним flush() на блок"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+        cls.translator = User.objects.create_user("translator", "translator@example.com", "password")
+        cls.documents = [
+            Document.objects.create(
+                file=f"documents/batch{index}.txt",
+                uploaded_by=cls.admin,
+                content_hash=f"batch{index}".ljust(64, "0"),
+                is_processed=True,
+            )
+            for index in range(2)
+        ]
+        for document in cls.documents:
+            Sentence.objects.bulk_create(
+                Sentence(document=document, sentence_number=number, original_text=f"Предложение {number}.")
+                for number in range(1, 4)
+            )
+            document.refresh_progress_counters()
+
+    def translate_all(self):
+        for sentence in Sentence.objects.order_by("id"):
+            Translation.objects.create(sentence=sentence, translator=self.translator, translated_text="Перевод")
+
+    def test_one_flush_per_batch(self):
+        with mock.patch.object(SignalBatch, "flush", autospec=True, side_effect=SignalBatch.flush) as flush:
+            with batched_signals() as batch:
+                self.translate_all()
+                # Вложенный блок использует внешний пакет
+                with batched_signals() as nested:
+                    self.assertIs(nested, batch)
+                self.assertEqual(len(batch.history), 6)
+                self.assertFalse(TranslationHistory.objects.exists())
+                flush.assert_not_called()
+        flush.assert_called_once_with(batch)
+
+        self.assertEqual(TranslationHistory.objects.count(), 6)
+        for document in self.documents:
+            document.refresh_from_db()
+            self.assertEqual((document.sentences_total, document.sentences_translated), (3, 3))
+            self.assertEqual(document.status, "translated")
+
+    def test_batch_costs_fewer_queries(self):
+        with CaptureQueriesContext(connection) as batched:
+            with batched_signals():
+                self.translate_all()
+        Translation.objects.all().delete()
+        with CaptureQueriesContext(connection) as unbatched:
+            self.translate_all()
+        self.assertLess(len(batched), len(unbatched))
+
+    def test_exception_discards_batch(self):
+        with mock.patch.object(SignalBatch, "flush", autospec=True) as flush:
+            with self.assertRaises(RuntimeError):
+                with batched_signals():
+                    raise RuntimeError
+        flush.assert_not_called()
+        self.assertIsNone(current_batch())
+
+
+class DocumentBulkAssignTest(TestCase):
+    """Массовое назначение обновляет предложения только выбранных документов и считает новые назначения"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+        cls.translator = User.objects.create_user(
+            "translator", "translator@example.com", "password", first_name="Ахмед", last_name="Евлоев"
+        )
+        cls.corrector = User.objects.create_user(
+            "corrector", "corrector@example.com", "password", role="corrector", first_name="Марем", last_name="Оздоева"
+        )
+        cls.documents = []
+        for index, size in enumerate([3, 2, 2]):
+            document = Document.objects.create(
+                file=f"documents/assign{index}.txt",
+                uploaded_by=cls.admin,
+                content_hash=f"assign{index}".ljust(64, "0"),
+                is_processed=True,
+            )
+            for number in range(1, size + 1):
+                Sentence.objects.create(
+                    document=document, sentence_number=number, original_text=f"Предложение {number}."
+                )
+            cls.documents.append(document)
+        # Одно предложение уже назначено переводчику и не должно попасть в число новых назначений
+        sentence = cls.documents[0].sentences.get(sentence_number=1)
+        sentence.assigned_to = cls.translator
+        sentence.save()
+
+    def assign(self, documents):
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            reverse("translations:documents_bulk_assign"),
+            {
+                "document_ids": [document.id for document in documents],
+                "assigned_to": self.translator.id,
+                "corrector": self.corrector.id,
+            },
+            follow=True,
+        )
+        return [str(message) for message in response.context["messages"]]
+
+    def test_assigns_selected_documents(self):
+        selected = self.documents[:2]
+        self.assertEqual(
+            self.assign(selected),
+            [
+                "Документы (2): Переводчик Ахмед Евлоев назначен для 4 предложений, "
+                "Корректор Марем Оздоева назначен для 5 предложений.",
+            ],
+        )
+        for document in selected:
+            document.refresh_from_db()
+            self.assertEqual((document.translator, document.corrector), (self.translator, self.corrector))
+        assigned = Sentence.objects.filter(assigned_to=self.translator, corrector=self.corrector)
+        self.assertEqual(set(assigned.values_list("document_id", flat=True)), {document.id for document in selected})
+        self.assertEqual(assigned.count(), 5)
+        self.assertFalse(self.documents[2].sentences.filter(assigned_to__isnull=False).exists())
+        self.assertEqual(UserStats.for_user(self.translator)["total_sentences"], 5)
+
+        self.assertEqual(self.assign(selected), ["Все предложения уже назначены выбранным пользователям."])
+
+
+class DocumentListQueryCountTest(TestCase):
+    """Количество запросов списка документов не зависит от числа и размера документов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+
+    def create_document(self, name, sentences):
+        # content_hash и is_processed заданы, поэтому файл не читается и фоновая обработка не запускается
+        document = Document.objects.create(
+            file=f"documents/{name}.txt",
+            uploaded_by=self.admin,
+            content_hash=name.ljust(64, "0"),
+            is_processed=True,
+        )
+        Sentence.objects.bulk_create(
+            Sentence(
+                document=document, sentence_number=number, original_text=f"Предложение {number}.", status=number % 4
+            )
+            for number in range(1, sentences + 1)
+        )
+        document.refresh_progress_counters()
+        return document
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("translations:document_list"))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_is_constant(self):
+        self.client.force_login(self.admin)
+        self.create_document("small", 3)
+        baseline = self.count_list_queries()
+
+        for index in range(10):
+            self.create_document(f"large{index}", 200)
+
+        self.assertEqual(self.count_list_queries(), baseline)
+
+    def test_progress_comes_from_counters(self):
+        self.client.force_login(self.admin)
+        document = self.create_document("progress", 8)
+
+        response = self.client.get(reverse("translations:document_list"))
+
+        listed = next(item for item in response.context["documents"] if item.id == document.id)
+        self.assertEqual(listed.translation_stats["total"], 8)
+        # Статусы 1 и 2 считаются переведенными, статус 2 - проверенным корректором
+        self.assertEqual(listed.translation_stats["translated"], 4)
+        self.assertEqual(listed.correction_stats["correction"], 2)
+
+
+class SentenceKeysetPaginationTest(TestCase):
+    """Курсорная пагинация проходит все предложения без пропусков и повторов и сохраняет фильтры"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+        cls.document = Document.objects.create(
+            file="documents/keyset.txt", uploaded_by=cls.admin, content_hash="keyset".ljust(64, "0"), is_processed=True
+        )
+        Sentence.objects.bulk_create(
+            Sentence(document=cls.document, sentence_number=number, original_text=f"Предложение {number}.")
+            for number in range(1, 61)
+        )
+        cls.document.refresh_progress_counters()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def test_walks_all_pages_in_both_directions(self):
+        url = reverse("translations:sentence_list")
+        pages = []
+        response = self.client.get(url, {"sort": "-sentence_number", "search": "Предложение"})
+        while True:
+            page = response.context["page_obj"]
+            pages.append([sentence.sentence_number for sentence in page])
+            if not page.has_next():
+                break
+            self.assertIn("search=", page.next_querystring)
+            response = self.client.get(f"{url}?{page.next_querystring}")
+
+        self.assertEqual([number for numbers in pages for number in numbers], list(range(60, 0, -1)))
+        self.assertEqual(len(pages), 3)
+
+        response = self.client.get(f"{url}?{page.previous_querystring}")
+        self.assertEqual([sentence.sentence_number for sentence in response.context["page_obj"]], pages[1])
+
+    def test_deep_page_costs_the_same_as_first(self):
+        url = reverse("translations:document_detail", kwargs={"document_id": self.document.id})
+        # Статистика документа кэшируется первым запросом страницы, сравниваются запросы самой пагинации
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as first_queries:
+            response = self.client.get(url)
+        next_querystring = response.context["page_obj"].next_querystring
+        with CaptureQueriesContext(connection) as next_queries:
+            response = self.client.get(f"{url}?{next_querystring}")
+
+        self.assertEqual(len(next_queries), len(first_queries))
+        self.assertEqual([sentence.sentence_number for sentence in response.context["page_obj"]], list(range(21, 41)))
+        self.assertFalse(any("OFFSET" in query["sql"].upper() for query in next_queries.captured_queries))
+
+
+class SentenceSearchTest(TestCase):
+    """Полнотекстовый индекс обновляется триггерами при изменении предложений и переводов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+        cls.document = Document.objects.create(
+            file="documents/search.txt", uploaded_by=cls.admin, content_hash="search".ljust(64, "0"), is_processed=True
+        )
+        texts = ["Человек шёл домой, человек устал.", "Жил-был человек.", "Дом стоял у реки."]
+        Sentence.objects.bulk_create(
+            Sentence(document=cls.document, sentence_number=number, original_text=text)
+            for number, text in enumerate(texts, start=1)
+        )
+        cls.document.refresh_progress_counters()
+
+    def search(self, query):
+        results = search_sentences(Sentence.objects.all(), query).order_by("-search_rank", "id")
+        return [sentence.sentence_number for sentence in results]
+
+    def test_words_match_by_prefix_and_rank(self):
+        self.assertEqual(self.search("челов"), [1, 2])
+        self.assertEqual(self.search("дом"), [3, 1])
+        self.assertEqual(self.search('"у реки"'), [3])
+
+    def test_every_match_is_ranked_by_the_main_query(self):
+        # При построении запроса проверяется только, находит ли индекс слова; оценки считает сам запрос
+        with self.assertNumQueries(1):
+            results = search_sentences(Sentence.objects.all(), "дом")
+        with self.assertNumQueries(1):
+            ranks = {sentence.sentence_number: sentence.search_rank for sentence in results}
+        self.assertEqual(set(ranks), {1, 3})
+        self.assertGreater(ranks[3], ranks[1])
+        self.assertGreater(ranks[1], 0)
+        self.assertEqual([sentence.sentence_number for sentence in results.filter(search_rank__lt=ranks[3])], [1])
+
+    def test_index_follows_translation_changes(self):
+        sentence = Sentence.objects.get(sentence_number=3)
+        translation = Translation.objects.create(sentence=sentence, translator=self.admin, translated_text="ЦIа")
+        self.assertEqual(self.search("цIа"), [3])
+
+        Translation.objects.filter(id=translation.id).update(translated_text="Хи")
+        self.assertEqual(self.search("цIа"), [])
+        self.assertEqual(self.search("хи"), [3])
+
+        Sentence.objects.filter(id=sentence.id).update(original_text="Река")
+        self.assertEqual(self.search("дом"), [1])
+
+    def test_highlight_escapes_text(self):
+        self.assertEqual(
+            highlight("<b>Дом</b> у дома", "дом"), "&lt;b&gt;<mark>Дом</mark>&lt;/b&gt; у <mark>дома</mark>"
+        )
+
+    def test_part_of_word_falls_back_to_substring(self):
+        self.assertEqual(self.search("ловек"), [1, 2])
+        self.assertEqual(highlight("Жил-был человек.", "ловек"), "Жил-был че<mark>ловек</mark>.")
+
+    def test_other_databases_use_substring_search(self):
+        with mock.patch("translations.search.connection") as other_connection:
+            other_connection.vendor = "oracle"
+            self.assertEqual(self.search("ловек"), [1, 2])
+
+    @skipUnless(connection.vendor == "postgresql", "tsvector и триграммные индексы есть только в PostgreSQL")
+    def test_postgres_search_vector_and_trigram_indexes(self):
+        sentence = Sentence.objects.get(sentence_number=2)
+        Translation.objects.create(sentence=sentence, translator=self.admin, translated_text="Дом")
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT search_vector::text FROM translations_sentence WHERE id = %s", [sentence.id])
+            search_vector = cursor.fetchone()[0]
+        self.assertRegex(search_vector, r"'человек':\d+A")
+        self.assertRegex(search_vector, r"'дом':\d+B")
+        # Совпадение в оригинале (вес A) важнее совпадения в переводе (вес B)
+        self.assertEqual(self.search("дом"), [3, 1, 2])
+
+        with connection.cursor() as cursor:
+            indexes = {
+                table: connection.introspection.get_constraints(cursor, table)
+                for table in ("translations_sentence", "translations_translation")
+            }
+        self.assertIn("translations_sentence_search_idx", indexes["translations_sentence"])
+        self.assertIn("translations_sentence_text_trgm_idx", indexes["translations_sentence"])
+        self.assertIn("translations_translation_text_trgm_idx", indexes["translations_translation"])
+        self.assertEqual(self.search('"дом"'), [1, 2, 3])
+
+
+class UserStatsTest(TestCase):
+    """Статистика пользователей, сдвигаемая сигналами и массовыми операциями, совпадает с полным пересчетом"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+        cls.translator = User.objects.create_user("translator", "translator@example.com", "password")
+        cls.corrector = User.objects.create_user("corrector", "corrector@example.com", "password", role="corrector")
+        cls.document = Document.objects.create(
+            file="documents/stats.txt",
+            uploaded_by=cls.admin,
+            content_hash="stats".ljust(64, "0"),
+            is_processed=True,
+        )
+
+    def snapshot(self):
+        return {
+            (stats.user_id, stats.role): tuple(getattr(stats, field) for field in UserStats.COUNTER_FIELDS)
+            for stats in UserStats.objects.all()
+        }
+
+    def assert_matches_rebuild(self):
+        incremental = self.snapshot()
+        rebuild_user_stats()
+        # Строки, обнуленные приращениями, при пересчете не создаются
+        self.assertEqual({key: value for key, value in incremental.items() if any(value)}, self.snapshot())
+
+    def test_incremental_updates_match_rebuild(self):
+        first = Sentence.objects.create(document=self.document, sentence_number=1, original_text="Один два три")
+        second = Sentence.objects.create(document=self.document, sentence_number=2, original_text="Четыре пять")
+        Sentence.objects.create(document=self.document, sentence_number=3, original_text="Шесть")
+
+        translation = Translation.objects.create(sentence=first, translator=self.translator, translated_text="One two")
+        translation.translated_text = "One two three"
+        translation.save()
+        first.corrector = self.corrector
+        first.save()
+        Translation.objects.create(sentence=second, translator=self.translator, translated_text="Four five")
+        second.delete()
+
+        self.client.force_login(self.admin)
+        self.client.post(
+            reverse("translations:document_bulk_assign", args=[self.document.id]),
+            {"assigned_to": self.translator.id, "corrector": self.corrector.id},
+        )
+        self.assert_matches_rebuild()
+
+        stats = UserStats.for_user(self.translator)
+        self.assertEqual(stats["total_sentences"], 2)
+        self.assertEqual(stats["translated_sentences"], 1)
+        self.assertEqual(stats["total_translated_words"], 3)
+
+        with removing_sentences(self.document.sentences.all()):
+            self.document.delete()
+        self.assertEqual(self.snapshot(), {key: (0,) * len(UserStats.COUNTER_FIELDS) for key in self.snapshot()})
+
+
+class DocumentStatisticsCacheTest(TestCase):
+    """Статистика документа суммирует сохраненные метрики и кэшируется до следующей записи в документ"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+        cls.translator = User.objects.create_user("translator", "translator@example.com", "password")
+        cls.document = Document.objects.create(
+            file="documents/cached.txt",
+            uploaded_by=cls.admin,
+            content_hash="cached".ljust(64, "0"),
+            is_processed=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_statistics_are_cached_until_document_changes(self):
+        sentence = Sentence.objects.create(document=self.document, sentence_number=1, original_text="Один  два три")
+        Sentence.objects.create(document=self.document, sentence_number=2, original_text="Четыре")
+        translation = Translation.objects.create(
+            sentence=sentence, translator=self.translator, translated_text="One two"
+        )
+        self.assertEqual(sentence.metrics, (3, 13, 10))
+
+        document = Document.objects.get(pk=self.document.pk)
+        with self.assertNumQueries(1):
+            stats = get_document_statistics(document)
+        self.assertEqual(stats["total_sentences"], 2)
+        self.assertEqual(stats["total_words"], 4)
+        self.assertEqual(stats["total_characters_without_spaces"], 16)
+        self.assertEqual(stats["translated_sentences"], 1)
+        self.assertEqual(stats["pending_sentences"], 1)
+        self.assertEqual(stats["total_translated_characters"], 7)
+
+        with self.assertNumQueries(0):
+            get_document_statistics(document)
+
+        translation.translated_text = "One two three"
+        translation.save()
+        stats = get_document_statistics(Document.objects.get(pk=self.document.pk))
+        self.assertEqual(stats["total_translated_characters"], 13)
+
+
+class SentenceCsvExportTest(TestCase):
+    """CSV предложений отдается потоком и собирается из values_list без объектов моделей"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+        cls.translator = User.objects.create_user(
+            "translator", "translator@example.com", "password", first_name="Иса", last_name="Евлоев"
+        )
+        cls.document = Document.objects.create(
+            file="documents/csv.txt", uploaded_by=cls.admin, content_hash="csv".ljust(64, "0"), is_processed=True
+        )
+        Sentence.objects.bulk_create(
+            [
+                Sentence(document=cls.document, sentence_number=1, original_text="Первое, с запятой.", status=1),
+                Sentence(document=cls.document, sentence_number=2, original_text="Второе."),
+            ]
+        )
+        sentence = Sentence.objects.get(sentence_number=1)
+        sentence.assigned_to = cls.translator
+        sentence.save()
+        Translation.objects.create(sentence=sentence, translator=cls.translator, translated_text="Хьалхара")
+
+    def test_rows(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("translations:sentence_export"), {"sort": "sentence_number"})
+        self.assertTrue(response.streaming)
+        with self.assertNumQueries(1):
+            content = b"".join(response.streaming_content).decode()
+        rows = [row[:6] for row in csv.reader(io.StringIO(content))]
+        self.assertEqual(rows[0][:3], ["Документ", "№ предложения", "Оригинальный текст"])
+        self.assertEqual(
+            rows[1:],
+            [
+                ["csv", "1", "Первое, с запятой.", "Подтвердил переводчик", "Иса Евлоев", "Хьалхара"],
+                ["csv", "2", "Второе.", "Не подтвержден", "", ""],
+            ],
+        )
+
+
+class DocumentExportDownloadTest(TestCase):
+    """Экспорт отдается потоком с поддержкой докачки, файл выгрузки хранится EXPORT_RESUME_SECONDS"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+        cls.document = Document.objects.create(
+            file="documents/Выгрузка.txt",
+            uploaded_by=cls.admin,
+            content_hash="download".ljust(64, "0"),
+            is_processed=True,
+        )
+        Sentence.objects.bulk_create(
+            Sentence(document=cls.document, sentence_number=number, original_text=f"Предложение {number}.")
+            for number in range(1, 4)
+        )
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media_root.name))
+        self.exports_dir = os.path.join(media_root.name, "exports")
+        self.client.force_login(self.admin)
+        self.url = reverse("translations:export_document", args=[self.document.id, "txt"])
+
+    def download(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        content = b"".join(response.streaming_content)
+        response.close()
+        return response, content
+
+    def export_files(self):
+        return sorted(os.listdir(self.exports_dir))
+
+    def test_file_is_streamed_and_kept_for_resume(self):
+        response, content = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response, FileResponse)
+        self.assertEqual(response["Content-Type"], "text/plain; charset=utf-8")
+        self.assertEqual(int(response["Content-Length"]), len(content))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn(
+            "filename*=UTF-8''%D0%92%D1%8B%D0%B3%D1%80%D1%83%D0%B7%D0%BA%D0%B0_%28inh%29.txt",
+            response["Content-Disposition"],
+        )
+        self.assertIn("Предложение 3.", content.decode())
+        self.assertEqual(self.export_files(), [f"document_{self.document.id}_v0_txt.txt"])
+
+    def test_overlapping_downloads_read_own_builds(self):
+        first = self.client.get(self.url)
+        # Второй запрос пересобирает выгрузку: первый дочитывает открытый им файл
+        second = self.client.get(self.url)
+        second_content = b"".join(second.streaming_content)
+        second.close()
+        first_content = b"".join(first.streaming_content)
+        first.close()
+
+        self.assertEqual(first_content, second_content)
+        self.assertIn("Предложение 3.", first_content.decode())
+        self.assertEqual(first["Content-Disposition"], second["Content-Disposition"])
+        self.assertEqual(self.export_files(), [f"document_{self.document.id}_v0_txt.txt"])
+
+    def test_interrupted_download_resumes(self):
+        first, content = self.download()
+        with mock.patch("translations.views.build_document_export") as build:
+            response, part = self.download(Range="bytes=2-9", If_Range=first["ETag"])
+        build.assert_not_called()
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["ETag"], first["ETag"])
+        self.assertEqual(response["Content-Range"], f"bytes 2-9/{len(content)}")
+        self.assertEqual(part, content[2:10])
+
+    def test_expired_exports_are_removed(self):
+        self.download()
+        expired = os.path.join(self.exports_dir, self.export_files()[0])
+        os.utime(expired, (0, 0))
+        self.client.get(reverse("translations:export_document_all", args=[self.document.id])).close()
+        self.assertEqual(self.export_files(), [f"document_{self.document.id}_v0_all.zip"])
+
+    def test_one_shot_file_is_not_resumable(self):
+        os.makedirs(self.exports_dir)
+        path = os.path.join(self.exports_dir, "report.txt")
+        with open(path, "wb") as file:
+            file.write(b"0123456789abcdef")
+        request = RequestFactory().get("/", headers={"Range": "bytes=2-9", "If-Range": '"any"'})
+        response = file_download_response(request, path, delete=True)
+        content = b"".join(response.streaming_content)
+        response.close()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, b"0123456789abcdef")
+        self.assertNotIn("Accept-Ranges", response)
+        self.assertNotIn("ETag", response)
+        self.assertEqual(self.export_files(), [])
+
+    def test_range_requests(self):
+        path = os.path.join(self.exports_dir, "stable.txt")
+        os.makedirs(self.exports_dir)
+        with open(path, "wb") as file:
+            file.write(b"0123456789abcdef")
+
+        def download(**headers):
+            response = file_download_response(RequestFactory().get("/", headers=headers), path)
+            content = b"".join(response.streaming_content)
+            response.close()
+            return response, content
+
+        full, content = download()
+        etag = full["ETag"]
+
+        response, part = download(Range="bytes=2-9", If_Range=etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(part, content[2:10])
+        self.assertEqual(response["Content-Range"], f"bytes 2-9/{len(content)}")
+        self.assertEqual(response["Content-Length"], "8")
+
+        response, part = download(Range="bytes=-5", If_Range=etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(part, content[-5:])
+
+        # Без If-Range или с устаревшим ETag диапазон не учитывается: отдается весь файл
+        for headers in [{"Range": "bytes=2-9"}, {"Range": "bytes=2-9", "If-Range": '"stale"'}]:
+            response, part = download(**headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(part, content)
+
+        response = file_download_response(
+            RequestFactory().get("/", headers={"Range": f"bytes={len(content)}-", "If-Range": etag}), path
+        )
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(content)}")
+
+    def test_rebuilt_export_is_sent_whole(self):
+        first, content = self.download()
+        sentence = self.document.sentences.get(sentence_number=3)
+        sentence.original_text = "Измененное предложение."
+        sentence.save()
+
+        # Документ изменился, выгрузка собирается заново с другим ETag: части разных сборок не склеиваются
+        response, part = self.download(Range="bytes=2-9", If_Range=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+        self.assertIn("Измененное предложение.", part.decode())
+        self.assertNotEqual(part, content)
+
+
+class XlsxExportTest(TestCase):
+    """XlsxWriter и openpyxl дают одинаковый лист "Переводы", XlsxWriter читает строки одним запросом"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+        cls.translator = User.objects.create_user(
+            "translator", "translator@example.com", "password", first_name="Иса", last_name="Евлоев"
+        )
+        cls.corrector = User.objects.create_user(
+            "corrector", "corrector@example.com", "password", first_name="Мадина", last_name="Оздоева", role="corrector"
+        )
+        cls.document = Document.objects.create(
+            file="documents/xlsx.txt", uploaded_by=cls.admin, content_hash="xlsx".ljust(64, "0"), is_processed=True
+        )
+        Sentence.objects.bulk_create(
+            Sentence(
+                document=cls.document,
+                sentence_number=number,
+                original_text=f"=Предложение {number}." if number == 2 else f"Предложение {number}.",
+                corrector=cls.corrector if number == 1 else None,
+            )
+            for number in range(1, 5)
+        )
+        cls.document.refresh_progress_counters()
+        for number, status in [(1, "approved"), (2, "pending")]:
+            Translation.objects.create(
+                sentence=Sentence.objects.get(sentence_number=number),
+                translator=cls.translator,
+                translated_text=f"Перевод {number}",
+                status=status,
+            )
+
+    def read(self, path):
+        sheet = openpyxl.load_workbook(path).active
+        # openpyxl объединяет соседние столбцы одной ширины в диапазон min-max
+        widths = {
+            column: int(dimension.width)
+            for dimension in sheet.column_dimensions.values()
+            for column in range(dimension.min, dimension.max + 1)
+        }
+        return sheet.title, list(sheet.iter_rows(values_only=True)), widths
+
+    def test_engines_produce_same_sheet(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with self.assertNumQueries(1):
+                export_to_xlsx_xlsxwriter(self.document, os.path.join(temp_dir, "xlsxwriter.xlsx"))
+            export_to_xlsx_openpyxl(self.document, os.path.join(temp_dir, "openpyxl.xlsx"))
+            expected = self.read(os.path.join(temp_dir, "openpyxl.xlsx"))
+            self.assertEqual(self.read(os.path.join(temp_dir, "xlsxwriter.xlsx"))[0::2], expected[0::2])
+            rows = self.read(os.path.join(temp_dir, "xlsxwriter.xlsx"))[1]
+
+        self.assertEqual(rows[1][3:6], ("Иса Евлоев (Переводчик)", "Мадина Оздоева (Корректор)", "Одобрен"))
+        # Текст, похожий на формулу, записывается строкой
+        self.assertEqual(rows[2][1], "=Предложение 2.")
+        self.assertEqual(rows[3], (3, "Предложение 3.", "Не переведено", None, None, None, None, None))
+
+
+class DocxTableExportTest(TestCase):
+    """Таблица DOCX пишется потоком в разметке python-docx и открывается python-docx"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+        cls.document = Document.objects.create(
+            file="documents/docx.txt", uploaded_by=cls.admin, content_hash="docx".ljust(64, "0"), is_processed=True
+        )
+        texts = [" Ведущий пробел", "Знаки & < > \" '", "Строка\rс возвратом\x01", "Без перевода"]
+        Sentence.objects.bulk_create(
+            Sentence(document=cls.document, sentence_number=number, original_text=text)
+            for number, text in enumerate(texts, start=1)
+        )
+        cls.document.refresh_progress_counters()
+        for number, text in [(1, "Перевод "), (2, "a<b & c>d"), (3, "Цхьа хIама")]:
+            Translation.objects.create(
+                sentence=Sentence.objects.get(sentence_number=number), translator=cls.admin, translated_text=text
+            )
+
+    def test_rows_are_streamed_into_table(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "table.docx")
+            with self.assertNumQueries(1):
+                export_to_docx(self.document, path)
+            with zipfile.ZipFile(path) as package:
+                document_xml = package.read("word/document.xml").decode()
+            table = docx.Document(path).tables[0]
+
+        self.assertEqual(table.style.name, "Table Grid")
+        self.assertEqual(
+            [[cell.text for cell in row.cells] for row in table.rows],
+            [
+                ["№", "Оригинал", "Перевод"],
+                ["1", " Ведущий пробел", "Перевод "],
+                ["2", "Знаки & < > \" '", "a<b & c>d"],
+                ["3", "Строка\rс возвратом", "Цхьа хIама"],
+                ["4", "Без перевода", ""],
+            ],
+        )
+        # Разметка ячеек как у python-docx (lxml): пробелы сохраняются, \r экранируется
+        self.assertIn(
+            "<w:tr><w:tc><w:p><w:r><w:t>2</w:t></w:r></w:p></w:tc>"
+            "<w:tc><w:p><w:r><w:t>Знаки &amp; &lt; &gt; \" '</w:t></w:r></w:p></w:tc>"
+            "<w:tc><w:p><w:r><w:t>a&lt;b &amp; c&gt;d</w:t></w:r></w:p></w:tc></w:tr>",
+            document_xml,
+        )
+        self.assertIn('<w:t xml:space="preserve"> Ведущий пробел</w:t>', document_xml)
+        self.assertIn("<w:t>Строка&#13;с возвратом</w:t>", document_xml)
+
+
+class AllFormatsExportTest(TestCase):
+    """Форматы архива собираются параллельно в процессах из одного снимка строк документа"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "password", role="admin")
+        cls.document = Document.objects.create(
+            file="documents/all.txt", uploaded_by=cls.admin, content_hash="all".ljust(64, "0"), is_processed=True
+        )
+        Sentence.objects.bulk_create(
+            Sentence(document=cls.document, sentence_number=number, original_text=f"Предложение {number}.")
+            for number in range(1, 4)
+        )
+        cls.document.refresh_progress_counters()
+        Translation.objects.create(
+            sentence=Sentence.objects.get(sentence_number=2), translator=cls.admin, translated_text="Перевод 2"
+        )
+
+    def test_formats_are_packed_into_archive(self):
+        with tempfile.TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            with self.assertNumQueries(1):
+                zip_path = export_document_all_formats(self.document)
+            # Снимок и файлы форматов удалены: в каталоге экспорта только архив
+            self.assertEqual(os.listdir(os.path.dirname(zip_path)), [os.path.basename(zip_path)])
+            self.assertTrue(zip_path.startswith(media_root))
+            with zipfile.ZipFile(zip_path) as archive:
+                entries = {info.filename: info for info in archive.infolist()}
+                with archive.open("all_table_(inh).docx") as table:
+                    rows = [[cell.text for cell in row.cells] for row in docx.Document(table).tables[0].rows]
+                text = archive.read(f"translation_{self.document.id}_all.txt").decode("utf-8")
+
+        self.assertEqual(
+            list(entries),
+            [
+                f"translation_{self.document.id}_all.txt",
+                "all_table_(inh).docx",
+                "all_full_(inh).docx",
+                f"translation_{self.document.id}_all.xlsx",
+            ],
+        )
+        # Уже сжатые DOCX и XLSX хранятся без повторного сжатия
+        self.assertEqual(
+            [info.compress_type for info in entries.values()],
+            [zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED, zipfile.ZIP_STORED, zipfile.ZIP_STORED],
+        )
+        self.assertEqual(rows[2], ["2", "Предложение 2.", "Перевод 2"])
+        self.assertEqual(text, "\tПредложение 1.\t\n\tПредложение 2.\tПеревод 2\n\tПредложение 3.\t\n")
+
+    def test_all_formats_come_from_one_snapshot(self):
+        # Снимок строк отличается от базы: форматы, читающие базу сами, этот перевод бы не увидели
+        translated_at = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+        snapshot = [
+            row._replace(translated_text="Перевод из снимка", translated_at=translated_at)
+            for row in iter_export_rows(self.document)
+        ]
+        with tempfile.TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            with mock.patch("translations.export_utils.iter_export_rows", return_value=iter(snapshot)) as rows:
+                zip_path = export_document_all_formats(self.document)
+            rows.assert_called_once_with(self.document)
+            with zipfile.ZipFile(zip_path) as archive:
+                entries = {name: io.BytesIO(archive.read(name)) for name in archive.namelist()}
+
+        txt, table, full, xlsx = entries.values()
+        self.assertEqual(txt.getvalue().decode("utf-8").count("Перевод из снимка"), 3)
+        self.assertEqual(
+            [row.cells[2].text for row in docx.Document(table).tables[0].rows][1:], ["Перевод из снимка"] * 3
+        )
+        self.assertEqual([paragraph.text for paragraph in docx.Document(full).paragraphs], ["Перевод из снимка"] * 3)
+        sheet = openpyxl.load_workbook(xlsx).active
+        self.assertEqual([row[2] for row in sheet.iter_rows(min_row=2, values_only=True)], ["Перевод из снимка"] * 3)
@@ -0,0 +1,39 @@
+import hashlib
+
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+
+
+class HashingUploadHandlerMixin:
+    """
+    Считает SHA-256 файла по мере приема загрузки и сохраняет его в атрибуте sha256 загруженного файла.
+    Хешируются только блоки, которые принял сам обработчик, поэтому в цепочке
+    Memory -> Temporary каждый блок учитывается ровно один раз.
+    """
+
+    def new_file(self, *args, **kwargs):
+        # Хешер создается до вызова родителя: MemoryFileUploadHandler может прервать цепочку StopFutureHandlers
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        remaining = super().receive_data_chunk(raw_data, start)
+        if remaining is None:
+            self.hasher.update(raw_data)
+        return remaining
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self.hasher.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadHandlerMixin, MemoryFileUploadHandler):
+    """Небольшие файлы в памяти с подсчетом SHA-256"""
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadHandlerMixin, TemporaryFileUploadHandler):
+    """Крупные файлы во временном файле на диске с подсчетом SHA-256"""
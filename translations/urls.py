@@ -7,7 +7,13 @@ app_name = "translations"
 urlpatterns = [
     path("documents/", views.document_list, name="document_list"),
     path("documents/upload/", views.document_upload, name="document_upload"),
+    path(
+        "documents/upload/jobs/<int:job_id>/",
+        views.ingestion_job_status,
+        name="ingestion_job_status",
+    ),
     path("documents/<int:document_id>/", views.document_detail, name="document_detail"),
+    path("documents/bulk-assign/", views.document_bulk_assign, name="documents_bulk_assign"),
     path(
         "documents/<int:document_id>/bulk-assign-all/",
         views.document_bulk_assign,
@@ -0,0 +1,228 @@
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .batching import current_batch
+from .models import Sentence, Translation, UserStats
+from .utils import TEXT_METRIC_FIELDS
+
+# Вклад предложения в статистику: {(user_id, role): Counter(поле=значение)}
+StatsDeltas = Dict[Tuple[int, str], Counter]
+
+# Метрики текста (слова, символы, символы без пробелов) в порядке TEXT_METRIC_FIELDS
+Metrics = Tuple[int, int, int]
+
+# Поля UserStats, соответствующие TEXT_METRIC_FIELDS
+STATS_METRIC_FIELDS = ("words", "characters", "characters_no_spaces")
+
+# Предложения, вклад которых уже вычтен целиком (removing_sentences): сигналы их удаления пропускаются
+_removed_sentences: ContextVar[FrozenSet[int]] = ContextVar("translations_removed_sentences", default=frozenset())
+
+
+def _metrics_counter(metrics: Metrics, prefix: str = "") -> Counter:
+    return Counter({f"{prefix}{field}": value for field, value in zip(STATS_METRIC_FIELDS, metrics)})
+
+
+def contributions(uploader_id, assigned_to_id, corrector_id, metrics: Metrics, translation=None) -> StatsDeltas:
+    """
+    Вклад одного предложения в статистику пользователей; translation - (translator_id, metrics) или None.
+    Загрузивший документ и назначенный переводчик получают оригинал, автор перевода - перевод,
+    корректор - оригинал и перевод предложений, у которых перевод уже есть.
+    """
+    result = defaultdict(Counter)
+    original = _metrics_counter(metrics)
+    original["sentences"] = 1
+    result[(uploader_id, "uploader")].update(original)
+    if assigned_to_id:
+        result[(assigned_to_id, "translator")].update(original)
+    if translation is not None:
+        translator_id, translated_metrics = translation
+        translated = _metrics_counter(translated_metrics, "translated_")
+        translated["translated_sentences"] = 1
+        result[(uploader_id, "uploader")].update(translated)
+        result[(translator_id, "translator")].update(translated)
+        if corrector_id:
+            result[(corrector_id, "corrector")].update(original)
+            result[(corrector_id, "corrector")].update(translated)
+    return result
+
+
+def subtract(after: StatsDeltas, before: StatsDeltas) -> StatsDeltas:
+    """Приращения after - before"""
+    deltas = defaultdict(Counter)
+    for key, values in after.items():
+        deltas[key].update(values)
+    for key, values in before.items():
+        deltas[key].subtract(values)
+    return deltas
+
+
+def _original_sums() -> dict:
+    sums = {field: Sum(column) for field, column in zip(STATS_METRIC_FIELDS, TEXT_METRIC_FIELDS)}
+    return {"sentences": Count("id"), **sums}
+
+
+def _translated_sums() -> dict:
+    sums = {
+        f"translated_{field}": Sum(f"translation__{column}")
+        for field, column in zip(STATS_METRIC_FIELDS, TEXT_METRIC_FIELDS)
+    }
+    return {"translated_sentences": Count("translation"), **sums}
+
+
+def _add_grouped(totals: StatsDeltas, rows, key: str, role: str) -> None:
+    """Добавляет к totals суммы, сгруппированные по пользователю key"""
+    for row in rows:
+        user_id = row.pop(key)
+        if user_id is not None:
+            totals[(user_id, role)].update({field: value or 0 for field, value in row.items()})
+
+
+def collect_contributions(sentences) -> StatsDeltas:
+    """Суммарный вклад предложений queryset: четыре агрегирующих запроса, тексты не загружаются"""
+    sentences = sentences.order_by()
+    translated = sentences.filter(translation__isnull=False)
+    totals = defaultdict(Counter)
+    _add_grouped(
+        totals,
+        sentences.values("document__uploaded_by").annotate(**_original_sums(), **_translated_sums()),
+        "document__uploaded_by",
+        "uploader",
+    )
+    _add_grouped(totals, sentences.values("assigned_to").annotate(**_original_sums()), "assigned_to", "translator")
+    _add_grouped(
+        totals,
+        translated.values("translation__translator").annotate(**_translated_sums()),
+        "translation__translator",
+        "translator",
+    )
+    _add_grouped(
+        totals,
+        translated.values("corrector").annotate(**_original_sums(), **_translated_sums()),
+        "corrector",
+        "corrector",
+    )
+    return totals
+
+
+def created_sentences_deltas(sentences) -> StatsDeltas:
+    """Вклад новых предложений, сохраненных bulk_create (сигналы post_save при этом не отправляются)"""
+    total = defaultdict(Counter)
+    for sentence in sentences:
+        owners = (sentence.document.uploaded_by_id, sentence.assigned_to_id, sentence.corrector_id, sentence.metrics)
+        for key, values in contributions(*owners).items():
+            total[key].update(values)
+    return total
+
+
+def reassignment_deltas(queryset, field: str, user_id: Optional[int]) -> StatsDeltas:
+    """Приращения статистики для queryset.update(**{field: user}), field - "assigned_to" или "corrector" """
+    queryset = queryset.order_by()
+    if field == "assigned_to":
+        role = "translator"
+        rows = queryset.values(field).annotate(**_original_sums())
+    else:
+        # Корректору засчитываются только предложения с переводом
+        role = "corrector"
+        rows = (
+            queryset.filter(translation__isnull=False).values(field).annotate(**_original_sums(), **_translated_sums())
+        )
+
+    deltas = defaultdict(Counter)
+    for row in rows:
+        previous_id = row.pop(field)
+        sums = {name: value or 0 for name, value in row.items()}
+        if previous_id is not None:
+            deltas[(previous_id, role)].subtract(sums)
+        if user_id is not None:
+            deltas[(user_id, role)].update(sums)
+    return deltas
+
+
+def apply_user_stats_deltas(deltas: StatsDeltas) -> None:
+    """Применяет приращения сразу или при выходе из batched_signals()"""
+    batch = current_batch()
+    if batch is not None:
+        batch.change_user_stats(deltas)
+    else:
+        UserStats.apply_deltas(deltas)
+
+
+@contextmanager
+def removing_sentences(queryset):
+    """
+    Вычитает вклад предложений queryset перед их удалением:
+    сигналы удаления этих предложений и их переводов внутри блока статистику не трогают
+    """
+    removed = set(queryset.values_list("id", flat=True))
+    deltas = subtract({}, collect_contributions(queryset))
+    token = _removed_sentences.set(_removed_sentences.get() | removed)
+    try:
+        yield
+    finally:
+        _removed_sentences.reset(token)
+    apply_user_stats_deltas(deltas)
+
+
+def is_removed(sentence_id: int) -> bool:
+    return sentence_id in _removed_sentences.get()
+
+
+def sentence_saved(sentence, created: bool) -> None:
+    """Сдвигает статистику после сохранения предложения: смена исполнителей или текста"""
+    current = (sentence.assigned_to_id, sentence.corrector_id, sentence.metrics)
+    previous = None if created else sentence._loaded_stats
+    sentence._loaded_stats = current
+    if previous == current or (not created and previous is None):
+        # Без изменений или прежнее состояние неизвестно (предложение загружено без нужных полей)
+        return
+
+    translation = None
+    if previous is not None and (previous[1] != current[1] or previous[2] != current[2]):
+        # Перевод влияет только на статистику корректора и оригинала
+        row = Translation.objects.filter(sentence_id=sentence.pk).values_list("translator_id", *TEXT_METRIC_FIELDS)
+        row = row.first()
+        translation = (row[0], row[1:]) if row else None
+    uploader_id = sentence.document.uploaded_by_id
+    before = contributions(uploader_id, *previous, translation) if previous is not None else {}
+    apply_user_stats_deltas(subtract(contributions(uploader_id, *current, translation), before))
+
+
+def sentence_deleted(sentence) -> None:
+    if is_removed(sentence.pk) or sentence._loaded_stats is None:
+        return
+    # Перевод к этому моменту уже удален каскадом, его вклад вычтен сигналом перевода
+    before = contributions(sentence.document.uploaded_by_id, *sentence._loaded_stats)
+    apply_user_stats_deltas(subtract({}, before))
+
+
+def translation_changed(translation, created: bool = False, deleted: bool = False) -> None:
+    """Сдвигает статистику после создания, правки или удаления перевода"""
+    if is_removed(translation.sentence_id):
+        return
+    current = None if deleted else (translation.translator_id, translation.metrics)
+    previous = None if created else translation._loaded_stats
+    translation._loaded_stats = current
+    if previous == current:
+        return
+
+    sentence = translation.sentence
+    owners = (sentence.document.uploaded_by_id, sentence.assigned_to_id, sentence.corrector_id, sentence.metrics)
+    apply_user_stats_deltas(subtract(contributions(*owners, current), contributions(*owners, previous)))
+
+
+def rebuild_user_stats() -> int:
+    """Полностью пересчитывает UserStats агрегатами по всем предложениям и переводам; возвращает число строк"""
+    totals = collect_contributions(Sentence.objects.all())
+    rows = [
+        UserStats(user_id=user_id, role=role, **{field: values[field] for field in UserStats.COUNTER_FIELDS})
+        for (user_id, role), values in totals.items()
+    ]
+    with transaction.atomic():
+        UserStats.objects.all().delete()
+        UserStats.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
@@ -1,95 +1,378 @@
+import codecs
+import fnmatch
+import hashlib
+import io
 import re
-from typing import List, Tuple
+import unicodedata
+import zipfile
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple, Union
 
 from django.core.exceptions import ValidationError
 
-import docx
 import openpyxl
+from lxml import etree
+
+# Паттерн для разделения на предложения
+# Не делим после инициалов вида "С." и учитываем возможные кавычки перед началом следующего предложения
+SENTENCE_SPLIT_PATTERN = re.compile(r'(?<!\b[А-ЯЁA-Z]\.)(?<=[.!?])\s+(?=["“”«»]?[А-ЯЁA-Z])')
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Колонки метрик текста предложения и перевода, в порядке значений text_metrics()
+TEXT_METRIC_FIELDS = ("word_count", "character_count", "character_count_no_spaces")
+
+# Размер блока (в символах/байтах), которым читаются текстовые файлы
+TXT_CHUNK_SIZE = 1024 * 1024
+
+# Размер образца байтов, по которому определяется кодировка
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# Метки порядка байтов (BOM) и соответствующие кодировки
+ENCODING_BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+# Байты букв кириллицы в cp1251 (А-я, Ё, ё) и латинские буквы ASCII
+CP1251_CYRILLIC_BYTES = bytes(range(0xC0, 0x100)) + b"\xa8\xb8"
+NON_ASCII_PATTERN = re.compile(rb"[\x80-\xff]")
+ASCII_LETTER_BYTES = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+# Минимальная доля кириллицы среди букв образца, при которой выбирается cp1251
+CP1251_MIN_CYRILLIC_SHARE = 0.3
+
+# Пространство имен WordprocessingML
+W_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W_BODY = f"{{{W_NAMESPACE}}}body"
+W_P = f"{{{W_NAMESPACE}}}p"
+W_R = f"{{{W_NAMESPACE}}}r"
+W_T = f"{{{W_NAMESPACE}}}t"
+W_TAB = f"{{{W_NAMESPACE}}}tab"
+W_BR = f"{{{W_NAMESPACE}}}br"
+W_CR = f"{{{W_NAMESPACE}}}cr"
+W_TBL = f"{{{W_NAMESPACE}}}tbl"
+W_TC = f"{{{W_NAMESPACE}}}tc"
+W_HDR = f"{{{W_NAMESPACE}}}hdr"
+W_FTR = f"{{{W_NAMESPACE}}}ftr"
+
+
+def file_sha256(file) -> str:
+    """
+    Возвращает SHA-256 файла Django. Для загрузок используется значение,
+    посчитанное обработчиком загрузки, иначе файл читается блоками.
+    """
+    digest = getattr(file, "sha256", None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in file.chunks():
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    """Нормализует текст для точного сравнения: Unicode NFC и схлопывание пробельных символов"""
+    return WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def text_metrics(text: str) -> Tuple[int, int, int]:
+    """Слова, символы и символы без пробелов: значения колонок word_count, character_count, character_count_no_spaces"""
+    text = text or ""
+    return len(text.split()), len(text), len(text.replace(" ", ""))
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 нормализованного текста, ключ памяти переводов"""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def _unique_sentences(sentences: Iterable[str]) -> Iterator[str]:
+    """
+    Пропускает пустые и повторяющиеся предложения, сохраняя порядок.
+    Повторы ищутся по всему документу, поэтому множество встреченных предложений растет с его размером:
+    хранятся только 16-байтовые хеши, около 80 байт на уникальное предложение (примерно 80 МБ на миллион)
+    вместо самих текстов.
+    """
+    seen = set()
+    for sentence in sentences:
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        digest = hashlib.blake2b(sentence.encode("utf-8"), digest_size=16).digest()
+        if digest not in seen:
+            seen.add(digest)
+            yield sentence
+
+
+def _split_chunks(chunks: Iterable[str]) -> Iterator[str]:
+    carry = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        # Удаляем лишние пробелы и переносы строк
+        buffer = WHITESPACE_PATTERN.sub(" ", carry + chunk)
+        pieces = SENTENCE_SPLIT_PATTERN.split(buffer)
+        # Последний фрагмент может продолжиться в следующем блоке
+        carry = pieces.pop()
+        yield from pieces
+    yield carry
+
+
+def iter_sentences(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Потоково разбивает текст, поступающий блоками, на предложения.
+    Незавершенное предложение в конце блока переносится в следующий блок,
+    поэтому результат совпадает с разбором всего текста целиком.
+    """
+    return _unique_sentences(_split_chunks(chunks))
 
 
 def extract_sentences_from_text(text: str) -> List[str]:
     """
     Извлекает предложения из текста, используя регулярные выражения
     """
-    # Удаляем лишние пробелы и переносы строк
-    text = re.sub(r"\s+", " ", text.strip())
+    return list(iter_sentences([text]))
 
-    # Паттерн для разделения на предложения
-    # Не делим после инициалов вида "С." и учитываем возможные кавычки перед началом следующего предложения
-    sentence_pattern = r'(?<!\b[А-ЯЁA-Z]\.)(?<=[.!?])\s+(?=["“”«»]?[А-ЯЁA-Z])'
 
-    # Разбиваем на предложения
-    sentences = re.split(sentence_pattern, text)
+def _count_bytes(sample: bytes, alphabet: bytes) -> int:
+    """Считает байты образца, входящие в alphabet"""
+    return len(sample) - len(sample.translate(None, alphabet))
 
-    # Фильтруем пустые предложения и убираем лишние пробелы
-    sentences = [s.strip() for s in sentences if s.strip()]
 
-    # Удаляем дублирующиеся предложения, сохраняя порядок
-    seen = set()
-    unique_sentences = []
-    for sentence in sentences:
-        if sentence not in seen:
-            seen.add(sentence)
-            unique_sentences.append(sentence)
+def detect_encoding(sample: bytes) -> str:
+    """
+    Определяет кодировку по образцу байтов: BOM, затем проверка UTF-8,
+    затем выбор между cp1251 и latin-1 по доле байтов кириллицы среди букв
+    """
+    for bom, encoding in ENCODING_BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    try:
+        # Образец может обрываться посреди многобайтового символа, поэтому final=False
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
 
-    return unique_sentences
+    # Байт 0x98 в cp1251 не определен
+    if b"\x98" not in sample:
+        cyrillic = _count_bytes(sample, CP1251_CYRILLIC_BYTES)
+        letters = cyrillic + _count_bytes(sample, ASCII_LETTER_BYTES)
+        if letters and cyrillic / letters >= CP1251_MIN_CYRILLIC_SHARE:
+            return "cp1251"
+    return "latin-1"
 
 
-def process_txt_file(file_path: str) -> List[str]:
+def detect_file_encoding(file_path: str) -> str:
     """
-    Обрабатывает TXT файл и извлекает предложения
+    Определяет кодировку TXT файла по образцу, начинающемуся с первого не-ASCII байта.
+    Файл читается без декодирования и только до образца;
+    чисто ASCII-текст одинаково читается в любой из кодировок и считается UTF-8.
+    """
+    with open(file_path, "rb") as file:
+        head = file.read(len(codecs.BOM_UTF8))
+        for bom, encoding in ENCODING_BOMS:
+            if head.startswith(bom):
+                return encoding
+        file.seek(0)
+
+        for block in iter(lambda: file.read(ENCODING_SAMPLE_SIZE), b""):
+            match = NON_ASCII_PATTERN.search(block)
+            if match:
+                # ASCII-префикс не влияет на выбор кодировки, образец дочитывается до полного размера
+                sample = block[match.start() :] + file.read(match.start())
+                return detect_encoding(sample)
+    return "utf-8"
+
+
+def iter_txt_sentences(file_path: Union[str, BinaryIO], encoding: Optional[str] = None) -> Iterator[str]:
     """
+    Потоково извлекает предложения из TXT файла: текст читается блоками по TXT_CHUNK_SIZE,
+    в памяти кроме блока остаются только хеши уникальных предложений (см. _unique_sentences).
+    Вместо пути можно передать открытый двоичный файл - он остается открытым, кодировка тогда обязательна.
+    Если кодировка не передана, она определяется detect_file_encoding.
+    """
+    encoding = encoding or detect_file_encoding(file_path)
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            content = file.read()
-        return extract_sentences_from_text(content)
-    except UnicodeDecodeError:
-        # Пробуем другие кодировки
-        encodings = ["cp1251", "latin-1", "iso-8859-1"]
-        for encoding in encodings:
+        if isinstance(file_path, str):
+            with open(file_path, "r", encoding=encoding) as file:
+                yield from iter_sentences(iter(lambda: file.read(TXT_CHUNK_SIZE), ""))
+        else:
+            file = io.TextIOWrapper(file_path, encoding=encoding)
             try:
-                with open(file_path, "r", encoding=encoding) as file:
-                    content = file.read()
-                return extract_sentences_from_text(content)
-            except UnicodeDecodeError:
-                continue
+                yield from iter_sentences(iter(lambda: file.read(TXT_CHUNK_SIZE), ""))
+            finally:
+                file.detach()
+    except (UnicodeDecodeError, LookupError):
         raise ValidationError("Не удалось прочитать файл. Проверьте кодировку.")
 
 
-def process_docx_file(file_path: str) -> List[str]:
+def process_txt_file(file_path: str, encoding: Optional[str] = None) -> List[str]:
     """
-    Обрабатывает DOCX файл и извлекает абзацы
+    Обрабатывает TXT файл и извлекает предложения
+    """
+    return list(iter_txt_sentences(file_path, encoding))
+
+
+def _docx_paragraph_text(paragraph) -> str:
+    """
+    Текст абзаца по правилам python-docx: только прямые дочерние w:r,
+    w:tab превращается в табуляцию, w:br и w:cr - в перенос строки
+    """
+    parts = []
+    for run in paragraph.iterchildren(W_R):
+        for child in run:
+            if child.tag == W_T:
+                parts.append(child.text or "")
+            elif child.tag == W_TAB:
+                parts.append("\t")
+            elif child.tag in (W_BR, W_CR):
+                parts.append("\n")
+    return "".join(parts)
+
+
+def _iter_docx_part_paragraphs(source, containers: Tuple[str, ...]) -> Iterator[str]:
+    """
+    Потоково разбирает XML-часть DOCX и возвращает текст абзацев, прямых потомков containers.
+    Обработанные элементы удаляются из дерева, поэтому память не растет с размером документа.
+    """
+    for _, element in etree.iterparse(
+        source, events=("end",), tag=(W_P, W_TBL), resolve_entities=False, huge_tree=True
+    ):
+        parent = element.getparent()
+        if element.tag == W_P and parent is not None and parent.tag in containers:
+            yield _docx_paragraph_text(element)
+
+        if parent is not None and parent.tag in (W_BODY, W_HDR, W_FTR):
+            # Элемент верхнего уровня разобран целиком: освобождаем его и предыдущие узлы
+            element.clear()
+            while element.getprevious() is not None:
+                del parent[0]
+        elif element.tag == W_P:
+            element.clear()
+
+
+def iter_docx_paragraphs(
+    file_path: Union[str, BinaryIO], include_tables: bool = True, include_headers_footers: bool = False
+) -> Iterator[str]:
+    """
+    Потоково извлекает текст абзацев DOCX напрямую из word/document.xml без объектной модели python-docx.
+    Абзацы тела документа совпадают с docx.Document(...).paragraphs; абзацы ячеек таблиц
+    (include_tables) идут в порядке документа, надписи (text box) пропускаются.
+    При include_headers_footers после тела возвращаются абзацы колонтитулов.
+    """
+    containers = (W_BODY, W_TC) if include_tables else (W_BODY,)
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open("word/document.xml") as source:
+            yield from _iter_docx_part_paragraphs(source, containers)
+
+        if include_headers_footers:
+            names = archive.namelist()
+            parts = sorted(fnmatch.filter(names, "word/header*.xml")) + sorted(
+                fnmatch.filter(names, "word/footer*.xml")
+            )
+            for name in parts:
+                with archive.open(name) as source:
+                    yield from _iter_docx_part_paragraphs(source, containers + (W_HDR, W_FTR))
+
+
+def iter_docx_sentences(file_path: Union[str, BinaryIO], include_headers_footers: bool = False) -> Iterator[str]:
+    """
+    Потоково извлекает непустые абзацы DOCX (включая ячейки таблиц)
     """
     try:
-        doc = docx.Document(file_path)
-        return [p.text.strip() for p in doc.paragraphs if p.text.strip()]
-    except Exception as e:
+        for text in iter_docx_paragraphs(file_path, include_headers_footers=include_headers_footers):
+            text = text.strip()
+            if text:
+                yield text
+    except (zipfile.BadZipFile, KeyError, etree.XMLSyntaxError) as e:
         raise ValidationError(f"Ошибка при чтении DOCX файла: {str(e)}")
 
 
-def process_xlsx_file(file_path: str) -> List[str]:
+def process_docx_file(file_path: str, include_headers_footers: bool = False) -> List[str]:
     """
-    Обрабатывает XLSX файл и извлекает предложения
+    Обрабатывает DOCX файл и извлекает абзацы
     """
-    try:
-        workbook = openpyxl.load_workbook(file_path, data_only=True)
-        text_content = []
+    return list(iter_docx_sentences(file_path, include_headers_footers))
 
-        for sheet_name in workbook.sheetnames:
-            sheet = workbook[sheet_name]
 
+def iter_xlsx_cells(file_path: Union[str, BinaryIO]) -> Iterator[str]:
+    """
+    Потоково возвращает текстовые ячейки всех листов XLSX файла (режим read-only openpyxl)
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
             for row in sheet.iter_rows(values_only=True):
                 for cell_value in row:
                     if cell_value and isinstance(cell_value, str):
-                        text_content.append(str(cell_value))
-
-        # Объединяем весь текст и разбиваем на предложения
-        full_text = " ".join(text_content)
-        return extract_sentences_from_text(full_text)
+                        yield cell_value
+    finally:
+        workbook.close()
+
+
+def _join_in_chunks(values: Iterable[str], chunk_size: int = 64 * 1024) -> Iterator[str]:
+    """Объединяет строки через пробел в блоки примерно по chunk_size символов"""
+    parts: List[str] = []
+    size = 0
+    for value in values:
+        parts.append(value)
+        size += len(value) + 1
+        if size >= chunk_size:
+            parts.append("")
+            yield " ".join(parts)
+            parts = []
+            size = 0
+    if parts:
+        yield " ".join(parts)
+
+
+def iter_xlsx_sentences(file_path: Union[str, BinaryIO], cell_as_sentence: bool = False) -> Iterator[str]:
+    """
+    Потоково извлекает предложения из XLSX файла.
+    При cell_as_sentence=True каждая ячейка считается отдельным предложением,
+    иначе текст ячеек разбивается на предложения так же, как TXT.
+    """
+    try:
+        cells = iter_xlsx_cells(file_path)
+        if cell_as_sentence:
+            yield from _unique_sentences(cells)
+        else:
+            # Текст ячеек объединяется через пробел
+            yield from iter_sentences(_join_in_chunks(cells))
     except Exception as e:
         raise ValidationError(f"Ошибка при чтении XLSX файла: {str(e)}")
 
 
+def process_xlsx_file(file_path: str, cell_as_sentence: bool = False) -> List[str]:
+    """
+    Обрабатывает XLSX файл и извлекает предложения
+    """
+    return list(iter_xlsx_sentences(file_path, cell_as_sentence))
+
+
+def iter_file_sentences(
+    file_path: Union[str, BinaryIO],
+    file_extension: str,
+    xlsx_cell_as_sentence: bool = False,
+    docx_headers_footers: bool = False,
+    txt_encoding: Optional[str] = None,
+) -> Iterable[str]:
+    """
+    Потоково возвращает предложения файла.
+    TXT, DOCX и XLSX можно передать открытым двоичным файлом вместо пути.
+    """
+    file_extension = file_extension.lower()
+
+    if file_extension == ".txt":
+        return iter_txt_sentences(file_path, txt_encoding)
+    elif file_extension == ".docx":
+        return iter_docx_sentences(file_path, docx_headers_footers)
+    elif file_extension == ".xlsx":
+        return iter_xlsx_sentences(file_path, xlsx_cell_as_sentence)
+    return process_file(file_path, file_extension)
+
+
 def process_file(file_path: str, file_extension: str) -> List[str]:
     """
     Основная функция для обработки файлов разных форматов
@@ -134,19 +417,30 @@ def validate_sentence(sentence: str) -> bool:
     return True
 
 
-def extract_and_validate_sentences(file_path: str, file_extension: str) -> List[Tuple[int, str]]:
+def iter_validated_sentences(
+    file_path: Union[str, BinaryIO],
+    file_extension: str,
+    xlsx_cell_as_sentence: bool = False,
+    docx_headers_footers: bool = False,
+    txt_encoding: Optional[str] = None,
+) -> Iterator[Tuple[int, str]]:
     """
-    Извлекает предложения из файла, валидирует их и возвращает список кортежей (номер, текст)
+    Потоково извлекает предложения из файла, валидирует их и возвращает кортежи (номер, текст)
     """
-    sentences = process_file(file_path, file_extension)
-
-    validated_sentences = []
     sentence_number = 1
 
+    sentences = iter_file_sentences(
+        file_path, file_extension, xlsx_cell_as_sentence, docx_headers_footers, txt_encoding
+    )
     for sentence in sentences:
         cleaned_sentence = clean_sentence(sentence)
         if validate_sentence(cleaned_sentence):
-            validated_sentences.append((sentence_number, cleaned_sentence))
+            yield sentence_number, cleaned_sentence
             sentence_number += 1
 
-    return validated_sentences
+
+def extract_and_validate_sentences(file_path: str, file_extension: str) -> List[Tuple[int, str]]:
+    """
+    Извлекает предложения из файла, валидирует их и возвращает список кортежей (номер, текст)
+    """
+    return list(iter_validated_sentences(file_path, file_extension))
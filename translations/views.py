@@ -1,24 +1,25 @@
 import json
-import os
-import mimetypes
-from urllib.parse import quote
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import ValidationError
 from django.core.files.storage import default_storage
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Q
-from django.http import HttpResponse, JsonResponse
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.utils import timezone
 from django.views.generic import DetailView, ListView, View
-from django.utils.text import slugify
 
 from dashboards.mixins import AdminOrRepresentativeMixin, DocumentAccessMixin
 
+from .batching import batched_signals
+from .downloads import can_resume, file_download_response
 from .export_utils import (
-    export_document_all_formats,
-    export_document_translations,
+    build_document_export,
+    document_export_path,
+    export_filename,
     export_sentences_to_csv,
     get_document_statistics,
 )
@@ -28,8 +29,13 @@ from .forms import (
     CreateTranslationForm,
     EditTranslationForm,
 )
-from .models import Document, Sentence, Translation
-from .utils import extract_and_validate_sentences
+from .memory import get_memory_suggestion
+from .models import Document, IngestionJob, Sentence, Translation
+from .pagination import KeysetPaginator
+from .search import search_sentences
+from .similarity import find_similar
+from .user_stats import reassignment_deltas, removing_sentences
+from .utils import file_sha256
 
 
 class DocumentListView(LoginRequiredMixin, DocumentAccessMixin, ListView):
@@ -41,15 +47,16 @@ class DocumentListView(LoginRequiredMixin, DocumentAccessMixin, ListView):
     paginate_by = 25
 
     def get_queryset(self):
+        # Прогресс документа хранится в счетчиках Document, поэтому предложения не подгружаются
         # Для переводчиков показываем только назначенные им документы
         if self.request.user.role == 'translator':
-            queryset = Document.objects.select_related("uploaded_by", "translator", "corrector").prefetch_related("sentences").filter(translator=self.request.user)
+            queryset = Document.objects.select_related("uploaded_by", "translator", "corrector").filter(translator=self.request.user)
         elif self.request.user.role == 'corrector':
             # Для корректоров показываем документы, назначенные им для проверки
-            queryset = Document.objects.select_related("uploaded_by", "translator", "corrector").prefetch_related("sentences").filter(corrector=self.request.user)
+            queryset = Document.objects.select_related("uploaded_by", "translator", "corrector").filter(corrector=self.request.user)
         else:
             # Для админов и представителей показываем все документы
-            queryset = Document.objects.select_related("uploaded_by", "translator", "corrector").prefetch_related("sentences").all()
+            queryset = Document.objects.select_related("uploaded_by", "translator", "corrector").all()
 
         # Поиск
         search_query = self.request.GET.get("search", "")
@@ -95,6 +102,9 @@ class DocumentListView(LoginRequiredMixin, DocumentAccessMixin, ListView):
         
         # Добавляем статистику по неназначенным документам (только для админов и представителей)
         if self.request.user.role in ['admin', 'representative']:
+            # Формы массового назначения исполнителей для выбранных документов
+            context["assign_form"] = AssignTranslatorForm()
+            context["assign_corrector_form"] = AssignCorrectorForm()
             all_documents = Document.objects.all()
             context["unassigned_count"] = all_documents.filter(
                 models.Q(translator__isnull=True) | models.Q(corrector__isnull=True)
@@ -111,7 +121,7 @@ class DocumentListView(LoginRequiredMixin, DocumentAccessMixin, ListView):
             context["unassigned_count"] = 0  # У корректора все документы назначены
             context["total_documents"] = corrector_documents.count()
         
-        # Добавляем статистику для каждого документа
+        # Добавляем статистику для каждого документа (из счетчиков, без запросов к предложениям)
         for document in context["documents"]:
             document.translation_stats = document.get_translation_stats()
             document.correction_stats = document.get_correction_stats()
@@ -135,45 +145,34 @@ class DocumentUploadView(LoginRequiredMixin, AdminOrRepresentativeMixin, View):
                 messages.error(request, "Пожалуйста, выберите файл для загрузки.")
                 return render(request, self.template_name)
 
-            # Проверяем, не был ли уже загружен этот файл
-            existing_document = Document.objects.filter(file__endswith=file.name, uploaded_by=request.user).first()
+            # Проверяем по хешу содержимого, не был ли этот файл уже загружен (под любым именем и любым пользователем)
+            content_hash = file_sha256(file)
+            existing_document = Document.objects.filter(content_hash=content_hash).order_by("id").first()
 
             if existing_document:
-                messages.warning(request, f'Документ "{file.name}" уже был загружен ранее.')
+                messages.warning(
+                    request,
+                    f'Файл "{file.name}" уже был загружен ранее как документ "{existing_document.title}".',
+                )
                 return redirect("translations:document_detail", document_id=existing_document.id)
 
-            # Создаем документ
-            document = Document.objects.create(file=file, uploaded_by=request.user)
-
-            # Обрабатываем файл и извлекаем предложения
-            file_path = document.file.path
-            file_extension = os.path.splitext(file.name)[1]
-
-            sentences_data = extract_and_validate_sentences(file_path, file_extension)
+            # Создаем документ: обработчик post_save ставит в очередь задачу извлечения предложений
+            document = Document.objects.create(file=file, uploaded_by=request.user, content_hash=content_hash)
+            job = document.ingestion_jobs.latest()
 
-            # Проверяем, есть ли уже предложения для этого документа
-            existing_sentences = Sentence.objects.filter(document=document).count()
-            if existing_sentences > 0:
-                # Если предложения уже существуют, удаляем их перед созданием новых
-                Sentence.objects.filter(document=document).delete()
+            if job.status == "failed":
+                raise ValidationError(job.error)
 
-            # Создаем предложения
-            for sentence_number, sentence_text in sentences_data:
-                Sentence.objects.create(
-                    document=document,
-                    sentence_number=sentence_number,
-                    original_text=sentence_text,
+            if job.status == "completed":
+                messages.success(
+                    request,
+                    f'Документ "{document.title}" успешно загружен. Извлечено {job.inserted} предложений.',
                 )
+                return redirect("translations:document_detail", document_id=document.id)
 
-            # Отмечаем документ как обработанный
-            document.is_processed = True
-            document.save()
-
-            messages.success(
-                request,
-                f'Документ "{document.title}" успешно загружен. Извлечено {len(sentences_data)} предложений.',
-            )
-            return redirect("translations:document_detail", document_id=document.id)
+            # Задача выполняется воркером - страница загрузки опрашивает её прогресс
+            messages.info(request, f'Документ "{document.title}" поставлен в очередь на обработку.')
+            return render(request, self.template_name, {"job": job, "document": document})
 
         except Exception as e:
             # Если документ был создан, но произошла ошибка, удаляем его
@@ -181,7 +180,8 @@ class DocumentUploadView(LoginRequiredMixin, AdminOrRepresentativeMixin, View):
                 try:
                     if document.file:
                         default_storage.delete(document.file.name)
-                    document.delete()
+                    with transaction.atomic(), removing_sentences(document.sentences.all()):
+                        document.delete()
                 except Exception:
                     pass
 
@@ -195,6 +195,16 @@ class DocumentUploadView(LoginRequiredMixin, AdminOrRepresentativeMixin, View):
         return render(request, self.template_name)
 
 
+class IngestionJobStatusView(LoginRequiredMixin, AdminOrRepresentativeMixin, View):
+    """AJAX view с прогрессом фоновой загрузки документа"""
+
+    def get(self, request, job_id):
+        job = get_object_or_404(IngestionJob, id=job_id)
+        data = job.as_progress_dict()
+        data["document_url"] = reverse("translations:document_detail", kwargs={"document_id": job.document_id})
+        return JsonResponse(data)
+
+
 class DocumentDetailView(LoginRequiredMixin, DocumentAccessMixin, DetailView):
     """Детальная информация о документе"""
 
@@ -235,18 +245,12 @@ class DocumentDetailView(LoginRequiredMixin, DocumentAccessMixin, DetailView):
         # Поиск по тексту
         search_query = self.request.GET.get("search", "")
         if search_query:
-            sentences = sentences.filter(
-                Q(original_text__icontains=search_query)
-                | Q(translation__translated_text__icontains=search_query)
-                | Q(document__file__icontains=search_query)
-            )
-
-        # Пагинация
-        from django.core.paginator import Paginator
+            sentences = search_sentences(sentences, search_query, match_files=True)
 
-        paginator = Paginator(sentences, 20)
-        page_number = self.request.GET.get("page")
-        context["page_obj"] = paginator.get_page(page_number)
+        # Курсорная пагинация по номеру предложения; без фильтров общее число берется из счетчика документа
+        count = None if status_filter or search_query else document.sentences_total
+        paginator = KeysetPaginator(sentences, ["sentence_number"], 20, count=count)
+        context["page_obj"] = paginator.get_page(self.request.GET)
         context["status_filter"] = status_filter
         context["search_query"] = search_query
 
@@ -259,16 +263,29 @@ class DocumentDetailView(LoginRequiredMixin, DocumentAccessMixin, DetailView):
 
 
 class DocumentBulkAssignView(LoginRequiredMixin, AdminOrRepresentativeMixin, View):
-    """Массовое назначение переводчика и корректора для всех предложений документа"""
+    """
+    Массовое назначение переводчика и корректора для всех предложений одного или нескольких документов.
+    Назначение выполняется одним UPDATE на роль, статусы документов пересчитываются один раз.
+    """
+
+    def post(self, request, document_id=None):
+        if document_id is not None:
+            document_ids = [document_id]
+            redirect_to = redirect("translations:document_detail", document_id=document_id)
+        else:
+            document_ids = [int(value) for value in request.POST.getlist("document_ids") if value.isdigit()]
+            redirect_to = redirect("translations:document_list")
 
-    def post(self, request, document_id):
-        document = get_object_or_404(Document, id=document_id)
         translator_id = request.POST.get("assigned_to")
         corrector_id = request.POST.get("corrector")
 
+        if not document_ids:
+            messages.error(request, "Не выбрано ни одного документа.")
+            return redirect_to
+
         if not translator_id and not corrector_id:
             messages.error(request, "Не выбран ни переводчик, ни корректор.")
-            return redirect("translations:document_detail", document_id=document_id)
+            return redirect_to
 
         try:
             from users.models import User
@@ -282,41 +299,41 @@ class DocumentBulkAssignView(LoginRequiredMixin, AdminOrRepresentativeMixin, Vie
             if corrector_id:
                 corrector = User.objects.get(id=corrector_id, role="corrector")
 
-            sentences = Sentence.objects.filter(document=document)
-
-            assigned_translator_count = 0
-            assigned_corrector_count = 0
-
-            # Назначаем переводчика и корректора на документ
-            document_updated = False
-            if translator and document.translator != translator:
-                document.translator = translator
-                document_updated = True
-            
-            if corrector and document.corrector != corrector:
-                document.corrector = corrector
-                document_updated = True
-            
-            if document_updated:
-                document.save()
-
-            for sentence in sentences:
-                updated = False
-
-                # Назначаем переводчика
-                if translator and sentence.assigned_to != translator:
-                    sentence.assigned_to = translator
-                    updated = True
-                    assigned_translator_count += 1
-
-                # Назначаем корректора
-                if corrector and sentence.corrector != corrector:
-                    sentence.corrector = corrector
-                    updated = True
-                    assigned_corrector_count += 1
-
-                if updated:
-                    sentence.save()
+            with transaction.atomic(), batched_signals() as signals:
+                documents = list(Document.objects.select_for_update().filter(id__in=document_ids))
+                if not documents:
+                    messages.error(request, "Выбранные документы не найдены.")
+                    return redirect_to
+
+                document_ids = [document.id for document in documents]
+                sentences = Sentence.objects.filter(document_id__in=document_ids)
+                now = timezone.now()
+
+                assigned_translator_count = 0
+                assigned_corrector_count = 0
+
+                # Назначаем исполнителей на документы и на все их предложения: по одному UPDATE на роль
+                # update() не отправляет сигналы: приращения статистики пользователей считаются заранее
+                if translator:
+                    Document.objects.filter(id__in=document_ids).update(translator=translator)
+                    reassigned = sentences.exclude(assigned_to=translator)
+                    signals.change_user_stats(reassignment_deltas(reassigned, "assigned_to", translator.id))
+                    assigned_translator_count = reassigned.update(assigned_to=translator, updated_at=now)
+
+                if corrector:
+                    Document.objects.filter(id__in=document_ids).update(corrector=corrector)
+                    reassigned = sentences.exclude(corrector=corrector)
+                    signals.change_user_stats(reassignment_deltas(reassigned, "corrector", corrector.id))
+                    assigned_corrector_count = reassigned.update(corrector=corrector, updated_at=now)
+
+                # Один пересчет статуса на документ при выходе из batched_signals()
+                for document in documents:
+                    signals.touch_document(document)
+
+            if len(documents) == 1:
+                target = f'Документ "{documents[0].title}"'
+            else:
+                target = f"Документы ({len(documents)})"
 
             # Формируем сообщение об успехе
             success_messages = []
@@ -330,10 +347,7 @@ class DocumentBulkAssignView(LoginRequiredMixin, AdminOrRepresentativeMixin, Vie
                 )
 
             if success_messages:
-                messages.success(
-                    request,
-                    f'Документ "{document.title}": {", ".join(success_messages)}.',
-                )
+                messages.success(request, f'{target}: {", ".join(success_messages)}.')
             else:
                 messages.info(request, "Все предложения уже назначены выбранным пользователям.")
 
@@ -342,7 +356,7 @@ class DocumentBulkAssignView(LoginRequiredMixin, AdminOrRepresentativeMixin, Vie
         except Exception as e:
             messages.error(request, f"Ошибка при назначении: {str(e)}")
 
-        return redirect("translations:document_detail", document_id=document_id)
+        return redirect_to
 
 
 class DocumentDeleteView(LoginRequiredMixin, AdminOrRepresentativeMixin, View):
@@ -357,7 +371,9 @@ class DocumentDeleteView(LoginRequiredMixin, AdminOrRepresentativeMixin, View):
                 default_storage.delete(document.file.name)
 
             document_title = document.title
-            document.delete()
+            # Вклад предложений документа в статистику пользователей вычитается одним запросом, а не сигналом на строку
+            with transaction.atomic(), removing_sentences(document.sentences.all()):
+                document.delete()
             messages.success(request, f'Документ "{document_title}" успешно удален.')
         except Exception as e:
             messages.error(request, f"Ошибка при удалении документа: {str(e)}")
@@ -370,9 +386,27 @@ class SentenceListView(LoginRequiredMixin, AdminOrRepresentativeMixin, ListView)
 
     model = Sentence
     template_name = "translations/sentence_list.html"
-    context_object_name = "page_obj"
+    context_object_name = "sentences"
     paginate_by = 25
 
+    # Ключи курсорной пагинации для допустимых сортировок: поля вместе однозначно определяют предложение
+    KEYSET_ORDERINGS = {
+        "sentence_number": ["sentence_number", "id"],
+        "status": ["status", "id"],
+        "created_at": ["created_at", "id"],
+        "document__file": ["document__file", "document_id", "sentence_number"],
+    }
+    DEFAULT_KEYSET_ORDERING = ["document_id", "sentence_number"]
+    RELEVANCE_KEYSET_ORDERING = ["-search_rank", "id"]
+
+    def get_default_sort(self):
+        # При поиске по умолчанию сначала показываются самые релевантные предложения
+        if self.request.GET.get("search"):
+            return "relevance"
+        if self.request.user.role in ["translator", "corrector"]:
+            return "-created_at"
+        return "document__file"
+
     def get_queryset(self):
         # Базовый queryset с нужными связями
         queryset = Sentence.objects.select_related(
@@ -471,53 +505,36 @@ class SentenceListView(LoginRequiredMixin, AdminOrRepresentativeMixin, ListView)
         if document_filter:
             queryset = queryset.filter(document_id=document_filter)
 
-        # Поиск
+        # Поиск по полнотекстовому индексу оригинала и перевода
         search_query = self.request.GET.get("search", "")
         if search_query:
             if self.request.user.role == "translator":
-                queryset = queryset.filter(
-                    Q(original_text__icontains=search_query)
-                    | Q(translation__translated_text__icontains=search_query)
-                    | Q(document__file__icontains=search_query)
-                )
+                queryset = search_sentences(queryset, search_query, match_files=True)
             elif self.request.user.role == "corrector":
-                queryset = queryset.filter(
-                    Q(original_text__icontains=search_query)
-                    | Q(translation__translated_text__icontains=search_query)
-                    | Q(translation__translator__first_name__icontains=search_query)
-                    | Q(translation__translator__last_name__icontains=search_query)
-                )
+                queryset = search_sentences(queryset, search_query, match_translators=True)
             else:
-                queryset = queryset.filter(
-                    Q(original_text__icontains=search_query)
-                    | Q(document__file__icontains=search_query)
-                    | Q(assigned_to__first_name__icontains=search_query)
-                    | Q(assigned_to__last_name__icontains=search_query)
-                )
+                queryset = search_sentences(queryset, search_query, match_files=True, match_assignees=True)
 
         # Сортировка
-        if self.request.user.role == "translator":
-            default_sort = "-created_at"
-        elif self.request.user.role == "corrector":
-            default_sort = "-created_at"
+        sort_by = self.request.GET.get("sort", self.get_default_sort())
+        ordering = self.KEYSET_ORDERINGS.get(sort_by.lstrip("-"))
+        if sort_by == "relevance" and search_query:
+            self.keyset_ordering = self.RELEVANCE_KEYSET_ORDERING
+        elif ordering is None:
+            self.keyset_ordering = self.DEFAULT_KEYSET_ORDERING
+        elif sort_by.startswith("-"):
+            self.keyset_ordering = [f"-{field}" for field in ordering]
         else:
-            default_sort = "document__file"
-
-        sort_by = self.request.GET.get("sort", default_sort)
-        if sort_by in [
-            "sentence_number",
-            "-sentence_number",
-            "status",
-            "-status",
-            "created_at",
-            "-created_at",
-            "document__file",
-            "-document__file",
-        ]:
-            queryset = queryset.order_by(sort_by)
+            self.keyset_ordering = ordering
 
         return queryset
 
+    def paginate_queryset(self, queryset, page_size):
+        # Сортировка задается ключом пагинатора: страницы выбираются по курсору, без OFFSET и COUNT(*)
+        paginator = KeysetPaginator(queryset, self.keyset_ordering, page_size)
+        page = paginator.get_page(self.request.GET)
+        return paginator, page, page.object_list, page.has_other_pages()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
@@ -551,13 +568,7 @@ class SentenceListView(LoginRequiredMixin, AdminOrRepresentativeMixin, ListView)
         context["status_filter"] = self.request.GET.get("status", "")
         context["assigned_filter"] = self.request.GET.get("assigned", "")
         context["search_query"] = self.request.GET.get("search", "")
-        if self.request.user.role == "translator":
-            default_sort = "-created_at"
-        elif self.request.user.role == "corrector":
-            default_sort = "-created_at"
-        else:
-            default_sort = "document__file"
-        context["sort_by"] = self.request.GET.get("sort", default_sort)
+        context["sort_by"] = self.request.GET.get("sort", self.get_default_sort())
         return context
 
 
@@ -569,7 +580,9 @@ class SentenceDeleteView(LoginRequiredMixin, AdminOrRepresentativeMixin, View):
 
         try:
             sentence_number = sentence.sentence_number
-            document_title = sentence.document.title
+            document = sentence.document
+            document_title = document.title
+            # Счетчики и статус документа обновляет сигнал удаления предложения
             sentence.delete()
             messages.success(
                 request,
@@ -601,6 +614,8 @@ class SentenceDetailView(LoginRequiredMixin, DetailView):
         context = super().get_context_data(**kwargs)
         # Для удобства добавим перевод, если есть
         context["translation"] = getattr(self.object, "translation", None)
+        # Похожие предложения с утвержденными переводами из индекса MinHash
+        context["similar_translations"] = find_similar(self.object.original_text, exclude_sentence_id=self.object.id)
 
         # Добавляем форму назначения переводчика для администраторов и представителей
         if self.request.user.role in ["admin", "representative"]:
@@ -614,7 +629,10 @@ class SentenceDetailView(LoginRequiredMixin, DetailView):
         if self.request.user.role == "translator":
             # Добавляем форму создания перевода, если перевод еще не существует
             if not hasattr(self.object, "translation"):
-                context["create_translation_form"] = CreateTranslationForm()
+                # Предзаполняем форму утвержденным переводом такого же предложения из памяти переводов
+                suggestion = get_memory_suggestion(self.object)
+                context["memory_suggestion"] = suggestion
+                context["create_translation_form"] = CreateTranslationForm(initial={"translated_text": suggestion})
             # Добавляем форму редактирования перевода, если перевод существует и корректор еще не подтвердил
             elif hasattr(self.object, "translation") and self.object.status != 2:
                 context["edit_translation_form"] = EditTranslationForm(instance=self.object.translation)
@@ -996,42 +1014,12 @@ class ExportDocumentView(LoginRequiredMixin, AdminOrRepresentativeMixin, View):
                 messages.error(request, "Неподдерживаемый формат экспорта.")
                 return redirect("translations:document_detail", document_id=document_id)
 
-            file_path = export_document_translations(document, format)
-
-            # Читаем файл и отправляем как ответ
-            with open(file_path, "rb") as f:
-                content = f.read()
-
-                # Определяем имя и тип на основе фактического результата экспорта
-                orig_stem = document.title
-                output_ext = os.path.splitext(file_path)[1].lower()
-
-                # Имя файла, возвращаемое export_document_translations, уже корректное и не временное.
-                # Здесь мы просто используем его для Content-Disposition, чтобы имя при скачивании совпадало с реальным файлом.
-                actual_name = os.path.basename(file_path)
-                guessed_type, _ = mimetypes.guess_type(actual_name)
-                content_type = guessed_type or "application/octet-stream"
-                if actual_name.lower().endswith(".txt") and "charset" not in content_type:
-                    content_type = "text/plain; charset=utf-8"
-
-                name_stem, ext = os.path.splitext(actual_name)
-                # ASCII-совместимое имя для filename= (RFC 6266 фолбэк)
-                ascii_stem = slugify(name_stem, allow_unicode=False) or "file"
-                fallback_name = f"{ascii_stem}{ext or output_ext or ''}"
-
-                response = HttpResponse(content, content_type=content_type)
-                response["Content-Disposition"] = (
-                    f"attachment; filename=\"{fallback_name}\"; filename*=UTF-8''{quote(actual_name)}"
-                )
-                try:
-                    response["Content-Length"] = str(os.path.getsize(file_path))
-                except OSError:
-                    pass
-
-            # Удаляем временный файл
-            os.remove(file_path)
-
-            return response
+            # Выгрузка собирается заново, кроме докачки прерванного скачивания той же сборки.
+            # Читаемое имя передается в Content-Disposition
+            file_path = document_export_path(document, format)
+            if not can_resume(request, file_path):
+                build_document_export(document, format)
+            return file_download_response(request, file_path, filename=export_filename(document, format))
 
         except Exception as e:
             messages.error(request, f"Ошибка при экспорте документа: {str(e)}")
@@ -1045,31 +1033,16 @@ class ExportDocumentAllView(LoginRequiredMixin, AdminOrRepresentativeMixin, View
         document = get_object_or_404(Document, id=document_id)
 
         try:
-            file_path = export_document_all_formats(document)
-
-            # Читаем файл и отправляем как ответ
-            with open(file_path, "rb") as f:
-                content = f.read()
-                # Имя ZIP: оригинальное имя без расширения + _(inh)_all_formats.zip
-                orig_stem = document.title
-                actual_name = f"{orig_stem}_(inh)_all_formats.zip"
-                name_stem, ext = os.path.splitext(actual_name)
-                ascii_stem = slugify(name_stem, allow_unicode=False) or "archive"
-                fallback_name = f"{ascii_stem}{ext or '.zip'}"
-
-                response = HttpResponse(content, content_type="application/zip")
-                response["Content-Disposition"] = (
-                    f"attachment; filename=\"{fallback_name}\"; filename*=UTF-8''{quote(actual_name)}"
-                )
-                try:
-                    response["Content-Length"] = str(os.path.getsize(file_path))
-                except OSError:
-                    pass
-
-            # Удаляем временный файл
-            os.remove(file_path)
-
-            return response
+            file_path = document_export_path(document, "all")
+            if not can_resume(request, file_path):
+                build_document_export(document, "all")
+            # Имя ZIP: оригинальное имя без расширения + _(inh)_all_formats.zip
+            return file_download_response(
+                request,
+                file_path,
+                filename=export_filename(document, "all"),
+                content_type="application/zip",
+            )
 
         except Exception as e:
             messages.error(request, f"Ошибка при экспорте документа: {str(e)}")
@@ -1078,7 +1051,7 @@ class ExportDocumentAllView(LoginRequiredMixin, AdminOrRepresentativeMixin, View
 
 def export_sentences(request):
     """Экспорт предложений в CSV с учётом фильтров"""
-    queryset = Sentence.objects.select_related("document", "assigned_to", "translation__translator").all()
+    queryset = Sentence.objects.all()
     document_filter = request.GET.get("document", "")
     if document_filter:
         queryset = queryset.filter(document_id=document_filter)
@@ -1092,13 +1065,8 @@ def export_sentences(request):
         queryset = queryset.filter(assigned_to__isnull=True)
     search_query = request.GET.get("search", "")
     if search_query:
-        queryset = queryset.filter(
-            Q(original_text__icontains=search_query)
-            | Q(document__file__icontains=search_query)
-            | Q(assigned_to__first_name__icontains=search_query)
-            | Q(assigned_to__last_name__icontains=search_query)
-        )
-    sort_by = request.GET.get("sort", "document__file")
+        queryset = search_sentences(queryset, search_query, match_files=True, match_assignees=True)
+    sort_by = request.GET.get("sort", "relevance" if search_query else "document__file")
     allowed_sorts = [
         "document__file",
         "-document__file",
@@ -1109,7 +1077,9 @@ def export_sentences(request):
         "created_at",
         "-created_at",
     ]
-    if sort_by in allowed_sorts:
+    if sort_by == "relevance" and search_query:
+        queryset = queryset.order_by("-search_rank", "id")
+    elif sort_by in allowed_sorts:
         queryset = queryset.order_by(sort_by)
     return export_sentences_to_csv(queryset)
 
@@ -1216,6 +1186,7 @@ class UpdateSentenceTranslationView(LoginRequiredMixin, View):
 # Переименованные представления для обратной совместимости
 document_list = DocumentListView.as_view()
 document_upload = DocumentUploadView.as_view()
+ingestion_job_status = IngestionJobStatusView.as_view()
 document_detail = DocumentDetailView.as_view()
 document_bulk_assign = DocumentBulkAssignView.as_view()
 document_delete = DocumentDeleteView.as_view()
@@ -0,0 +1,16 @@
+import factory
+
+from .models import User
+
+
+class UserFactory(factory.django.DjangoModelFactory):
+    """Пользователь для тестов; без пароля, в тестах входит через force_login"""
+
+    class Meta:
+        model = User
+
+    username = factory.Sequence(lambda n: f"user{n}")
+    email = factory.LazyAttribute(lambda user: f"{user.username}@example.com")
+    first_name = factory.Faker("first_name", locale="ru_RU")
+    last_name = factory.Faker("last_name", locale="ru_RU")
+    role = "translator"
@@ -0,0 +1,54 @@
+"""
+Бюджеты SQL-запросов страниц users/urls.py на малом и большом наборах данных (conftest.corpus).
+Число запросов на обоих наборах одинаково, а запрос на строку (N+1) сразу превышает бюджет.
+"""
+
+from django.urls import reverse
+
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+PASSWORD = "Пароль-для-тестов-1"
+
+# Пользователь (None - аноним), метод, url, данные(corpus), бюджет запросов
+CASES = [
+    pytest.param(None, "get", "users:login", None, 0, id="login"),
+    pytest.param(
+        None,
+        "post",
+        "users:login",
+        lambda c: {"username": c.translator.username, "password": PASSWORD},
+        9,
+        id="login_post",
+    ),
+    pytest.param(None, "get", "users:register", None, 0, id="register"),
+    pytest.param(
+        None,
+        "post",
+        "users:register",
+        lambda c: {
+            "username": "new_translator",
+            "email": "new_translator@example.com",
+            "password": PASSWORD,
+            "password_confirm": PASSWORD,
+            "first_name": "Иван",
+            "last_name": "Иванов",
+            "role": "translator",
+        },
+        12,
+        id="register_post",
+    ),
+    pytest.param("translator", "get", "users:logout", None, 4, id="logout"),
+]
+
+
+@pytest.mark.parametrize("user, method, url, data, budget", CASES)
+def test_query_budget(client, corpus, query_budget, user, method, url, data, budget):
+    corpus.translator.set_password(PASSWORD)
+    corpus.translator.save(update_fields=["password"])
+    if user:
+        client.force_login(getattr(corpus, user))
+    with query_budget(budget):
+        response = getattr(client, method)(reverse(url), data(corpus) if data else None)
+    assert response.status_code < 400